@@ -0,0 +1,100 @@
+"""
+Cache invalidation bus latency
+Starts worker processes that each subscribe to a table and answer every
+invalidation with one of their own, then measures the round trip from a publish
+until every worker has answered. Uses the bus selected with --bus; `postgres`
+needs DATABASE_URL to point at a Postgres database.
+
+Usage:
+    uv run python benchmarks/cache_bus.py --bus local --workers 8 --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD_FLAG = "--child"
+PING = "bench_ping"
+PONG = "bench_pong"
+
+
+async def child() -> None:
+    """Worker: answer each ping with a pong until stdin closes"""
+    from backend.services.cache_bus import create_cache_bus
+
+    bus = create_cache_bus(os.environ["FASTSET_CACHE_BUS"])
+    bus.subscribe(PING, lambda: bus.publish([PONG]))
+    await bus.start()
+    print("ready", flush=True)
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+    await bus.stop()
+
+
+async def run(kind: str, workers: int, repeat: int) -> list:
+    from backend.services.cache_bus import create_cache_bus
+
+    children = [
+        subprocess.Popen(
+            [sys.executable, __file__, CHILD_FLAG], env=os.environ,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in children:
+        process.stdout.readline()
+
+    bus = create_cache_bus(kind)
+    answered = asyncio.Event()
+    pongs = 0
+
+    def on_pong():
+        nonlocal pongs
+        pongs += 1
+        if pongs == workers:
+            answered.set()
+
+    bus.subscribe(PONG, on_pong)
+    await bus.start()
+    await asyncio.sleep(0.2)
+
+    latencies = []
+    try:
+        for _ in range(repeat):
+            pongs = 0
+            answered.clear()
+            started = time.perf_counter()
+            await asyncio.to_thread(bus.publish, [PING])
+            await asyncio.wait_for(answered.wait(), timeout=5)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        await bus.stop()
+        for process in children:
+            process.stdin.close()
+            process.wait()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bus", choices=["local", "postgres"], default="local")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["FASTSET_CACHE_BUS"] = args.bus
+    os.environ.setdefault("FASTSET_CACHE_BUS_SOCKET_DIR", tempfile.mkdtemp(prefix="fastset-bus-"))
+    latencies = sorted(asyncio.run(run(args.bus, args.workers, args.repeat)))
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{args.bus} bus, {args.workers} workers, {len(latencies)} round trips")
+    print(f"median {statistics.median(latencies):.2f} ms  p99 {p99:.2f} ms  max {latencies[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    if CHILD_FLAG in sys.argv:
+        asyncio.run(child())
+    else:
+        main()
@@ -0,0 +1,112 @@
+"""
+List response serialization benchmark
+Compares the default response_model path (ORM objects -> Pydantic -> jsonable_encoder
+-> json) against the fast projection path for 1000-row list responses.
+
+Usage:
+    uv run python benchmarks/list_serialization.py --rows 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/list_serialization.db"
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.database import SessionLocal, create_tables
+from backend.models.abac import Action, Attribute, Policy, Resource, User
+from backend.responses import dumps
+from backend.schemas.abac import Policy as PolicySchema, Resource as ResourceSchema, User as UserSchema
+from backend.services.projections import ProjectionService
+
+
+def seed(rows: int) -> None:
+    """Create rows users, resources and policies, each with nested data"""
+    db = SessionLocal()
+    try:
+        attributes = [
+            Attribute(name=f"attr_{i}", attribute_type="user", data_type="string", value=str(i))
+            for i in range(20)
+        ]
+        actions = [Action(name=f"action_{i}", category="read") for i in range(10)]
+        db.add_all(attributes + actions)
+        db.flush()
+        for i in range(rows):
+            db.add(User(
+                username=f"user_{i}", email=f"user_{i}@example.com", hashed_password="x",
+                attributes=attributes[i % 17:i % 17 + 3],
+            ))
+            db.add(Resource(
+                name=f"resource_{i}", resource_type="table", resource_uri=f"/data/{i}",
+                attributes=attributes[i % 13:i % 13 + 2],
+            ))
+            db.add(Policy(
+                name=f"policy_{i}", effect="ALLOW", priority=i % 100,
+                conditions={"equals": {"attribute": "user.role", "value": "admin"}},
+                action_id=actions[i % 10].id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def pydantic_path(model, schema, rows: int) -> bytes:
+    """What FastAPI does for a List[schema] response_model"""
+    db = SessionLocal()
+    try:
+        objects = db.query(model).limit(rows).all()
+        validated = TypeAdapter(List[schema]).validate_python(objects)
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+    finally:
+        db.close()
+
+
+def projection_path(project, model, rows: int) -> bytes:
+    """The opt-in fast path"""
+    db = SessionLocal()
+    try:
+        return dumps(project(db, db.query(model).limit(rows)))
+    finally:
+        db.close()
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-repeat wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.rows)
+
+    cases = [
+        ("users", User, UserSchema, ProjectionService.users),
+        ("resources", Resource, ResourceSchema, ProjectionService.resources),
+        ("policies", Policy, PolicySchema, ProjectionService.policies),
+    ]
+    print(f"{'endpoint':<12}{'pydantic ms':>14}{'projection ms':>16}{'speedup':>10}{'bytes':>10}")
+    for name, model, schema, project in cases:
+        slow = timed(lambda: pydantic_path(model, schema, args.rows), args.repeat)
+        fast = timed(lambda: projection_path(project, model, args.rows), args.repeat)
+        size = len(projection_path(project, model, args.rows))
+        print(f"{name:<12}{slow:>14.1f}{fast:>16.1f}{slow / fast:>9.1f}x{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
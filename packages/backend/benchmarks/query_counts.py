@@ -0,0 +1,112 @@
+"""
+List endpoint query count harness
+Requests every list endpoint at two page sizes and fails if the number of SQL
+statements grows with the page size, i.e. if any relationship is lazy-loaded per row.
+
+Usage:
+    uv run python benchmarks/query_counts.py
+    FASTSET_RELATIONSHIP_LOADER=joined uv run python benchmarks/query_counts.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/query_counts.db"
+
+from fastapi.testclient import TestClient
+
+from backend.database import SessionLocal, create_tables, engine
+from backend.dependencies import get_abac_engine, get_current_active_user_middleware
+from backend.models.abac import Action, Attribute, Policy, Resource, User
+from backend.query_counter import count_statements
+from backend.schemas.abac import AuthorizationResponse, PolicyEffect
+from backend.server import app
+
+ENDPOINTS = [
+    "/v1/users/",
+    "/v1/abac/resources",
+    "/v1/abac/actions",
+    "/v1/abac/attributes",
+    "/v1/abac/policies",
+]
+
+
+class AllowAll:
+    """Authorization stand-in so only the list query path is measured"""
+
+    def evaluate_access(self, request):
+        return AuthorizationResponse(decision=PolicyEffect.ALLOW, reason="query count harness")
+
+
+def seed(rows: int) -> None:
+    """Create rows users, resources and policies, each with nested data"""
+    db = SessionLocal()
+    try:
+        attributes = [
+            Attribute(name=f"attr_{i}", attribute_type="user", data_type="string", value=str(i))
+            for i in range(20)
+        ]
+        actions = [Action(name=f"action_{i}", category="read") for i in range(10)]
+        db.add_all(attributes + actions)
+        db.flush()
+        for i in range(rows):
+            db.add(User(
+                username=f"user_{i}", email=f"user_{i}@example.com", hashed_password="x",
+                attributes=attributes[i % 17:i % 17 + 3],
+            ))
+            db.add(Resource(
+                name=f"resource_{i}", resource_type="table", resource_uri=f"/data/{i}",
+                attributes=attributes[i % 13:i % 13 + 2],
+            ))
+            db.add(Policy(
+                name=f"policy_{i}", effect="ALLOW", priority=i % 100, conditions={},
+                action_id=actions[i % 10].id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(client: TestClient, path: str, limit: int, fast: bool) -> int:
+    """Statements issued by one request"""
+    with count_statements(engine) as counter:
+        response = client.get(path, params={"limit": limit, "fast": fast})
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+    return counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=50)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.large)
+
+    app.dependency_overrides[get_current_active_user_middleware] = lambda: User(id=1, username="harness")
+    app.dependency_overrides[get_abac_engine] = AllowAll
+
+    failures = []
+    client = TestClient(app)
+    print(f"{'endpoint':<24}{'path':<10}{f'limit={args.small}':>10}{f'limit={args.large}':>10}")
+    for path in ENDPOINTS:
+        for fast in (False, True):
+            small = measure(client, path, args.small, fast)
+            large = measure(client, path, args.large, fast)
+            mode = "fast" if fast else "default"
+            print(f"{path:<24}{mode:<10}{small:>10}{large:>10}")
+            if large != small:
+                failures.append(f"{path} ({mode})")
+
+    if failures:
+        print(f"FAIL: query count grows with page size for {', '.join(failures)}")
+        sys.exit(1)
+    print("OK: every list endpoint issues a constant number of queries")
+
+
+if __name__ == "__main__":
+    main()
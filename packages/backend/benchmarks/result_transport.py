@@ -0,0 +1,80 @@
+"""
+Query page transport: JSON versus Arrow IPC
+Encodes generated query pages the way the query router does for each format, then
+decodes them the way the SQL page does (into column-major display strings), and
+reports the time on each side and the payload size. Needs pyarrow.
+
+Usage:
+    uv run python benchmarks/result_transport.py --rows 5000 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from backend.responses import dumps
+from backend.services.arrow_results import encode_page, load_pyarrow, to_arrow
+
+COLUMNS = ["id", "name", "amount", "price", "created_at", "note"]
+
+
+def make_rows(count: int) -> list:
+    start = datetime(2025, 1, 1)
+    return [
+        [i, f"customer-{i}", i * 1.25, Decimal(i) / 100, start + timedelta(minutes=i), None if i % 5 else "flagged"]
+        for i in range(count)
+    ]
+
+
+def page(rows) -> dict:
+    return {
+        "query_id": "bench", "source": "default", "columns": COLUMNS, "page": 0, "rows": rows,
+        "row_count": len(rows), "has_more": False, "truncated": False, "execution_time_ms": 0.0, "cached": False,
+    }
+
+
+def json_roundtrip(rows) -> tuple:
+    started = time.perf_counter()
+    body = dumps(page(rows))
+    encoded = time.perf_counter()
+    result = json.loads(body)
+    cells = [["NULL" if row[i] is None else str(row[i]) for row in result["rows"]] for i in range(len(COLUMNS))]
+    assert len(cells[0]) == len(rows)
+    return encoded - started, time.perf_counter() - encoded, len(body)
+
+
+def arrow_roundtrip(rows) -> tuple:
+    pa = load_pyarrow()
+    import pyarrow.compute as pc
+
+    started = time.perf_counter()
+    table, _ = to_arrow(COLUMNS, rows)
+    body = encode_page(page(table))
+    encoded = time.perf_counter()
+    result = pa.ipc.open_stream(body).read_all()
+    cells = [pc.fill_null(pc.cast(column, pa.string()), "NULL").to_pylist() for column in result.columns]
+    assert len(cells[0]) == len(rows)
+    return encoded - started, time.perf_counter() - encoded, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if load_pyarrow() is None:
+        raise SystemExit("pyarrow is required: install fastset-backend[analytics]")
+    rows = make_rows(args.rows)
+    print(f"{args.rows} rows x {len(COLUMNS)} columns, median of {args.repeat}")
+    for name, roundtrip in (("json", json_roundtrip), ("arrow", arrow_roundtrip)):
+        runs = [roundtrip(rows) for _ in range(args.repeat)]
+        encode = statistics.median(run[0] for run in runs) * 1000
+        decode = statistics.median(run[1] for run in runs) * 1000
+        print(f"{name:6} encode {encode:7.2f} ms  decode {decode:7.2f} ms  {runs[0][2] / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
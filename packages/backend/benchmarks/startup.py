@@ -0,0 +1,100 @@
+"""
+Backend cold start benchmark
+Starts fresh interpreters and measures importing `backend.server` and running the
+app lifespan, first against an empty database and then against a current one.
+Fails when the warm start exceeds the budget.
+
+Usage:
+    uv run python benchmarks/startup.py --repeat 5 --budget-ms 1500
+    uv run python benchmarks/startup.py --profile        # slowest imports
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD_FLAG = "--child"
+
+
+def child() -> None:
+    """Runs in a fresh interpreter; prints timings as JSON"""
+    started = time.perf_counter()
+    from backend.server import app
+    imported = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+    from backend.database import engine
+    from backend.query_counter import count_statements
+
+    with count_statements(engine) as counter:
+        lifespan_started = time.perf_counter()
+        with TestClient(app):
+            ready = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "lifespan_ms": (ready - lifespan_started) * 1000,
+        "statements": counter.count,
+    }))
+
+
+def run_child(database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, FASTSET_AUDIT_ROLLUP_INTERVAL_SECONDS="0")
+    output = subprocess.run(
+        [sys.executable, __file__, CHILD_FLAG], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def profile(top: int) -> None:
+    """Print the slowest imports of backend.server by cumulative time"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.server"],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Import plus warm lifespan")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.profile:
+        profile(args.top)
+        return
+
+    print(f"{'run':<8}{'import ms':>12}{'lifespan ms':>14}{'statements':>12}")
+    warm = []
+    for i in range(args.repeat):
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/startup.db"
+        for label in ("cold", "warm"):
+            result = run_child(database_url)
+            print(f"{label:<8}{result['import_ms']:>12.0f}{result['lifespan_ms']:>14.0f}{result['statements']:>12}")
+            if label == "warm":
+                warm.append(result["import_ms"] + result["lifespan_ms"])
+
+    best = min(warm)
+    print(f"Best warm start: {best:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if best > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if CHILD_FLAG in sys.argv:
+        child()
+    else:
+        main()
@@ -21,6 +21,16 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for models
 Base = declarative_base()
 
+# Keep HTTP cache validators in step with every write made through SessionLocal
+from backend.services.table_versions import track_table_versions  # noqa: E402
+
+track_table_versions(SessionLocal)
+
+# Tell every worker which tables changed, so their in-process caches drop stale entries
+from backend.services.cache_bus import publish_invalidations  # noqa: E402
+
+publish_invalidations(SessionLocal)
+
 def get_db() -> Session:
     """Dependency to get database session"""
     db = SessionLocal()
@@ -29,7 +39,34 @@ def get_db() -> Session:
     finally:
         db.close()
 
-def create_tables():
-    """Create all tables"""
-    from backend.models.base import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def create_tables() -> bool:
+    """Create and migrate all tables unless the schema is current; returns True if it ran"""
+    from backend.migrations import read_schema_version, schema_fingerprint, schema_lock, write_schema_version
+
+    version = schema_fingerprint()
+    if read_schema_version(engine) == version:
+        return False
+
+    with schema_lock(engine):
+        # Another worker may have migrated while this one waited for the lock
+        if read_schema_version(engine) == version:
+            return False
+
+        from backend.models.base import Base
+        from backend.migrations import create_missing_indexes
+        from backend.services.audit_partitions import AuditPartitionManager
+        from backend.services.user_search import UserSearchService
+        Base.metadata.create_all(bind=engine)
+        create_missing_indexes(engine)
+        UserSearchService.ensure_search_index(engine)
+        AuditPartitionManager.maintain(engine)
+        write_schema_version(engine, version)
+    return True
+
+def maintain_partitions() -> None:
+    """Time-based audit partition upkeep, under the migration lock so workers booting together take turns"""
+    from backend.migrations import schema_lock
+    from backend.services.audit_partitions import AuditPartitionManager
+
+    with schema_lock(engine):
+        AuditPartitionManager.maintain(engine)
\ No newline at end of file
@@ -1,8 +1,8 @@
 """
 FastAPI dependencies for authentication and authorization
 """
-from typing import Optional
-from fastapi import Depends, HTTPException, status, Request
+from typing import Any, Dict, List, Optional, Sequence, Set
+from fastapi import Depends, HTTPException, status, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
@@ -12,6 +12,11 @@ from backend.services.abac_engine import ABACEngine
 from backend.models.abac import User
 from backend.schemas.abac import AuthorizationRequest, PolicyEffect
 from backend.middleware import get_jwt_claims, get_current_user_id, get_access_token
+from backend.services.projections import parse_fields, FIELDS_DESCRIPTION
+from backend.services.table_versions import TableVersionService
+from backend.services.bulk import parse_items
+from backend.services.streaming import NDJSON_MEDIA_TYPE, StreamRequest
+from backend.services.arrow_results import ARROW_STREAM_MEDIA_TYPE, load_pyarrow
 
 # Security scheme
 security = HTTPBearer()
@@ -117,6 +122,58 @@ def require_permission(resource_uri: str, action_name: str):
     
     return check_permission
 
+def sparse_fields(allowed: Sequence[str]):
+    """
+    Dependency factory for `fields=` sparse fieldsets
+    Usage: fields: Optional[Set[str]] = Depends(sparse_fields(USER_FIELDS))
+    """
+    def parse(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)) -> Optional[Set[str]]:
+        try:
+            return parse_fields(fields, allowed)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return parse
+
+def conditional_get(*tables: str):
+    """
+    Dependency factory for ETag validation on cacheable GET routes
+    Answers 304 from table versions alone, before the route queries or serializes anything.
+    Returns the cache headers for routes that build their own Response.
+    Usage: cache: Dict[str, str] = Depends(conditional_get("policies", "actions"))
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_db)) -> Dict[str, str]:
+        # Versions are read before the data, so a concurrent write can only make
+        # the tag older than the body and force a refetch, never a stale 304
+        representation = f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+        etag = TableVersionService.etag(db, tables, representation)
+        headers = TableVersionService.cache_headers(etag)
+        if TableVersionService.matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return headers
+
+    return check
+
+def ndjson_stream(request: Request) -> Optional[StreamRequest]:
+    """The NDJSON stream asked for via the Accept header, or None for a JSON page"""
+    if NDJSON_MEDIA_TYPE not in request.headers.get("accept", ""):
+        return None
+    # `limit` has already been validated by the route; streams ignore its default
+    limit = request.query_params.get("limit")
+    return StreamRequest(int(limit) if limit else None)
+
+def arrow_stream(request: Request) -> bool:
+    """True when the Accept header asks for Arrow IPC and pyarrow is installed; JSON otherwise"""
+    return ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "") and load_pyarrow() is not None
+
+async def bulk_items(request: Request) -> List[Any]:
+    """Read a bulk request body sent as a JSON array or as NDJSON"""
+    try:
+        return parse_items(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 class PermissionChecker:
     """Class-based permission checker for more complex scenarios"""
     
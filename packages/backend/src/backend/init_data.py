@@ -1,12 +1,14 @@
 """
 Initialize sample data for ABAC system
-Run this script to populate the database with sample users, resources, actions, attributes, and policies
+Run this script to populate the database with sample users, resources, actions, attributes, and policies.
+Every step is an idempotent bulk upsert, so it is safe to run again or from several processes.
 """
-import json
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from backend.database import SessionLocal, create_tables
-from backend.models.abac import User, Resource, Action, Attribute, Policy
+from backend.models.abac import User, Action, Attribute, Policy
+from backend.schemas.abac import UserCreate
 from backend.services.auth import AuthService
+from backend.services.bulk import BulkService
 
 def init_sample_data():
     """Initialize sample data for testing ABAC system"""
@@ -18,36 +20,11 @@ def init_sample_data():
     
     try:
         # Create sample users
-        if not db.query(User).filter(User.username == "admin").first():
-            admin_user = User(
-                username="admin",
-                email="admin@fastset.com",
-                hashed_password=AuthService.get_password_hash("admin123"),
-            )
-            db.add(admin_user)
-        
-        if not db.query(User).filter(User.username == "analyst").first():
-            analyst_user = User(
-                username="analyst",
-                email="analyst@fastset.com", 
-                hashed_password=AuthService.get_password_hash("analyst123"),
-            )
-            db.add(analyst_user)
-        
-        if not db.query(User).filter(User.username == "viewer").first():
-            viewer_user = User(
-                username="viewer",
-                email="viewer@fastset.com",
-                hashed_password=AuthService.get_password_hash("viewer123"),
-            )
-            db.add(viewer_user)
-        
-        db.commit()
-        
-        # Get user IDs
-        admin = db.query(User).filter(User.username == "admin").first()
-        analyst = db.query(User).filter(User.username == "analyst").first()
-        viewer = db.query(User).filter(User.username == "viewer").first()
+        AuthService.ensure_users(db, [
+            UserCreate(username="admin", email="admin@fastset.com", password="admin123"),
+            UserCreate(username="analyst", email="analyst@fastset.com", password="analyst123"),
+            UserCreate(username="viewer", email="viewer@fastset.com", password="viewer123"),
+        ])
         
         # Create sample actions
         actions_data = [
@@ -57,13 +34,7 @@ def init_sample_data():
             {"name": "delete", "description": "Delete resources", "category": "write"},
             {"name": "admin", "description": "Administrative operations", "category": "admin"}
         ]
-        
-        for action_data in actions_data:
-            if not db.query(Action).filter(Action.name == action_data["name"]).first():
-                action = Action(**action_data)
-                db.add(action)
-        
-        db.commit()
+        BulkService.upsert(db, Action, actions_data, ("name",), (), on_conflict="skip")
         
         # Create sample resources
         resources_data = [
@@ -72,20 +43,17 @@ def init_sample_data():
             {"name": "Reports API", "resource_type": "api", "resource_uri": "/api/reports"},
             {"name": "ABAC Resources", "resource_type": "api", "resource_uri": "/abac/resources"},
             {"name": "ABAC Policies", "resource_type": "api", "resource_uri": "/abac/policies"},
-            {"name": "Audit Logs", "resource_type": "api", "resource_uri": "/abac/audit-logs"}
+            {"name": "Audit Logs", "resource_type": "api", "resource_uri": "/abac/audit-logs"},
+            {"name": "SQL Query", "resource_type": "api", "resource_uri": "/query"}
         ]
-        
-        for resource_data in resources_data:
-            if not db.query(Resource).filter(Resource.resource_uri == resource_data["resource_uri"]).first():
-                resource = Resource(**resource_data)
-                db.add(resource)
-        
-        db.commit()
+        BulkService.upsert_resources(db, resources_data, on_conflict="skip")
         
         # Create sample attributes
         attributes_data = [
             # User attributes
             {"name": "role", "attribute_type": "user", "data_type": "string", "value": "admin", "description": "User role"},
+            {"name": "role", "attribute_type": "user", "data_type": "string", "value": "analyst", "description": "Analyst role"},
+            {"name": "role", "attribute_type": "user", "data_type": "string", "value": "viewer", "description": "Viewer role"},
             {"name": "department", "attribute_type": "user", "data_type": "string", "value": "IT", "description": "User department"},
             {"name": "clearance_level", "attribute_type": "user", "data_type": "integer", "value": "5", "description": "Security clearance level"},
             
@@ -96,56 +64,31 @@ def init_sample_data():
             # Environment attributes
             {"name": "network", "attribute_type": "environment", "data_type": "string", "value": "internal", "description": "Network location"}
         ]
-        
-        for attr_data in attributes_data:
-            attr = Attribute(**attr_data)
-            db.add(attr)
-        
-        db.commit()
+        BulkService.upsert_attributes(db, attributes_data, on_conflict="skip")
         
         # Assign attributes to users
-        role_admin = db.query(Attribute).filter(Attribute.name == "role", Attribute.value == "admin").first()
-        dept_it = db.query(Attribute).filter(Attribute.name == "department").first()
-        clearance_5 = db.query(Attribute).filter(Attribute.name == "clearance_level").first()
-        
-        if role_admin:
-            admin.attributes.append(role_admin)
-            admin.attributes.append(dept_it)
-            admin.attributes.append(clearance_5)
-        
-        # Create analyst role attribute
-        analyst_role = Attribute(
-            name="role", 
-            attribute_type="user", 
-            data_type="string", 
-            value="analyst", 
-            description="Analyst role"
-        )
-        db.add(analyst_role)
-        db.commit()
-        
-        analyst.attributes.append(analyst_role)
-        analyst.attributes.append(dept_it)
-        
-        # Create viewer role attribute
-        viewer_role = Attribute(
-            name="role",
-            attribute_type="user", 
-            data_type="string",
-            value="viewer",
-            description="Viewer role"
-        )
-        db.add(viewer_role)
-        db.commit()
-        
-        viewer.attributes.append(viewer_role)
-        
-        db.commit()
+        users = dict(db.execute(select(User.username, User.id)).all())
+        attributes = {
+            (name, value): attribute_id
+            for name, value, attribute_id in db.execute(
+                select(Attribute.name, Attribute.value, Attribute.id).where(Attribute.attribute_type == "user")
+            )
+        }
+        assignments = {
+            "admin": [("role", "admin"), ("department", "IT"), ("clearance_level", "5")],
+            "analyst": [("role", "analyst"), ("department", "IT")],
+            "viewer": [("role", "viewer")],
+        }
+        BulkService.assign_user_attributes(db, [
+            {"user_id": users[username], "attribute_id": attributes[attribute]}
+            for username, user_attributes in assignments.items()
+            for attribute in user_attributes
+        ])
         
         # Create sample policies
-        read_action = db.query(Action).filter(Action.name == "read").first()
-        create_action = db.query(Action).filter(Action.name == "create").first()
-        admin_action = db.query(Action).filter(Action.name == "admin").first()
+        actions = dict(db.execute(select(Action.name, Action.id)).all())
+        read_action = actions.get("read")
+        admin_action = actions.get("admin")
         
         policies_data = [
             {
@@ -205,7 +148,7 @@ def init_sample_data():
                         }
                     ]
                 },
-                "action_id": read_action.id if read_action else None,
+                "action_id": read_action,
             },
             {
                 "name": "Deny Admin Actions for Non-Admins",
@@ -230,14 +173,13 @@ def init_sample_data():
                         }
                     ]
                 },
-                "action_id": admin_action.id if admin_action else None,
+                "action_id": admin_action,
             }
         ]
         
-        for policy_data in policies_data:
-            if not db.query(Policy).filter(Policy.name == policy_data["name"]).first():
-                policy = Policy(**policy_data)
-                db.add(policy)
+        # Policies have no natural key; insert the ones whose name is not taken yet
+        existing = set(db.execute(select(Policy.name)).scalars())
+        db.add_all(Policy(**policy_data) for policy_data in policies_data if policy_data["name"] not in existing)
         
         db.commit()
         
@@ -1,28 +1,46 @@
+import asyncio
 from contextlib import asynccontextmanager
-from backend.database import create_tables, SessionLocal
+from backend.database import create_tables, maintain_partitions, SessionLocal
 from backend.services.auth import AuthService
+from backend.services.audit_rollup import ROLLUP_INTERVAL_SECONDS, run_periodic_refresh
+from backend.services.cache_bus import cache_bus
+from backend.services.data_sources import data_sources
+from backend.services.query_execution import QueryExecutionService
+from backend.services.query_workers import query_workers
 from backend.schemas.abac import UserCreate
 
 def create_default_user():
     """Create default admin user if it doesn't exist"""
     db = SessionLocal()
     try:
-        # Check if admin user exists
-        existing_user = AuthService.get_user_by_username(db, "admin")
-        if not existing_user:
-            # Create default admin user
-            admin_user = UserCreate(
-                username="admin",
-                email="admin@fastset.com",
-                password="admin123"
-            )
-            AuthService.create_user(db, admin_user)
+        admin_user = UserCreate(
+            username="admin",
+            email="admin@fastset.com",
+            password="admin123"
+        )
+        if AuthService.ensure_users(db, [admin_user]):
             print("Created default admin user: admin/admin123")
     finally:
         db.close()
 
 @asynccontextmanager
 async def lifespan(app):
-    create_tables()
+    maintenance = None
+    if not create_tables():
+        # Schema is current: only the time-based partition upkeep is due, and it
+        # does not need to hold up startup
+        maintenance = asyncio.create_task(asyncio.to_thread(maintain_partitions))
     create_default_user()
-    yield
\ No newline at end of file
+    await cache_bus.start()
+    rollup_task = None
+    if ROLLUP_INTERVAL_SECONDS > 0:
+        rollup_task = asyncio.create_task(run_periodic_refresh(SessionLocal))
+    yield
+    if rollup_task:
+        rollup_task.cancel()
+    await cache_bus.stop()
+    query_workers.shutdown()
+    await QueryExecutionService.close_all()
+    await data_sources.dispose()
+    if maintenance:
+        await maintenance
\ No newline at end of file
@@ -2,9 +2,11 @@
 Middleware package for FastAPI application
 """
 from .auth import AuthMiddleware, get_jwt_claims, get_current_user_id, get_current_username, get_access_token, require_auth
+from .compression import CompressionMiddleware
 
 __all__ = [
     "AuthMiddleware",
+    "CompressionMiddleware",
     "get_jwt_claims", 
     "get_current_user_id",
     "get_current_username", 
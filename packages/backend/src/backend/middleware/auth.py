@@ -5,22 +5,32 @@ Authentication middleware for extracting JWT claims
 from typing import Optional, Dict, Any
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from jose import JWTError, jwt
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from backend.services.auth import AuthService
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Middleware to extract JWT claims from cookies or Authorization header"""
+class AuthMiddleware:
+    """
+    Middleware to extract JWT claims from cookies or Authorization header
+    Pure ASGI rather than BaseHTTPMiddleware, so streaming responses pass through untouched
+    """
 
-    def __init__(self, app, secret_key: str, algorithm: str = "HS256"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, secret_key: str, algorithm: str = "HS256"):
+        self.app = app
         self.secret_key = secret_key
         self.algorithm = algorithm
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            self.dispatch(Request(scope))
+        await self.app(scope, receive, send)
+
+    def dispatch(self, request: Request) -> None:
         """Extract JWT claims and add to request state"""
+        # Deferred: the jose cryptography backend is slow to import
+        from jose import JWTError, jwt
+
         token = self._extract_token(request)
         claims = None
 
@@ -53,9 +63,6 @@ class AuthMiddleware(BaseHTTPMiddleware):
             request.state.jwt_claims = None
             request.state.access_token = None
 
-        response = await call_next(request)
-        return response
-
     def _extract_token(self, request: Request) -> Optional[str]:
         """Extract JWT token from cookies or Authorization header"""
         # First, try to get token from cookies
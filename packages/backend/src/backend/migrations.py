@@ -0,0 +1,116 @@
+"""
+Idempotent schema migrations for existing databases
+`create_all` only creates missing tables, so objects added to existing tables are applied here.
+A fingerprint of the declared schema is recorded after migrating, so boots against a
+current database skip all of it after a single query. Migrating happens under a lock so
+workers booting together do not race each other's DDL.
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+SCHEMA_NAME = "backend"
+# Bump when DDL outside the declared models changes (search indexes, triggers, partitioning)
+SCHEMA_REVISION = 2
+# pg_advisory_lock key held while migrating; any constant shared by all workers
+SCHEMA_LOCK_KEY = int(os.getenv("FASTSET_SCHEMA_LOCK_KEY", "7305391"))
+
+
+def create_missing_indexes(engine: Engine) -> None:
+    """Create declared indexes that are missing from existing tables"""
+    from backend.models.base import Base
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except IntegrityError as e:
+                # A unique index over existing duplicates; keep starting up and say why.
+                # Bulk writes keyed on it are refused until it exists.
+                print(f"Could not create unique index {index.name}, deduplicate {table.name} first: {e.orig}")
+
+
+def schema_fingerprint() -> str:
+    """Hash of every declared table, column, index and constraint"""
+    from backend.models.base import Base
+
+    parts = [f"revision:{SCHEMA_REVISION}"]
+    for table in Base.metadata.sorted_tables:
+        parts.append(f"table:{table.name}")
+        parts += [f"{c.name}:{c.type!r}:{c.nullable}:{c.primary_key}" for c in table.columns]
+        parts += sorted(f"{i.name}:{i.unique}:{','.join(c.name for c in i.columns)}" for i in table.indexes)
+        parts += sorted(f"{type(c).__name__}:{c.name}" for c in table.constraints)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def read_schema_version(engine: Engine) -> Optional[str]:
+    """Recorded schema fingerprint, or None on a database that was never versioned"""
+    from backend.models.abac import SchemaVersion
+
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(SchemaVersion.version).where(SchemaVersion.name == SCHEMA_NAME)
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        # The version table itself does not exist yet
+        return None
+
+
+def write_schema_version(engine: Engine, version: str) -> None:
+    """Record the fingerprint of the schema that was just applied"""
+    from backend.models.abac import SchemaVersion
+
+    insert = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(SchemaVersion).values(name=SCHEMA_NAME, version=version)
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": version, "updated_at": datetime.now(timezone.utc)},
+    )
+    with engine.begin() as conn:
+        conn.execute(statement)
+
+
+@contextmanager
+def schema_lock(engine: Engine) -> Iterator[None]:
+    """Serialize schema migration across processes sharing the database"""
+    if engine.dialect.name == "postgresql":
+        # Session-level advisory lock on a connection of its own, so the DDL can commit freely
+        with engine.connect() as conn:
+            conn.execute(select(func.pg_advisory_lock(SCHEMA_LOCK_KEY)))
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(select(func.pg_advisory_unlock(SCHEMA_LOCK_KEY)))
+                conn.commit()
+        return
+
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        # In-memory SQLite is private to this process
+        yield
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows
+        yield
+        return
+
+    # A sidecar lock file: SQLite's own locks are per transaction, and create_all spans several
+    with open(f"{database}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -4,7 +4,7 @@ Provides flexible, attribute-driven authorization system
 """
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Table
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Table, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from backend.models.base import DeclaredBase
@@ -41,6 +41,10 @@ class User(DeclaredBase):
 class Resource(DeclaredBase):
     """Resource entity representing protected objects"""
     __tablename__ = "resources"
+    # Natural key for bulk upserts from catalog syncs
+    __table_args__ = (
+        Index("ux_resources_resource_uri", "resource_uri", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
@@ -67,6 +71,10 @@ class Action(DeclaredBase):
 class Attribute(DeclaredBase):
     """Flexible attribute system for ABAC"""
     __tablename__ = "attributes"
+    # Natural key for bulk upserts
+    __table_args__ = (
+        Index("ux_attributes_type_name_value", "attribute_type", "name", "value", unique=True),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
     attribute_type: Mapped[AttributeType] = mapped_column(String(20), nullable=False, index=True)
@@ -118,6 +126,17 @@ class UserSession(DeclaredBase):
 class AuditLog(DeclaredBase):
     """Audit trail for access decisions and actions"""
     __tablename__ = "audit_logs"
+    # Composite indexes matching the audit log read path: equality filters
+    # first, then timestamp so results come back already in order
+    __table_args__ = (
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_logs_resource_id_timestamp", "resource_id", "timestamp"),
+        Index("ix_audit_logs_decision_timestamp", "decision", "timestamp"),
+        Index("ix_audit_logs_user_id_resource_id_timestamp", "user_id", "resource_id", "timestamp"),
+        Index("ix_audit_logs_user_id_resource_id_decision_timestamp", "user_id", "resource_id", "decision", "timestamp"),
+        # Rows rotated out of the SQLite hot table keep their ids, so ids must never be reused
+        {"sqlite_autoincrement": True},
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
@@ -130,7 +149,52 @@ class AuditLog(DeclaredBase):
     # Context at time of decision
     context: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
     
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(timezone.utc), index=True)
+    # Partition key: evaluated per row so each decision lands in its own period
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     
     # Optional additional details
-    details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
\ No newline at end of file
+    details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+class AuditDecisionRollup(DeclaredBase):
+    """Hourly allow/deny counts per user, resource, action and policy"""
+    __tablename__ = "audit_decision_rollups"
+    # Dimensions use 0 instead of NULL so the unique key can drive upserts
+    __table_args__ = (
+        UniqueConstraint("bucket", "user_id", "resource_id", "action_id", "policy_id", name="uq_audit_decision_rollups_key"),
+        Index("ix_audit_decision_rollups_user_id_bucket", "user_id", "bucket"),
+        Index("ix_audit_decision_rollups_resource_id_bucket", "resource_id", "bucket"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    resource_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    action_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    policy_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    allow_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    deny_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class AuditRollupWatermark(DeclaredBase):
+    """Last audit log row folded into a rollup, by (last_timestamp, last_audit_id)"""
+    __tablename__ = "audit_rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_audit_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class TableVersion(DeclaredBase):
+    """Write counter per table, used to build HTTP cache validators"""
+    __tablename__ = "table_versions"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SchemaVersion(DeclaredBase):
+    """Fingerprint of the schema last applied to this database"""
+    __tablename__ = "schema_version"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -1,14 +1,22 @@
 """
 ABAC management API endpoints
 """
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
 import os
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
-from backend.database import get_db
-from backend.dependencies import get_current_active_user_middleware, require_permission
+from backend.database import get_db, engine
+from backend.dependencies import (
+    get_current_active_user_middleware, require_permission, sparse_fields, conditional_get, bulk_items,
+    ndjson_stream
+)
 from backend.models.abac import User, Resource, Action, Attribute, Policy, AuditLog
 from backend.schemas.abac import (
     ResourceCreate, ResourceUpdate, Resource as ResourceSchema,
@@ -16,12 +24,51 @@ from backend.schemas.abac import (
     AttributeCreate, AttributeUpdate, Attribute as AttributeSchema,
     PolicyCreate, PolicyUpdate, Policy as PolicySchema,
     AuthorizationRequest, AuthorizationResponse,
-    AuditLog as AuditLogSchema
+    AuditLog as AuditLogSchema,
+    AuditDecisionRollup as AuditDecisionRollupSchema,
+    UserAttributeAssignment, ResourceAttributeAssignment, BulkWriteResult
 )
 from backend.services.abac_engine import ABACEngine
+from backend.services.audit import AuditLogService
+from backend.services.bulk import BulkService, BULK_DESCRIPTION
+from backend.services.loaders import eager
+from backend.services.projections import (
+    ProjectionService, FAST_PATH_DESCRIPTION,
+    RESOURCE_FIELDS, ACTION_FIELDS, ATTRIBUTE_FIELDS, POLICY_FIELDS
+)
+from backend.responses import FastJSONResponse, NDJSONResponse
+from backend.services.streaming import StreamRequest
+from backend.services.audit_rollup import AuditRollupService
+from backend.services.audit_export import AuditExportService, EXPORT_FORMATS, MEDIA_TYPES, require_pyarrow
 
 router = APIRouter(prefix="/abac", tags=["abac"])
 
+ON_CONFLICT_PATTERN = "^(update|skip|error)$"
+
+def _validate_items(schema, items: List[Any]) -> List[Dict[str, Any]]:
+    """Validate every bulk item in one pass, reporting all failures at once"""
+    try:
+        models = TypeAdapter(List[schema]).validate_python(items)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=jsonable_encoder(e.errors(include_url=False)),
+        )
+    return [model.model_dump(mode="json") for model in models]
+
+def _bulk_write(db: Session, received: int, write: Callable[[], int]) -> BulkWriteResult:
+    """Run a bulk write in one transaction and translate failures to HTTP errors"""
+    try:
+        written = write()
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Conflicting rows: {e.orig}")
+    return BulkWriteResult(received=received, written=written)
+
 # Resource management
 @router.post("/resources", response_model=ResourceSchema, status_code=status.HTTP_201_CREATED)
 def create_resource(
@@ -36,13 +83,38 @@ def create_resource(
     db.refresh(db_resource)
     return db_resource
 
+@router.post("/resources/bulk", response_model=BulkWriteResult, description=BULK_DESCRIPTION)
+def bulk_upsert_resources(
+    on_conflict: str = Query("update", pattern=ON_CONFLICT_PATTERN),
+    items: List[Any] = Depends(bulk_items),
+    db: Session = Depends(get_db),
+    _: bool = Depends(require_permission("/abac/resources", "create"))
+):
+    """Create or update resources by resource_uri in one transaction"""
+    resources = _validate_items(ResourceCreate, items)
+    return _bulk_write(db, len(items), lambda: BulkService.upsert_resources(db, resources, on_conflict))
+
+@router.post("/resource-attributes/bulk", response_model=BulkWriteResult)
+def bulk_assign_resource_attributes(
+    items: List[Any] = Depends(bulk_items),
+    db: Session = Depends(get_db),
+    _: bool = Depends(require_permission("/abac/resources", "update"))
+):
+    """Assign attributes to resources; existing assignments are kept"""
+    assignments = _validate_items(ResourceAttributeAssignment, items)
+    return _bulk_write(db, len(items), lambda: BulkService.assign_resource_attributes(db, assignments))
+
 @router.get("/resources", response_model=List[ResourceSchema])
 def list_resources(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     resource_type: Optional[str] = Query(None),
+    fast: bool = Query(False, description=FAST_PATH_DESCRIPTION),
+    fields: Optional[Set[str]] = Depends(sparse_fields(RESOURCE_FIELDS)),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
-    _: bool = Depends(require_permission("/abac/resources", "read"))
+    _: bool = Depends(require_permission("/abac/resources", "read")),
+    cache: Dict[str, str] = Depends(conditional_get("resources", "attributes"))
 ):
     """List resources with optional filtering"""
     query = db.query(Resource)
@@ -50,13 +122,19 @@ def list_resources(
     if resource_type:
         query = query.filter(Resource.resource_type == resource_type)
     
-    return query.offset(skip).limit(limit).all()
+    if stream:
+        return NDJSONResponse(ProjectionService.stream(engine, "resources", stream.window(query, skip), fields), headers=cache)
+    query = query.offset(skip).limit(limit)
+    if fast or fields:
+        return FastJSONResponse(ProjectionService.resources(db, query, fields), headers=cache)
+    return query.options(*eager(Resource.attributes)).all()
 
 @router.get("/resources/{resource_id}", response_model=ResourceSchema)
 def get_resource(
     resource_id: int,
     db: Session = Depends(get_db),
-    _: bool = Depends(require_permission("/abac/resources", "read"))
+    _: bool = Depends(require_permission("/abac/resources", "read")),
+    cache: Dict[str, str] = Depends(conditional_get("resources", "attributes"))
 ):
     """Get resource by ID"""
     resource = db.query(Resource).filter(Resource.id == resource_id).first()
@@ -123,8 +201,12 @@ def list_actions(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[str] = Query(None),
+    fast: bool = Query(False, description=FAST_PATH_DESCRIPTION),
+    fields: Optional[Set[str]] = Depends(sparse_fields(ACTION_FIELDS)),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
-    _: bool = Depends(require_permission("/abac/actions", "read"))
+    _: bool = Depends(require_permission("/abac/actions", "read")),
+    cache: Dict[str, str] = Depends(conditional_get("actions"))
 ):
     """List actions with optional filtering"""
     query = db.query(Action)
@@ -132,7 +214,12 @@ def list_actions(
     if category:
         query = query.filter(Action.category == category)
     
-    return query.offset(skip).limit(limit).all()
+    if stream:
+        return NDJSONResponse(ProjectionService.stream(engine, "actions", stream.window(query, skip), fields), headers=cache)
+    query = query.offset(skip).limit(limit)
+    if fast or fields:
+        return FastJSONResponse(ProjectionService.actions(db, query, fields), headers=cache)
+    return query.all()
 
 # Attribute management
 @router.post("/attributes", response_model=AttributeSchema, status_code=status.HTTP_201_CREATED)
@@ -148,14 +235,39 @@ def create_attribute(
     db.refresh(db_attribute)
     return db_attribute
 
+@router.post("/attributes/bulk", response_model=BulkWriteResult, description=BULK_DESCRIPTION)
+def bulk_upsert_attributes(
+    on_conflict: str = Query("update", pattern=ON_CONFLICT_PATTERN),
+    items: List[Any] = Depends(bulk_items),
+    db: Session = Depends(get_db),
+    _: bool = Depends(require_permission("/abac/attributes", "create"))
+):
+    """Create or update attributes by (attribute_type, name, value) in one transaction"""
+    attributes = _validate_items(AttributeCreate, items)
+    return _bulk_write(db, len(items), lambda: BulkService.upsert_attributes(db, attributes, on_conflict))
+
+@router.post("/user-attributes/bulk", response_model=BulkWriteResult)
+def bulk_assign_user_attributes(
+    items: List[Any] = Depends(bulk_items),
+    db: Session = Depends(get_db),
+    _: bool = Depends(require_permission("/abac/attributes", "update"))
+):
+    """Assign attributes to users; existing assignments are kept"""
+    assignments = _validate_items(UserAttributeAssignment, items)
+    return _bulk_write(db, len(items), lambda: BulkService.assign_user_attributes(db, assignments))
+
 @router.get("/attributes", response_model=List[AttributeSchema])
 def list_attributes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     attribute_type: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
+    fast: bool = Query(False, description=FAST_PATH_DESCRIPTION),
+    fields: Optional[Set[str]] = Depends(sparse_fields(ATTRIBUTE_FIELDS)),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
-    _: bool = Depends(require_permission("/abac/attributes", "read"))
+    _: bool = Depends(require_permission("/abac/attributes", "read")),
+    cache: Dict[str, str] = Depends(conditional_get("attributes"))
 ):
     """List attributes with optional filtering"""
     query = db.query(Attribute)
@@ -166,7 +278,12 @@ def list_attributes(
     if is_active is not None:
         query = query.filter(Attribute.is_active == is_active)
     
-    return query.offset(skip).limit(limit).all()
+    if stream:
+        return NDJSONResponse(ProjectionService.stream(engine, "attributes", stream.window(query, skip), fields), headers=cache)
+    query = query.offset(skip).limit(limit)
+    if fast or fields:
+        return FastJSONResponse(ProjectionService.attributes(db, query, fields), headers=cache)
+    return query.all()
 
 # Policy management
 @router.post("/policies", response_model=PolicySchema, status_code=status.HTTP_201_CREATED)
@@ -188,8 +305,12 @@ def list_policies(
     limit: int = Query(100, ge=1, le=1000),
     is_active: Optional[bool] = Query(None),
     effect: Optional[str] = Query(None),
+    fast: bool = Query(False, description=FAST_PATH_DESCRIPTION),
+    fields: Optional[Set[str]] = Depends(sparse_fields(POLICY_FIELDS)),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
-    _: bool = Depends(require_permission("/abac/policies", "read"))
+    _: bool = Depends(require_permission("/abac/policies", "read")),
+    cache: Dict[str, str] = Depends(conditional_get("policies", "actions"))
 ):
     """List policies with optional filtering"""
     query = db.query(Policy)
@@ -200,7 +321,13 @@ def list_policies(
     if effect:
         query = query.filter(Policy.effect == effect)
     
-    return query.order_by(Policy.priority.desc()).offset(skip).limit(limit).all()
+    query = query.order_by(Policy.priority.desc())
+    if stream:
+        return NDJSONResponse(ProjectionService.stream(engine, "policies", stream.window(query, skip), fields), headers=cache)
+    query = query.offset(skip).limit(limit)
+    if fast or fields:
+        return FastJSONResponse(ProjectionService.policies(db, query, fields), headers=cache)
+    return query.options(*eager(Policy.action)).all()
 
 @router.put("/policies/{policy_id}", response_model=PolicySchema)
 def update_policy(
@@ -241,19 +368,66 @@ def get_audit_logs(
     user_id: Optional[int] = Query(None),
     resource_id: Optional[int] = Query(None),
     decision: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Only logs at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only logs at or before this time"),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
     _: bool = Depends(require_permission("/abac/audit-logs", "read"))
 ):
-    """Get audit logs with optional filtering"""
-    query = db.query(AuditLog)
-    
-    if user_id:
-        query = query.filter(AuditLog.user_id == user_id)
-    
-    if resource_id:
-        query = query.filter(AuditLog.resource_id == resource_id)
-    
-    if decision:
-        query = query.filter(AuditLog.decision == decision)
-    
-    return query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+    """Get audit logs with optional filtering; send Accept: application/x-ndjson to stream every match"""
+    if stream:
+        query = AuditLogService.build_query(db, user_id, resource_id, decision, since, until)
+        return NDJSONResponse(AuditLogService.stream(engine, stream.window(query, skip)))
+    return AuditLogService.get_audit_logs(
+        db, skip=skip, limit=limit, user_id=user_id, resource_id=resource_id,
+        decision=decision, since=since, until=until
+    )
+
+@router.get("/audit-logs/export")
+def export_audit_logs(
+    format: str = Query("parquet", description="parquet or arrow (IPC stream)"),
+    user_id: Optional[int] = Query(None),
+    resource_id: Optional[int] = Query(None),
+    decision: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    _: bool = Depends(require_permission("/abac/audit-logs", "read"))
+):
+    """Stream audit logs as a Parquet file or Arrow IPC stream"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    # The stream opens its own connection: the request session closes before the body is sent
+    chunks = AuditExportService.iter_bytes(
+        engine, format, user_id=user_id, resource_id=resource_id,
+        decision=decision, since=since, until=until
+    )
+    extension = "parquet" if format == "parquet" else "arrows"
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="audit_logs.{extension}"'},
+    )
+
+@router.get("/audit-rollups", response_model=List[AuditDecisionRollupSchema])
+def get_audit_rollups(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    user_id: Optional[int] = Query(None, description="0 selects decisions without a user"),
+    resource_id: Optional[int] = Query(None, description="0 selects decisions without a resource"),
+    action_id: Optional[int] = Query(None, description="0 selects decisions without an action"),
+    policy_id: Optional[int] = Query(None, description="0 selects decisions without a matching policy"),
+    db: Session = Depends(get_db),
+    _: bool = Depends(require_permission("/abac/audit-logs", "read"))
+):
+    """Get hourly allow/deny counts from the pre-aggregated rollups"""
+    return AuditRollupService.get_rollups(
+        db, since=since, until=until, user_id=user_id, resource_id=resource_id,
+        action_id=action_id, policy_id=policy_id, skip=skip, limit=limit
+    )
@@ -0,0 +1,341 @@
+"""
+SQL execution API endpoints
+"""
+import base64
+import time
+from typing import List, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.exc import DBAPIError, InvalidRequestError
+
+from backend.dependencies import arrow_stream, get_current_active_user_middleware, require_permission
+from backend.models.abac import User
+from backend.responses import EventStreamResponse, FastJSONResponse, server_sent_event
+from backend.schemas.query import (
+    DataSource, ExtractRequest, QueryCancellation, QueryExtract, QueryJobRequest, QueryJobStatus, QueryPage,
+    QueryRequest, QueryStatus, QueryStreamRequest, ResultCacheStats, StatementCacheStats
+)
+from backend.services.arrow_results import (
+    ARROW_STREAM_MEDIA_TYPE, ArrowPageResponse, decode_page, encode_page, load_pyarrow, table_rows
+)
+from backend.services.data_sources import data_sources
+from backend.services.query_admission import QueryRejected
+from backend.services.query_execution import (
+    QUERY_READ_ONLY, QueryCancelled, QueryExecutionService, QueryTimeout, ResultNotFound
+)
+from backend.services.query_workers import JobNotFound, extract_job, query_job, query_workers
+from backend.services.result_cache import result_cache
+from backend.services.statement_cache import statement_cache
+
+router = APIRouter(prefix="/query", tags=["query"])
+
+
+@router.get("/sources", response_model=List[DataSource])
+def list_sources(_: bool = Depends(require_permission("/query", "read"))):
+    """List the data sources queries can run against, with the extracts of DuckDB sources"""
+    sources = []
+    for name in data_sources.names():
+        dialect = data_sources.dialect(name)
+        extracts = []
+        if dialect == "duckdb":
+            try:
+                extracts = data_sources.duckdb(name).views()
+            except RuntimeError:
+                # duckdb is not installed; queries against the source say so
+                pass
+        sources.append(DataSource(name=name, dialect=dialect, extracts=extracts))
+    return sources
+
+
+def _query_errors(e: Exception) -> HTTPException:
+    """Translate query failures to HTTP errors"""
+    if isinstance(e, QueryTimeout):
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    if isinstance(e, QueryCancelled):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if isinstance(e, (ResultNotFound, JobNotFound)):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    if isinstance(e, QueryRejected):
+        return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if isinstance(e, InvalidRequestError):
+        # e.g. the result of a PRAGMA, SET or DDL statement, which has no rows to read
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Only statements that return rows can be run here"
+        )
+    if isinstance(e, DBAPIError):
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e.orig))
+    if isinstance(e, RuntimeError):
+        # An optional dependency the source needs is not installed
+        return HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def user_context(current_user: User = Depends(get_current_active_user_middleware)) -> Tuple[Tuple[str, str], ...]:
+    """The user's active attributes, which scope cached results"""
+    return tuple(sorted((attr.name, attr.value) for attr in current_user.attributes if attr.is_active))
+
+
+@router.get("/cache", response_model=ResultCacheStats)
+def result_cache_stats(_: bool = Depends(require_permission("/query", "read"))):
+    """Hit ratios and sizes of the result cache on the worker that answers"""
+    return ResultCacheStats(**result_cache.stats())
+
+
+@router.get("/statements", response_model=List[StatementCacheStats])
+def statement_cache_stats(_: bool = Depends(require_permission("/query", "admin"))):
+    """
+    Prepared statement hit ratios per data source on the worker that answers, with
+    the most run query shapes; admins only, since shapes show other users' queries
+    """
+    return [StatementCacheStats(**source) for source in statement_cache.stats()]
+
+
+@router.post("/execute", response_model=QueryPage)
+async def execute_query(
+    query: QueryRequest,
+    context: Tuple[Tuple[str, str], ...] = Depends(user_context),
+    arrow: bool = Depends(arrow_stream),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """
+    Run a read-only query and return its first page; `has_more` says whether more pages follow.
+    Send `Accept: application/vnd.apache.arrow.stream` for an Arrow IPC stream with the page
+    fields in its schema metadata. The query waits for a free slot first; see its status.
+    """
+    if query.source not in data_sources.sources:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown data source: {query.source}")
+    try:
+        page = await QueryExecutionService.execute(
+            query.sql,
+            source=query.source,
+            query_id=query.query_id,
+            timeout_seconds=query.timeout_seconds,
+            page_size=query.page_size,
+            max_rows=query.max_rows,
+            user_context=context,
+            use_cache=query.use_cache,
+            arrow=arrow,
+            user_id=current_user.id,
+            preview=query.preview,
+            parameters=query.parameters,
+        )
+    except (QueryTimeout, QueryCancelled, ValueError, DBAPIError, InvalidRequestError, RuntimeError) as e:
+        raise _query_errors(e)
+    return ArrowPageResponse(page) if arrow else FastJSONResponse(page)
+
+
+@router.post("/stream")
+async def stream_query(
+    query: QueryStreamRequest,
+    context: Tuple[Tuple[str, str], ...] = Depends(user_context),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """
+    Run a read-only query and stream its pages as Server-Sent Events while they are read.
+    Each `page` event (a QueryPage) is followed by a `progress` event with the rows and bytes
+    sent and the time taken; the stream ends with a `done` event, or an `error` event with
+    the status code the query would have failed with. If `done` says `has_more`, the rest is
+    paged as usual. Cancel with DELETE /query/{query_id}. With `arrow`, a page event is
+    `{"arrow": ...}`, the page as the base64 of the Arrow IPC stream the page endpoint sends.
+    """
+    if query.source not in data_sources.sources:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown data source: {query.source}")
+    arrow = query.arrow and load_pyarrow() is not None
+
+    async def events():
+        started = time.perf_counter()
+        rows = sent = 0
+        page = None
+        try:
+            async for page in QueryExecutionService.stream(
+                query.sql,
+                source=query.source,
+                query_id=query.query_id,
+                timeout_seconds=query.timeout_seconds,
+                page_size=query.page_size,
+                max_rows=query.max_rows,
+                user_context=context,
+                use_cache=query.use_cache,
+                user_id=current_user.id,
+                preview=query.preview,
+                stream_rows=query.stream_rows,
+                parameters=query.parameters,
+                arrow=arrow,
+            ):
+                if arrow:
+                    event = server_sent_event("page", {"arrow": base64.b64encode(encode_page(page)).decode("ascii")})
+                else:
+                    event = server_sent_event("page", page)
+                rows += page["row_count"]
+                sent += len(event)
+                yield event
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+                yield server_sent_event("progress", {"rows": rows, "bytes": sent, "elapsed_ms": elapsed_ms})
+        except (
+            QueryTimeout, QueryCancelled, ResultNotFound, ValueError, DBAPIError, InvalidRequestError, RuntimeError
+        ) as e:
+            error = _query_errors(e)
+            yield server_sent_event("error", {"status": error.status_code, "detail": error.detail})
+            return
+        yield server_sent_event("done", {
+            "query_id": page["query_id"],
+            "rows": rows,
+            "has_more": page["has_more"],
+            "truncated": page["truncated"],
+            "execution_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        })
+
+    return EventStreamResponse(events())
+
+
+@router.post("/extracts", response_model=QueryExtract)
+async def save_extract(
+    extract: ExtractRequest,
+    context: Tuple[Tuple[str, str], ...] = Depends(user_context),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "create"))
+):
+    """
+    Run a query and save its whole result as a Parquet extract of a DuckDB source,
+    where it can be queried as a view named after the extract. Runs as a scheduled
+    job on the query worker pool.
+    """
+    for name in (extract.source, extract.target):
+        if name not in data_sources.sources:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown data source: {name}")
+    if data_sources.dialect(extract.target) != "duckdb":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Extracts are saved to DuckDB sources")
+    try:
+        directory = data_sources.duckdb(extract.target, read_only=QUERY_READ_ONLY).extracts
+        if not directory:
+            raise ValueError(f"Data source {extract.target} has no extracts directory")
+        job = query_workers.submit(
+            extract_job, extract.name, directory, extract.sql, extract.source, extract.timeout_seconds, context,
+            user_id=current_user.id, source=extract.source, priority="scheduled",
+        )
+        result = await query_workers.wait(job)
+        if result is None:
+            raise QueryCancelled(f"Extract {extract.name} was cancelled")
+    except (QueryTimeout, QueryCancelled, ValueError, DBAPIError, InvalidRequestError, RuntimeError) as e:
+        raise _query_errors(e)
+    return QueryExtract(name=extract.name, target=extract.target, **result)
+
+
+@router.post("/jobs", response_model=QueryJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job: QueryJobRequest,
+    context: Tuple[Tuple[str, str], ...] = Depends(user_context),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """
+    Queue a query whose whole result is read in a worker process; poll the job,
+    then collect the result from the worker that accepted it
+    """
+    if job.source not in data_sources.sources:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown data source: {job.source}")
+    try:
+        queued = query_workers.submit(
+            query_job, job.sql, job.source, job.timeout_seconds, job.max_rows, context,
+            user_id=current_user.id, source=job.source, priority=job.priority,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return queued.describe()
+
+
+@router.get("/jobs/{job_id}", response_model=QueryJobStatus)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """State of a query job"""
+    try:
+        return query_workers.get(job_id, current_user.id).describe()
+    except JobNotFound as e:
+        raise _query_errors(e)
+
+
+@router.get("/jobs/{job_id}/result", response_model=QueryPage)
+async def get_job_result(
+    job_id: str,
+    arrow: bool = Depends(arrow_stream),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """The whole result of a finished job, as one page; Arrow IPC on request"""
+    try:
+        job = query_workers.get(job_id, current_user.id)
+    except JobNotFound as e:
+        raise _query_errors(e)
+    if job.status == "failed":
+        raise _query_errors(job.exception)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Query job {job_id} is {job.status}")
+    if arrow:
+        # Already encoded by the worker process
+        return Response(job.result, media_type=ARROW_STREAM_MEDIA_TYPE)
+    page = decode_page(job.result)
+    page["rows"] = table_rows(page["rows"])
+    return FastJSONResponse(page)
+
+
+@router.delete("/jobs/{job_id}", response_model=QueryJobStatus)
+async def cancel_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """Drop a queued job, or discard the result of a running one"""
+    try:
+        job = query_workers.get(job_id, current_user.id)
+    except JobNotFound as e:
+        raise _query_errors(e)
+    query_workers.cancel(job)
+    return job.describe()
+
+
+@router.get("/{query_id}/pages/{page}", response_model=QueryPage)
+async def fetch_query_page(
+    query_id: str,
+    page: int,
+    arrow: bool = Depends(arrow_stream),
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """Read the next page of an open result; pages are served in order and the result is released after the last"""
+    try:
+        result = await QueryExecutionService.fetch_page(query_id, page, arrow=arrow, user_id=current_user.id)
+    except (QueryTimeout, QueryCancelled, ResultNotFound, ValueError, DBAPIError, InvalidRequestError) as e:
+        raise _query_errors(e)
+    return ArrowPageResponse(result) if arrow else FastJSONResponse(result)
+
+
+@router.get("/{query_id}/status", response_model=QueryStatus)
+def query_status(
+    query_id: str,
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """Whether a query is still queued for a slot, and its place in the queue, on the worker holding it"""
+    try:
+        return QueryStatus(**QueryExecutionService.status(query_id, current_user.id))
+    except ResultNotFound as e:
+        raise _query_errors(e)
+
+
+@router.delete("/{query_id}", response_model=QueryCancellation)
+def cancel_query(
+    query_id: str,
+    current_user: User = Depends(get_current_active_user_middleware),
+    _: bool = Depends(require_permission("/query", "read"))
+):
+    """
+    Cancel one of your running queries or release its open result, whichever worker
+    holds it. Anyone who may run queries may stop their own; others' are not touched.
+    """
+    return QueryCancellation(
+        query_id=query_id, running_here=QueryExecutionService.cancel(query_id, current_user.id)
+    )
@@ -2,14 +2,17 @@
 User management API endpoints
 """
 
-from typing import List, Optional
+from typing import List, Optional, Set
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
-from backend.database import get_db
+from backend.database import get_db, engine
 from backend.services.auth import AuthService
 from backend.schemas.abac import User, UserCreate, UserUpdate
-from backend.dependencies import get_current_active_user_middleware
+from backend.dependencies import get_current_active_user_middleware, sparse_fields, ndjson_stream
+from backend.responses import FastJSONResponse, NDJSONResponse
+from backend.services.streaming import StreamRequest
+from backend.services.projections import ProjectionService, FAST_PATH_DESCRIPTION, USER_FIELDS
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -18,11 +21,21 @@ router = APIRouter(prefix="/users", tags=["users"])
 def get_users(
     skip: int = Query(0, ge=0, description="Number of users to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of users to return"),
-    search: Optional[str] = Query(None, description="Search by username or email"),
+    search: Optional[str] = Query(None, description="Search by username or email, prefix matches ranked first"),
+    fast: bool = Query(False, description=FAST_PATH_DESCRIPTION),
+    fields: Optional[Set[str]] = Depends(sparse_fields(USER_FIELDS)),
+    stream: Optional[StreamRequest] = Depends(ndjson_stream),
     db: Session = Depends(get_db),
 ):
     """Get list of users with pagination and search"""
     # TODO: Add proper authorization check here
+    if stream:
+        query = stream.window(AuthService.users_query(db, search), skip)
+        return NDJSONResponse(ProjectionService.stream(engine, "users", query, fields))
+    if fast or fields:
+        query = AuthService.users_query(db, search).offset(skip).limit(limit)
+        return FastJSONResponse(ProjectionService.users(db, query, fields))
+
     users = AuthService.get_users(db, skip=skip, limit=limit, search=search)
     return users
 
@@ -94,9 +94,24 @@ class Resource(ResourceBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
+    # The ORM column is `metadata_`; `metadata` is the SQLAlchemy MetaData
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias="metadata_")
     created_at: datetime
     attributes: List[Attribute] = []
 
+# Bulk write schemas
+class UserAttributeAssignment(BaseModel):
+    user_id: int
+    attribute_id: int
+
+class ResourceAttributeAssignment(BaseModel):
+    resource_id: int
+    attribute_id: int
+
+class BulkWriteResult(BaseModel):
+    received: int
+    written: int
+
 # Action schemas
 class ActionBase(BaseModel):
     name: str = Field(..., max_length=50)
@@ -191,4 +206,14 @@ class AuditLog(AuditLogBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+class AuditDecisionRollup(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bucket: datetime
+    user_id: int
+    resource_id: int
+    action_id: int
+    policy_id: int
+    allow_count: int
+    deny_count: int
@@ -0,0 +1,130 @@
+"""
+Pydantic schemas for SQL execution
+"""
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+class QueryRequest(BaseModel):
+    sql: str = Field(..., min_length=1)
+    # One of GET /query/sources; there is no default source
+    source: str = Field(..., min_length=1)
+    # Chosen by the client so it can cancel before the response arrives
+    query_id: Optional[str] = Field(None, max_length=64, pattern=r"^[A-Za-z0-9_-]+$")
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    # Rows in each page; later pages are read from the open result
+    page_size: Optional[int] = Field(None, ge=1)
+    max_rows: Optional[int] = Field(None, ge=1)
+    # False to run against the source even when a cached result is valid
+    use_cache: bool = True
+    # Read a sample of the table, for a quick look at a large one
+    preview: bool = False
+    # Values for :name placeholders in the SQL; runs that differ only in these
+    # reuse one prepared statement
+    parameters: Optional[Dict[str, Any]] = None
+
+class QueryStreamRequest(QueryRequest):
+    # Rows sent as events before the rest is left to be paged; None for the server's default
+    stream_rows: Optional[int] = Field(None, ge=1)
+    # Send each page as a base64 Arrow IPC stream, like the page endpoint's, in
+    # the event's `arrow` field; pages are JSON when the server has no pyarrow
+    arrow: bool = False
+
+class QueryPage(BaseModel):
+    query_id: str
+    source: str
+    columns: List[str]
+    page: int
+    rows: List[List[Any]]
+    row_count: int
+    # False once the result is exhausted and its handle released
+    has_more: bool
+    truncated: bool
+    execution_time_ms: float
+    # Served from the result cache rather than the source
+    cached: bool = False
+    # Read from a sample of the table rather than all of it
+    sampled: bool = False
+
+class QueryCancellation(BaseModel):
+    query_id: str
+    # True when the query was running on the worker that took the request;
+    # otherwise the cancellation was broadcast to the others
+    running_here: bool
+
+class QueryStatus(BaseModel):
+    query_id: str
+    # Queued while waiting for a slot for the user or the data source
+    state: Literal["queued", "running"]
+    # Place in the data source's queue, from 1
+    position: Optional[int] = None
+    waiting_for: Optional[Literal["user", "source"]] = None
+
+class ResultCacheStats(BaseModel):
+    """Result cache counters of the worker that answered"""
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    stores: int
+    evictions: int
+    hit_ratio: float
+    memory_hit_ratio: float
+    memory_entries: int
+    memory_bytes: int
+    disk_entries: int
+    disk_bytes: int
+
+class StatementShape(BaseModel):
+    # The SQL with its literals replaced by ?
+    shape: str
+    executions: int
+    hits: int
+    # Distinct statements run with this shape, counted up to 100; more than one
+    # means literals that could be sent as parameters
+    statements: int
+
+class StatementCacheStats(BaseModel):
+    """Prepared statement reuse for one data source on the worker that answered"""
+    source: str
+    hits: int
+    misses: int
+    hit_ratio: float
+    # Most run first
+    shapes: List[StatementShape]
+
+class QueryJobRequest(BaseModel):
+    sql: str = Field(..., min_length=1)
+    source: str = Field(..., min_length=1)
+    # Interactive jobs start before scheduled ones
+    priority: Literal["interactive", "scheduled"] = "interactive"
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    max_rows: Optional[int] = Field(None, ge=1)
+
+class QueryJobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed", "cancelled"]
+    priority: str
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class ExtractRequest(BaseModel):
+    # Also the name of the view the extract is queried as
+    name: str = Field(..., pattern=r"^[A-Za-z_][A-Za-z0-9_]{0,62}$")
+    sql: str = Field(..., min_length=1)
+    source: str = Field(..., min_length=1)
+    # DuckDB source whose extracts directory receives the file
+    target: str
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+
+class QueryExtract(BaseModel):
+    name: str
+    target: str
+    row_count: int
+    truncated: bool
+
+class DataSource(BaseModel):
+    name: str
+    dialect: str
+    # Views over the Parquet and CSV extracts of DuckDB sources
+    extracts: List[str] = []
@@ -2,9 +2,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.lifespan import lifespan
-from backend.database import create_tables
-from backend.routers import auth, abac, users
-from backend.middleware import AuthMiddleware
+from backend.routers import auth, abac, users, query
+from backend.middleware import AuthMiddleware, CompressionMiddleware
 from backend.services.auth import SECRET_KEY, ALGORITHM
 import os
 
@@ -28,6 +27,9 @@ app.add_middleware(
 
 app.add_middleware(AuthMiddleware, secret_key=SECRET_KEY, algorithm=ALGORITHM)
 
+# Outermost, so it sees the final headers of every response
+app.add_middleware(CompressionMiddleware)
+
 # Add CORS middleware
 
 
@@ -35,11 +37,7 @@ app.add_middleware(AuthMiddleware, secret_key=SECRET_KEY, algorithm=ALGORITHM)
 app.include_router(auth.router, prefix="/v1")
 app.include_router(abac.router, prefix="/v1")
 app.include_router(users.router, prefix="/v1")
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    create_tables()
+app.include_router(query.router, prefix="/v1")
 
 @app.get("/")
 async def root():
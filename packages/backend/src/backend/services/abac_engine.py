@@ -3,13 +3,28 @@ ABAC Policy Decision Point (PDP) Engine
 Evaluates policies against user, resource, action, and environment attributes
 """
 import json
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
 from backend.models.abac import User, Resource, Action, Attribute, Policy, AuditLog
 from backend.schemas.abac import AuthorizationRequest, AuthorizationResponse, PolicyEffect, EvaluationContext
+from backend.services.cache_bus import TableCache, cache_seconds
+
+# Applicable policies per action, shared by every request in the worker and
+# emptied on any policy write, here or on another worker; off by default with
+# the memory bus, which cannot tell the other workers
+POLICY_CACHE_SECONDS = cache_seconds("FASTSET_POLICY_CACHE_SECONDS", 60)
+applicable_policies = TableCache(("policies",), POLICY_CACHE_SECONDS)
+
+
+class PolicyRule(NamedTuple):
+    """The parts of a policy evaluation needs, detached from any session"""
+    id: int
+    name: str
+    effect: str
+    conditions: Dict[str, Any]
 
 class ABACEngine:
     """ABAC Policy Decision Point for evaluating access requests"""
@@ -124,8 +139,12 @@ class ABACEngine:
             environment_attributes=env_attrs
         )
     
-    def _get_applicable_policies(self, action_id: Optional[int]) -> List[Policy]:
+    def _get_applicable_policies(self, action_id: Optional[int]) -> List[PolicyRule]:
         """Get policies applicable to the action, sorted by priority"""
+        cached = applicable_policies.get(action_id)
+        if cached is not None:
+            return cached
+
         query = self.db.query(Policy).filter(Policy.is_active == True)
         
         # Get policies for specific action or global policies
@@ -134,11 +153,14 @@ class ABACEngine:
         else:
             query = query.filter(Policy.action_id.is_(None))
         
-        return query.order_by(Policy.priority.desc(), Policy.created_at.asc()).all()
+        query = query.order_by(Policy.priority.desc(), Policy.created_at.asc())
+        rules = [PolicyRule(*row) for row in query.with_entities(Policy.id, Policy.name, Policy.effect, Policy.conditions)]
+        applicable_policies.set(action_id, rules)
+        return rules
     
     def _evaluate_policies(
         self, 
-        policies: List[Policy], 
+        policies: List[PolicyRule], 
         context: EvaluationContext
     ) -> Tuple[PolicyEffect, Optional[int], str]:
         """Evaluate policies against context"""
@@ -0,0 +1,96 @@
+"""
+Arrow encoding of query results
+Pages are sent as Arrow IPC streams when the client asks for them with
+`Accept: application/vnd.apache.arrow.stream`: the rows as record batches, and
+the page fields as JSON in the schema metadata. Cached results are sliced out
+of their Arrow tables without converting them back to Python values.
+
+Requires the optional `analytics` extra (pyarrow); without it pages are JSON.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Response
+
+from backend.responses import dumps
+
+# Imported by load_pyarrow() on first use: pyarrow is the slowest import in the backend
+pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PAGE_METADATA_KEY = b"fastset.page"
+
+
+def load_pyarrow() -> Optional[Any]:
+    """The pyarrow module, or None when it is not installed"""
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc  # noqa: F401
+        except ImportError:
+            return None
+        pa = pyarrow
+    return pa
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode("utf-8")
+    return str(value)
+
+
+def to_arrow(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> Tuple[Any, bool]:
+    """
+    Rows as an Arrow table, and whether it holds every value unchanged.
+    Columns Arrow cannot hold as they are (UUIDs, mixed types, nested values whose
+    structs would gain missing keys) are sent as text.
+    """
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    arrays = []
+    exact = True
+    for column in values:
+        try:
+            array = pa.array(column)
+        except pa.ArrowException:
+            array = None
+        if array is None or pa.types.is_nested(array.type):
+            array = pa.array([_as_text(value) for value in column], pa.string())
+            exact = False
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=list(columns)), exact
+
+
+def table_rows(table) -> List[List[Any]]:
+    """An Arrow table's rows as lists of Python values"""
+    return [list(row) for row in zip(*(column.to_pylist() for column in table.columns))]
+
+
+def encode_page(page: Dict[str, Any]) -> bytes:
+    """A page whose rows are an Arrow table, as an IPC stream"""
+    fields = {key: value for key, value in page.items() if key != "rows"}
+    table = page["rows"].replace_schema_metadata({PAGE_METADATA_KEY: dumps(fields)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_page(data: bytes) -> Dict[str, Any]:
+    """Inverse of encode_page"""
+    load_pyarrow()
+    table = pa.ipc.open_stream(data).read_all()
+    page = json.loads(table.schema.metadata[PAGE_METADATA_KEY])
+    page["rows"] = table
+    return page
+
+
+class ArrowPageResponse(Response):
+    """A query page as an Arrow IPC stream"""
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def render(self, content: Dict[str, Any]) -> bytes:
+        return encode_page(content)
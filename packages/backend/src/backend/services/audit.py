@@ -0,0 +1,72 @@
+"""
+Audit log query service
+Shared by the audit log API and the index/query plan harness
+"""
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, Query
+
+from backend.models.abac import AuditLog
+from backend.services.audit_partitions import AuditPartitionManager
+from backend.services.streaming import iter_ndjson
+
+# Columns of the audit log API payload
+AUDIT_LOG_FIELDS = ("id", "timestamp", "user_id", "resource_id", "action_id", "decision", "policy_id", "context", "details")
+
+
+class AuditLogService:
+    """Read path for the audit trail"""
+
+    @staticmethod
+    def build_query(
+        db: Session,
+        user_id: Optional[int] = None,
+        resource_id: Optional[int] = None,
+        decision: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Query:
+        """Build the filtered, newest-first audit log query"""
+        # Only partitions overlapping [since, until] are read
+        logs = AuditPartitionManager.read_source(db, since, until)
+        query = db.query(logs)
+
+        if user_id:
+            query = query.filter(logs.user_id == user_id)
+
+        if resource_id:
+            query = query.filter(logs.resource_id == resource_id)
+
+        if decision:
+            query = query.filter(logs.decision == decision)
+
+        if since:
+            query = query.filter(logs.timestamp >= since)
+
+        if until:
+            query = query.filter(logs.timestamp <= until)
+
+        return query.order_by(logs.timestamp.desc())
+
+    @staticmethod
+    def get_audit_logs(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        user_id: Optional[int] = None,
+        resource_id: Optional[int] = None,
+        decision: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[AuditLog]:
+        """Get a page of audit logs with optional filtering"""
+        query = AuditLogService.build_query(db, user_id, resource_id, decision, since, until)
+        return query.offset(skip).limit(limit).all()
+
+    @staticmethod
+    def stream(engine: Engine, query: Query) -> Iterator[bytes]:
+        """Stream a built audit log query as NDJSON"""
+        logs = query.column_descriptions[0]["entity"]
+        statement = query.with_entities(*[getattr(logs, name) for name in AUDIT_LOG_FIELDS]).statement
+        return iter_ndjson(engine, statement)
@@ -0,0 +1,208 @@
+"""
+Columnar audit log export
+Streams audit rows through a server-side cursor and writes Arrow IPC streams or
+Parquet files, so memory is bounded by the chunk size rather than the row count.
+
+Requires the optional `analytics` extra (pyarrow).
+
+CLI:
+    uv run fastset-audit-export --format parquet --output audit.parquet --since 2025-01-01
+"""
+import argparse
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from backend.services.audit import AuditLogService
+
+# Imported by require_pyarrow() on first use: pyarrow is the slowest import in the backend
+pa = None
+pq = None
+
+DEFAULT_CHUNK_SIZE = 10_000
+EXPORT_FORMATS = ("arrow", "parquet")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Context keys that are not flattened into their own column end up here as JSON
+CONTEXT_EXTRA_COLUMN = "context_extra"
+
+
+def require_pyarrow() -> None:
+    """Import pyarrow, failing with an actionable message when it is not installed"""
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Audit export requires pyarrow: install fastset-backend[analytics]")
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+def _context_value(value: Any) -> Optional[str]:
+    """Store flattened context values as strings so the schema stays stable"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+class _ChunkSink:
+    """Write-only file object whose buffered bytes are drained between batches"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class AuditExportService:
+    """Streams audit logs as Arrow record batches"""
+
+    @staticmethod
+    def schema(context_keys: Sequence[str]) -> "pa.Schema":
+        """Arrow schema with one string column per flattened context key"""
+        require_pyarrow()
+        fields = [
+            pa.field("id", pa.int64()),
+            pa.field("timestamp", pa.timestamp("us", tz="UTC")),
+            pa.field("user_id", pa.int64()),
+            pa.field("resource_id", pa.int64()),
+            pa.field("action_id", pa.int64()),
+            pa.field("policy_id", pa.int64()),
+            pa.field("decision", pa.string()),
+            pa.field("details", pa.string()),
+        ]
+        fields += [pa.field(f"context_{key}", pa.string()) for key in context_keys]
+        fields.append(pa.field(CONTEXT_EXTRA_COLUMN, pa.string()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def iter_record_batches(
+        engine: Engine,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        context_keys: Optional[Sequence[str]] = None,
+        **filters,
+    ) -> Iterator["pa.RecordBatch"]:
+        """
+        Yield record batches of at most chunk_size rows
+        When context_keys is not given, the keys of the first chunk become columns
+        """
+        require_pyarrow()
+        with engine.connect() as conn:
+            db = Session(bind=conn)
+            statement = AuditLogService.build_query(db, **filters).statement
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement)
+            schema = None
+            for rows in result.mappings().partitions(chunk_size):
+                if schema is None:
+                    if context_keys is None:
+                        context_keys = sorted({key for row in rows for key in (row["context"] or {})})
+                    schema = AuditExportService.schema(context_keys)
+                yield AuditExportService._to_batch(rows, schema, context_keys)
+
+    @staticmethod
+    def _to_batch(rows: List[Dict[str, Any]], schema: "pa.Schema", context_keys: Sequence[str]) -> "pa.RecordBatch":
+        """Pivot a chunk of rows into columns, flattening context"""
+        columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        flattened = set(context_keys)
+        for row in rows:
+            for name in ("id", "timestamp", "user_id", "resource_id", "action_id", "policy_id", "decision", "details"):
+                columns[name].append(row[name])
+            context = row["context"] or {}
+            for key in context_keys:
+                columns[f"context_{key}"].append(_context_value(context.get(key)))
+            extra = {k: v for k, v in context.items() if k not in flattened}
+            columns[CONTEXT_EXTRA_COLUMN].append(json.dumps(extra, default=str) if extra else None)
+        return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+    @staticmethod
+    def iter_bytes(engine: Engine, export_format: str = "parquet", **kwargs) -> Iterator[bytes]:
+        """Encode the export incrementally, yielding bytes after every batch"""
+        require_pyarrow()
+        sink = _ChunkSink()
+        writer = None
+        for batch in AuditExportService.iter_record_batches(engine, **kwargs):
+            if writer is None:
+                writer = AuditExportService._open_writer(sink, batch.schema, export_format)
+            if export_format == "parquet":
+                writer.write_batch(batch, row_group_size=batch.num_rows)
+            else:
+                writer.write_batch(batch)
+            yield sink.drain()
+
+        if writer is None:
+            # No rows: still emit a valid, empty file
+            writer = AuditExportService._open_writer(sink, AuditExportService.schema([]), export_format)
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _open_writer(sink: _ChunkSink, schema: "pa.Schema", export_format: str):
+        """Open a Parquet or Arrow IPC stream writer over sink"""
+        if export_format == "parquet":
+            return pq.ParquetWriter(sink, schema, compression="zstd")
+        return pa.ipc.new_stream(sink, schema)
+
+    @staticmethod
+    def export_to_file(engine: Engine, path: str, export_format: str = "parquet", **kwargs) -> int:
+        """Write the export to path and return the number of bytes written"""
+        written = 0
+        with open(path, "wb") as f:
+            for chunk in AuditExportService.iter_bytes(engine, export_format, **kwargs):
+                f.write(chunk)
+                written += len(chunk)
+        return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """CLI entry point for offline audit exports"""
+    parser = argparse.ArgumentParser(description="Export audit logs to Parquet or Arrow IPC")
+    parser.add_argument("--output", required=True, help="Destination file")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--resource-id", type=int, default=None)
+    parser.add_argument("--decision", choices=("ALLOW", "DENY"), default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from backend.database import engine
+
+    written = AuditExportService.export_to_file(
+        engine,
+        args.output,
+        args.format,
+        chunk_size=args.chunk_size,
+        since=args.since,
+        until=args.until,
+        user_id=args.user_id,
+        resource_id=args.resource_id,
+        decision=args.decision,
+    )
+    print(f"Wrote {written} bytes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
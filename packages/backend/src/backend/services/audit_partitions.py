@@ -0,0 +1,316 @@
+"""
+Time-partitioned audit log storage
+PostgreSQL uses native declarative range partitioning on `timestamp`. SQLite keeps
+the current period in `audit_logs` and rotates closed periods into per-period
+tables. Retention drops or archives whole partitions, never individual rows.
+
+Run maintenance from cron with:
+    uv run python -m backend.services.audit_partitions
+"""
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, aliased
+
+from backend.models.abac import AuditLog
+
+# Partition granularity: "month" or "day"
+PARTITION_INTERVAL = os.getenv("FASTSET_AUDIT_PARTITION_INTERVAL", "month")
+# Partitions whose whole range is older than this are dropped or archived
+RETENTION_DAYS = int(os.getenv("FASTSET_AUDIT_RETENTION_DAYS", "365"))
+# "drop" deletes expired partitions, "archive" detaches and keeps them
+RETENTION_MODE = os.getenv("FASTSET_AUDIT_RETENTION_MODE", "archive")
+# Future partitions created ahead of time so writes never hit the default partition
+PARTITIONS_AHEAD = 2
+
+PARTITION_PREFIX = "audit_logs_p"
+ARCHIVE_PREFIX = "audit_archive_p"
+ARCHIVE_SCHEMA = "audit_archive"
+DEFAULT_PARTITION = "audit_logs_default"
+
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{8}}|\d{{6}})$")
+
+Partition = Tuple[str, datetime, datetime]
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Treat naive timestamps as UTC, as they are stored"""
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def period_start(ts: datetime, interval: str = PARTITION_INTERVAL) -> datetime:
+    """Start of the period containing ts, in UTC"""
+    ts = as_utc(ts)
+    if interval == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period(start: datetime, interval: str = PARTITION_INTERVAL) -> datetime:
+    """Start of the period following start"""
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: datetime, interval: str = PARTITION_INTERVAL) -> str:
+    """Table name of the partition starting at start"""
+    return PARTITION_PREFIX + start.strftime("%Y%m%d" if interval == "day" else "%Y%m")
+
+
+def parse_partition_name(name: str) -> Optional[Partition]:
+    """Recover (name, start, end) from a partition table name"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    suffix = match.group(1)
+    if len(suffix) == 8:
+        start = datetime.strptime(suffix, "%Y%m%d").replace(tzinfo=timezone.utc)
+        return name, start, next_period(start, "day")
+    start = datetime.strptime(suffix, "%Y%m").replace(tzinfo=timezone.utc)
+    return name, start, next_period(start, "month")
+
+
+def period_table(name: str) -> Table:
+    """Standalone copy of the audit_logs schema for a SQLite period table"""
+    source = AuditLog.__table__
+    table = Table(
+        name,
+        MetaData(),
+        *[Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns],
+    )
+    for index in source.indexes:
+        Index(index.name.replace(source.name, name, 1), *[table.c[c.name] for c in index.columns])
+    return table
+
+
+class AuditPartitionManager:
+    """Creates, rotates and expires audit log partitions"""
+
+    @staticmethod
+    def maintain(engine: Engine, now: Optional[datetime] = None) -> None:
+        """Run every maintenance step; safe to call on each startup"""
+        now = now or datetime.now(timezone.utc)
+        try:
+            AuditPartitionManager.ensure_partitioned(engine, now)
+            AuditPartitionManager.ensure_autoincrement(engine)
+            AuditPartitionManager.ensure_partitions(engine, now)
+            AuditPartitionManager.rotate(engine, now)
+            AuditPartitionManager.apply_retention(engine, now)
+        except Exception as e:
+            # Partition maintenance must never block startup
+            print(f"Audit partition maintenance failed: {e}")
+
+    @staticmethod
+    def ensure_partitioned(engine: Engine, now: datetime) -> None:
+        """Convert a plain PostgreSQL audit_logs table into a partitioned one"""
+        if engine.dialect.name != "postgresql":
+            return
+
+        with engine.begin() as conn:
+            partitioned = conn.execute(
+                text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs')")
+            ).first()
+            if partitioned:
+                return
+
+            # Existing rows become the partition for the current period, with an
+            # open lower bound so no data has to be copied
+            current = period_start(now)
+            legacy = partition_name(current)
+            conn.execute(text(f"ALTER TABLE audit_logs RENAME TO {legacy}"))
+            conn.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT audit_logs_pkey TO {legacy}_pkey"))
+            for index in AuditLog.__table__.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+            # Foreign keys are intentionally not carried over: audit history must
+            # not block deleting users, resources or policies
+            conn.execute(
+                text(f'CREATE TABLE audit_logs (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+            )
+            conn.execute(text('ALTER TABLE audit_logs ADD PRIMARY KEY (id, "timestamp")'))
+            conn.execute(text("ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id"))
+            for index in AuditLog.__table__.indexes:
+                index.create(conn)
+
+            upper = next_period(current).isoformat()
+            conn.execute(
+                text(f"ALTER TABLE audit_logs ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{upper}')")
+            )
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT"))
+
+    @staticmethod
+    def ensure_autoincrement(engine: Engine) -> None:
+        """
+        Rebuild a SQLite audit_logs created without AUTOINCREMENT
+        Without it SQLite hands out ids from the hot table's current maximum, so
+        rows inserted after a rotation would reuse the ids of rotated rows
+        """
+        if engine.dialect.name != "sqlite":
+            return
+
+        with engine.begin() as conn:
+            ddl = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'audit_logs'")
+            ).scalar()
+            if ddl is None or "AUTOINCREMENT" in ddl.upper():
+                return
+
+            legacy = "audit_logs_legacy"
+            conn.execute(text(f"ALTER TABLE audit_logs RENAME TO {legacy}"))
+            for index in AuditLog.__table__.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            AuditLog.__table__.create(conn)
+            columns = ", ".join(f'"{c.name}"' for c in AuditLog.__table__.columns)
+            conn.execute(text(f"INSERT INTO audit_logs ({columns}) SELECT {columns} FROM {legacy}"))
+            conn.execute(text(f"DROP TABLE {legacy}"))
+
+            # Continue past ids already used by rotated and archived rows
+            tables = conn.execute(
+                text(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND (name LIKE :partitions OR name LIKE :archives)"
+                ),
+                {"partitions": f"{PARTITION_PREFIX}%", "archives": f"{ARCHIVE_PREFIX}%"},
+            ).scalars().all()
+            highest = max(
+                [conn.execute(text(f"SELECT coalesce(max(id), 0) FROM {name}")).scalar() for name in tables] + [0]
+            )
+            conn.execute(
+                text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'audit_logs' AND seq < :seq"),
+                {"seq": highest},
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT 'audit_logs', :seq "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'audit_logs')"
+                ),
+                {"seq": highest},
+            )
+
+    @staticmethod
+    def ensure_partitions(engine: Engine, now: datetime) -> None:
+        """Create partitions for the current period and the next few"""
+        start = period_start(now)
+        for _ in range(PARTITIONS_AHEAD + 1):
+            end = next_period(start)
+            name = partition_name(start)
+            if engine.dialect.name == "postgresql":
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text(
+                                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+                                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                            )
+                        )
+                except Exception as e:
+                    # Usually rows for this range already sit in the default partition
+                    print(f"Could not create audit partition {name}: {e}")
+            start = end
+
+    @staticmethod
+    def rotate(engine: Engine, now: datetime) -> None:
+        """Move closed periods out of the SQLite hot table into period tables"""
+        if engine.dialect.name != "sqlite":
+            return
+
+        current = period_start(now)
+        with engine.begin() as conn:
+            oldest = conn.execute(
+                select(func.min(AuditLog.timestamp)).where(AuditLog.timestamp < current)
+            ).scalar()
+            if oldest is None:
+                return
+
+            start = period_start(oldest)
+            while start < current:
+                end = next_period(start)
+                table = period_table(partition_name(start))
+                table.create(conn, checkfirst=True)
+                in_period = (AuditLog.timestamp >= start) & (AuditLog.timestamp < end)
+                conn.execute(insert(table).from_select(list(table.c.keys()), select(AuditLog.__table__).where(in_period)))
+                conn.execute(delete(AuditLog.__table__).where(in_period))
+                start = end
+
+    @staticmethod
+    def list_partitions(conn: Connection) -> List[Partition]:
+        """Attached partitions, oldest first"""
+        if conn.dialect.name == "postgresql":
+            names = conn.execute(
+                text(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass('audit_logs')"
+                )
+            ).scalars()
+        elif conn.dialect.name == "sqlite":
+            names = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"),
+                {"prefix": f"{PARTITION_PREFIX}%"},
+            ).scalars()
+        else:
+            return []
+
+        partitions = [parse_partition_name(name) for name in names]
+        return sorted((p for p in partitions if p), key=lambda p: p[1])
+
+    @staticmethod
+    def apply_retention(
+        engine: Engine,
+        now: datetime,
+        retention_days: int = RETENTION_DAYS,
+        mode: str = RETENTION_MODE,
+    ) -> List[str]:
+        """Drop or archive partitions entirely older than the retention window"""
+        cutoff = now - timedelta(days=retention_days)
+        expired = []
+        with engine.begin() as conn:
+            for name, _, end in AuditPartitionManager.list_partitions(conn):
+                if end > cutoff:
+                    continue
+                if mode == "drop":
+                    conn.execute(text(f"DROP TABLE {name}"))
+                elif conn.dialect.name == "postgresql":
+                    conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+                    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+                    conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {name} RENAME TO {name.replace(PARTITION_PREFIX, ARCHIVE_PREFIX, 1)}"))
+                expired.append(name)
+        return expired
+
+    @staticmethod
+    def read_source(db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """
+        Entity to select audit logs from for a timestamp range
+        PostgreSQL prunes partitions itself; on SQLite only the period tables
+        overlapping the range are unioned with the hot table
+        """
+        if db.get_bind().dialect.name != "sqlite":
+            return AuditLog
+
+        since = as_utc(since) if since else None
+        until = as_utc(until) if until else None
+        tables = [
+            period_table(name)
+            for name, start, end in AuditPartitionManager.list_partitions(db.connection())
+            if (since is None or end > since) and (until is None or start <= until)
+        ]
+        if not tables:
+            return AuditLog
+
+        combined = union_all(select(AuditLog.__table__), *[select(table) for table in tables])
+        return aliased(AuditLog, combined.subquery("audit_logs_all"))
+
+
+if __name__ == "__main__":
+    from backend.database import engine
+
+    AuditPartitionManager.maintain(engine)
+    print("Audit partition maintenance complete")
@@ -0,0 +1,239 @@
+"""
+Incrementally maintained audit decision rollups
+A periodic job folds audit rows past a (timestamp, id) watermark into hourly
+allow/deny counts, so dashboards never aggregate raw audit_logs. Every worker
+runs the job; one refreshes at a time and the others skip their turn.
+
+A row is only counted if it has committed within SETTLE_SECONDS of its
+timestamp: the watermark has moved past anything older by then, so a row from
+a transaction held open longer is left out of the rollups.
+
+Run once from cron with:
+    uv run python -m backend.services.audit_rollup
+"""
+import asyncio
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import case, func, select, true, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.models.abac import AuditDecisionRollup, AuditRollupWatermark
+from backend.services.audit_partitions import AuditPartitionManager
+
+WATERMARK_NAME = "decisions_hourly"
+# Rows processed per run; the next run continues from the watermark
+BATCH_SIZE = int(os.getenv("FASTSET_AUDIT_ROLLUP_BATCH_SIZE", "100000"))
+# Rows younger than this are left for the next run so slow transactions can commit;
+# rows committed later than this after their timestamp are never counted
+SETTLE_SECONDS = int(os.getenv("FASTSET_AUDIT_ROLLUP_SETTLE_SECONDS", "5"))
+# Period of the in-process rollup task; 0 disables it
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("FASTSET_AUDIT_ROLLUP_INTERVAL_SECONDS", "60"))
+# pg_try_advisory_xact_lock key held while refreshing; any constant shared by all workers
+ROLLUP_LOCK_KEY = int(os.getenv("FASTSET_AUDIT_ROLLUP_LOCK_KEY", "7305392"))
+
+DIMENSIONS = ("user_id", "resource_id", "action_id", "policy_id")
+
+
+def _hour_bucket(column, dialect: str):
+    """SQL expression truncating a timestamp to the hour"""
+    if dialect == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _as_datetime(value) -> datetime:
+    """Normalize a bucket value returned by either dialect"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def period_floor(ts: datetime) -> datetime:
+    """Start of the hour containing ts"""
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+@contextmanager
+def refresh_lock(db: Session) -> Iterator[bool]:
+    """Whether this process may refresh now; False while another one is refreshing"""
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Held until the refresh's transaction commits or rolls back
+        yield db.execute(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY))).scalar()
+        return
+
+    database = bind.url.database
+    if bind.dialect.name != "sqlite" or not database or database == ":memory:":
+        # In-memory SQLite is private to this process
+        yield True
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows
+        yield True
+        return
+
+    # A sidecar lock file, as for migrations: the watermark is read before SQLite takes a write lock
+    with open(f"{database}.rollup.lock", "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class AuditRollupService:
+    """Maintains and queries hourly audit decision rollups"""
+
+    @staticmethod
+    def refresh(db: Session, now: Optional[datetime] = None) -> int:
+        """Fold audit rows past the watermark into the rollups; returns rows processed, 0 while another worker is"""
+        with refresh_lock(db) as locked:
+            if not locked:
+                db.rollback()
+                return 0
+            return AuditRollupService._refresh(db, now or datetime.now(timezone.utc))
+
+    @staticmethod
+    def _refresh(db: Session, now: datetime) -> int:
+        dialect = db.get_bind().dialect.name
+
+        watermark = db.get(AuditRollupWatermark, WATERMARK_NAME)
+        if watermark is None:
+            watermark = AuditRollupWatermark(name=WATERMARK_NAME, last_audit_id=0)
+            db.add(watermark)
+
+        # Skip partitions that were fully rolled up already
+        since = _as_datetime(watermark.last_timestamp) - timedelta(hours=1) if watermark.last_timestamp else None
+        logs = AuditPartitionManager.read_source(db, since=since)
+
+        # Rows are folded in (timestamp, id) order: ids alone may repeat across
+        # SQLite rotations, and the timestamp keeps the key increasing
+        key = tuple_(logs.timestamp, logs.id)
+        after = key > tuple_(watermark.last_timestamp, watermark.last_audit_id) if watermark.last_timestamp else true()
+        settled = logs.timestamp < now - timedelta(seconds=SETTLE_SECONDS)
+        batch = (
+            select(logs.timestamp, logs.id)
+            .where(after, settled)
+            .order_by(logs.timestamp, logs.id)
+            .limit(BATCH_SIZE)
+            .subquery()
+        )
+        processed, last_timestamp = db.execute(select(func.count(), func.max(batch.c.timestamp))).one()
+        if not processed:
+            db.commit()
+            return 0
+        last_id = db.execute(select(func.max(batch.c.id)).where(batch.c.timestamp == last_timestamp)).scalar()
+
+        bucket = _hour_bucket(logs.timestamp, dialect)
+        totals = db.execute(
+            select(
+                bucket.label("bucket"),
+                *[func.coalesce(getattr(logs, dim), 0).label(dim) for dim in DIMENSIONS],
+                func.sum(case((logs.decision == "ALLOW", 1), else_=0)).label("allow_count"),
+                func.sum(case((logs.decision == "ALLOW", 0), else_=1)).label("deny_count"),
+            )
+            .where(after, key <= tuple_(last_timestamp, last_id))
+            .group_by(bucket, *[getattr(logs, dim) for dim in DIMENSIONS])
+        ).all()
+
+        rows = [
+            {
+                "bucket": _as_datetime(row.bucket),
+                **{dim: getattr(row, dim) for dim in DIMENSIONS},
+                "allow_count": row.allow_count,
+                "deny_count": row.deny_count,
+            }
+            for row in totals
+        ]
+        AuditRollupService._upsert(db, rows, dialect)
+
+        watermark.last_audit_id = last_id
+        watermark.last_timestamp = _as_datetime(last_timestamp)
+        db.commit()
+        return processed
+
+    @staticmethod
+    def _upsert(db: Session, rows: List[dict], dialect: str) -> None:
+        """Add counts to existing buckets or create them"""
+        if not rows:
+            return
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(AuditDecisionRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["bucket", *DIMENSIONS],
+            set_={
+                "allow_count": AuditDecisionRollup.allow_count + statement.excluded.allow_count,
+                "deny_count": AuditDecisionRollup.deny_count + statement.excluded.deny_count,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        db.execute(statement)
+
+    @staticmethod
+    def get_rollups(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        user_id: Optional[int] = None,
+        resource_id: Optional[int] = None,
+        action_id: Optional[int] = None,
+        policy_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 1000,
+    ) -> List[AuditDecisionRollup]:
+        """Get hourly rollups, newest bucket first"""
+        query = db.query(AuditDecisionRollup)
+
+        if since:
+            query = query.filter(AuditDecisionRollup.bucket >= period_floor(since))
+
+        if until:
+            query = query.filter(AuditDecisionRollup.bucket <= until)
+
+        for dim, value in zip(DIMENSIONS, (user_id, resource_id, action_id, policy_id)):
+            if value is not None:
+                query = query.filter(getattr(AuditDecisionRollup, dim) == value)
+
+        return query.order_by(AuditDecisionRollup.bucket.desc()).offset(skip).limit(limit).all()
+
+
+async def run_periodic_refresh(session_factory, interval: int = ROLLUP_INTERVAL_SECONDS) -> None:
+    """Background loop refreshing rollups every interval seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        db = session_factory()
+        try:
+            # Refresh runs blocking queries; keep them off the event loop
+            await asyncio.to_thread(AuditRollupService.refresh, db)
+        except Exception as e:
+            db.rollback()
+            print(f"Audit rollup refresh failed: {e}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            processed = AuditRollupService.refresh(db)
+            total += processed
+            if processed < BATCH_SIZE:
+                break
+        print(f"Rolled up {total} audit rows")
+    finally:
+        db.close()
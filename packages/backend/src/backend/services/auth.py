@@ -4,17 +4,26 @@ Authentication service for ABAC system
 
 import secrets
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import and_, select
 
 from backend.models.abac import User, UserSession
 from backend.schemas.abac import UserCreate, TokenResponse
+from backend.services.bulk import BulkService
+from backend.services.cache_bus import TableCache, cache_seconds
+from backend.services.loaders import eager
+from backend.services.user_search import UserSearchService
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; passlib and python-jose are imported on first use to keep them
+# off the cold start path
+@lru_cache(maxsize=None)
+def pwd_context():
+    """bcrypt password context"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # JWT settings
 import os
@@ -24,6 +33,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Tokens whose session was found active; any session write on any worker empties it,
+# so a logout takes effect everywhere as soon as the invalidation arrives. Off by
+# default with the memory bus, which cannot tell the other workers.
+SESSION_CACHE_SECONDS = cache_seconds("FASTSET_SESSION_CACHE_SECONDS", 30)
+active_sessions = TableCache(("user_sessions",), SESSION_CACHE_SECONDS)
+
 
 class AuthService:
     """Authentication service handling login, tokens, and sessions"""
@@ -31,12 +46,12 @@ class AuthService:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return pwd_context().hash(password)
 
     @staticmethod
     def create_access_token(
@@ -51,6 +66,8 @@ class AuthService:
                 minutes=ACCESS_TOKEN_EXPIRE_MINUTES
             )
 
+        from jose import jwt
+
         to_encode.update({"exp": expire})
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
@@ -63,6 +80,8 @@ class AuthService:
     @staticmethod
     def verify_token(token: str) -> Optional[Dict[str, Any]]:
         """Verify and decode JWT token"""
+        from jose import JWTError, jwt
+
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             return payload
@@ -93,6 +112,27 @@ class AuthService:
         db.refresh(db_user)
         return db_user
 
+    @staticmethod
+    def ensure_users(db: Session, users: List[UserCreate]) -> int:
+        """Create the users that do not exist yet; safe to run from several workers at once"""
+        usernames = [user.username for user in users]
+        existing = set(db.execute(select(User.username).where(User.username.in_(usernames))).scalars())
+        rows = [
+            {
+                "username": user.username,
+                "email": user.email,
+                "hashed_password": AuthService.get_password_hash(user.password),
+            }
+            for user in users
+            if user.username not in existing
+        ]
+        if not rows:
+            return 0
+        # Only hash passwords for missing users; ON CONFLICT covers a worker that got there first
+        created = BulkService.upsert(db, User, rows, ("username",), (), on_conflict="skip")
+        db.commit()
+        return created
+
     @staticmethod
     def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
         """Authenticate user with username/password"""
@@ -148,20 +188,22 @@ class AuthService:
             return None
 
         # Check if session is still active
-        session = (
-            db.query(UserSession)
-            .filter(
-                and_(
-                    UserSession.session_token == token,
-                    UserSession.is_active == True,
-                    UserSession.expires_at > datetime.now(timezone.utc),
+        if not active_sessions.get(token):
+            session = (
+                db.query(UserSession)
+                .filter(
+                    and_(
+                        UserSession.session_token == token,
+                        UserSession.is_active == True,
+                        UserSession.expires_at > datetime.now(timezone.utc),
+                    )
                 )
+                .first()
             )
-            .first()
-        )
 
-        if not session:
-            return None
+            if not session:
+                return None
+            active_sessions.set(token, True)
 
         return db.query(User).filter(User.id == int(user_id)).first()
 
@@ -232,12 +274,13 @@ class AuthService:
         db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None
     ) -> List[User]:
         """Get users with pagination and optional search"""
-        query = db.query(User)
+        query = AuthService.users_query(db, search).options(*eager(User.attributes))
+        return query.offset(skip).limit(limit).all()
 
+    @staticmethod
+    def users_query(db: Session, search: Optional[str] = None) -> Query:
+        """Query for users, ranked by relevance when searching"""
         if search:
-            search_filter = f"%{search}%"
-            query = query.filter(
-                (User.username.ilike(search_filter)) | (User.email.ilike(search_filter))
-            )
+            return UserSearchService.build_query(db, search)
 
-        return query.offset(skip).limit(limit).all()
+        return db.query(User)
@@ -0,0 +1,183 @@
+"""
+Bulk writes for catalog syncs
+Payloads are parsed and validated in one pass, then written with batched
+`INSERT ... ON CONFLICT` statements inside a single transaction.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence, Set, Type
+
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.models.abac import Attribute, Resource, ResourceAttribute, User, UserAttribute
+
+# Rows per INSERT statement; keeps bind parameters under driver limits
+BULK_BATCH_SIZE = int(os.getenv("FASTSET_BULK_BATCH_SIZE", "1000"))
+# Upper bound on items per request
+BULK_MAX_ITEMS = int(os.getenv("FASTSET_BULK_MAX_ITEMS", "100000"))
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+ON_CONFLICT = ("update", "skip", "error")
+
+# Natural key and updatable columns for each bulk-writable model
+RESOURCE_KEY = ("resource_uri",)
+RESOURCE_UPDATES = ("name", "resource_type", "parent_id", "metadata_")
+ATTRIBUTE_KEY = ("attribute_type", "name", "value")
+ATTRIBUTE_UPDATES = ("data_type", "description", "is_active")
+
+BULK_DESCRIPTION = (
+    "Accepts a JSON array, or one JSON object per line with Content-Type application/x-ndjson. "
+    "`on_conflict` decides what happens to rows whose natural key already exists: "
+    "`update` overwrites them, `skip` leaves them, `error` rejects the batch."
+)
+
+
+def parse_items(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array or NDJSON body into a list of items"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        items = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number}: {e.msg}")
+    else:
+        try:
+            items = json.loads(body or b"[]")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array")
+
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValueError(f"Too many items: {len(items)} > {BULK_MAX_ITEMS}")
+    return items
+
+
+def _batches(rows: Sequence[Dict[str, Any]], size: int = BULK_BATCH_SIZE) -> Iterable[Sequence[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _dedupe(rows: List[Dict[str, Any]], key: Sequence[str]) -> List[Dict[str, Any]]:
+    """Keep the last row per key; one statement may not touch a row twice"""
+    return list({tuple(row[k] for k in key): row for row in rows}.values())
+
+
+def _insert(db: Session):
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def _require_unique_index(db: Session, model: Type, key: Sequence[str]) -> None:
+    """
+    Raise ValueError when the unique index declared on key is missing from the
+    database, as it is when migration found duplicates it could not index
+    """
+    for index in model.__table__.indexes:
+        if index.unique and [column.name for column in index.columns] == list(key):
+            existing = {found["name"] for found in inspect(db.connection()).get_indexes(model.__tablename__)}
+            if index.name not in existing:
+                raise ValueError(
+                    f"{model.__tablename__} has no unique index {index.name}, so rows cannot be matched on "
+                    f"{', '.join(key)}; deduplicate {model.__tablename__} and restart to create it"
+                )
+            return
+
+
+class BulkService:
+    """Batched upserts and attribute assignments"""
+
+    @staticmethod
+    def upsert(
+        db: Session,
+        model: Type,
+        rows: List[Dict[str, Any]],
+        key: Sequence[str],
+        updates: Sequence[str],
+        on_conflict: str = "update",
+    ) -> int:
+        """Insert rows, resolving natural key conflicts per on_conflict; returns rows written"""
+        _require_unique_index(db, model, key)
+        rows = _dedupe(rows, key)
+        insert = _insert(db)
+        written = 0
+        for batch in _batches(rows):
+            statement = insert(model).values(list(batch))
+            if on_conflict == "update":
+                statement = statement.on_conflict_do_update(
+                    index_elements=list(key),
+                    set_={
+                        **{name: statement.excluded[name] for name in updates},
+                        "updated_at": datetime.now(timezone.utc),
+                    },
+                )
+            elif on_conflict == "skip":
+                statement = statement.on_conflict_do_nothing(index_elements=list(key))
+            written += db.execute(statement).rowcount
+        return written
+
+    @staticmethod
+    def upsert_resources(db: Session, resources: List[Dict[str, Any]], on_conflict: str = "update") -> int:
+        """Bulk write resources keyed by resource_uri"""
+        rows = []
+        for resource in resources:
+            row = dict(resource)
+            row["metadata_"] = row.pop("metadata", None)
+            rows.append(row)
+
+        parents = {row["parent_id"] for row in rows if row.get("parent_id") is not None}
+        BulkService.require_existing(db, Resource, parents, "parent_id")
+        return BulkService.upsert(db, Resource, rows, RESOURCE_KEY, RESOURCE_UPDATES, on_conflict)
+
+    @staticmethod
+    def upsert_attributes(db: Session, attributes: List[Dict[str, Any]], on_conflict: str = "update") -> int:
+        """Bulk write attributes keyed by (attribute_type, name, value)"""
+        return BulkService.upsert(db, Attribute, attributes, ATTRIBUTE_KEY, ATTRIBUTE_UPDATES, on_conflict)
+
+    @staticmethod
+    def assign(db: Session, link_model: Type, owner_model: Type, owner_key: str, rows: List[Dict[str, Any]]) -> int:
+        """Link attributes to users or resources; existing links are left alone"""
+        BulkService.require_existing(db, owner_model, {row[owner_key] for row in rows}, owner_key)
+        BulkService.require_existing(db, Attribute, {row["attribute_id"] for row in rows}, "attribute_id")
+
+        rows = _dedupe(rows, (owner_key, "attribute_id"))
+        insert = _insert(db)
+        written = 0
+        for batch in _batches(rows):
+            statement = insert(link_model).values(list(batch)).on_conflict_do_nothing(
+                index_elements=[owner_key, "attribute_id"]
+            )
+            written += db.execute(statement).rowcount
+        return written
+
+    @staticmethod
+    def assign_user_attributes(db: Session, rows: List[Dict[str, Any]]) -> int:
+        """Bulk insert into user_attributes"""
+        return BulkService.assign(db, UserAttribute, User, "user_id", rows)
+
+    @staticmethod
+    def assign_resource_attributes(db: Session, rows: List[Dict[str, Any]]) -> int:
+        """Bulk insert into resource_attributes"""
+        return BulkService.assign(db, ResourceAttribute, Resource, "resource_id", rows)
+
+    @staticmethod
+    def require_existing(db: Session, model: Type, ids: Set[int], field: str) -> None:
+        """Raise ValueError naming any referenced ids that do not exist"""
+        if not ids:
+            return
+        found = set()
+        id_list = sorted(ids)
+        for start in range(0, len(id_list), BULK_BATCH_SIZE):
+            chunk = id_list[start:start + BULK_BATCH_SIZE]
+            found.update(db.execute(select(model.id).where(model.id.in_(chunk))).scalars())
+        missing = ids - found
+        if missing:
+            shown = ", ".join(str(i) for i in sorted(missing)[:20])
+            raise ValueError(f"Unknown {field}: {shown}{' ...' if len(missing) > 20 else ''}")
@@ -0,0 +1,310 @@
+"""
+Cache invalidation bus for multi-worker deployments
+In-process caches subscribe to the tables they are built from. Every committed
+write publishes the tables it touched, and each worker drops the matching caches
+as soon as the message arrives. Backends:
+`memory` (one process, tests; the default, under which the session and policy
+caches are off unless configured), `local` (Unix datagram sockets shared by the workers
+on one host) and `postgres` (LISTEN/NOTIFY, across hosts).
+"""
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import event, func, select
+
+CACHE_BUS = os.getenv("FASTSET_CACHE_BUS", "memory")
+CACHE_BUS_CHANNEL = os.getenv("FASTSET_CACHE_BUS_CHANNEL", "fastset_invalidate")
+CACHE_BUS_SOCKET_DIR = os.getenv(
+    "FASTSET_CACHE_BUS_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "fastset-cache-bus")
+)
+# Seconds between reconnect attempts of the Postgres listener
+CACHE_BUS_RECONNECT_SECONDS = float(os.getenv("FASTSET_CACHE_BUS_RECONNECT_SECONDS", "1"))
+
+INVALIDATED_TABLES = "invalidated_tables"
+
+
+def cache_seconds(name: str, default: float) -> float:
+    """
+    TTL of a cache that security decisions read, from the environment variable name.
+    The memory bus cannot reach other workers, so with it such caches are off
+    unless configured, and configuring one under several workers is warned about.
+    """
+    shared = CACHE_BUS != "memory"
+    seconds = float(os.getenv(name, str(default) if shared else "0"))
+    if seconds > 0 and not shared and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        print(
+            f"Warning: {name}={seconds:g} with the memory cache bus; a write on one worker leaves the "
+            "others' caches stale for that long. Set FASTSET_CACHE_BUS to local or postgres."
+        )
+    return seconds
+
+
+class CacheBus:
+    """Fans table invalidations out to local subscribers and to other workers"""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Callable[[], None]]] = {}
+
+    def subscribe(self, table: str, handler: Callable[[], None]) -> None:
+        """Call handler whenever table is written by any worker"""
+        self._handlers.setdefault(table, []).append(handler)
+
+    def unsubscribe(self, table: str, handler: Callable[[], None]) -> None:
+        """Stop calling handler for table"""
+        handlers = self._handlers.get(table, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(table, None)
+
+    def publish(self, tables: Iterable[str]) -> None:
+        """Invalidate tables here at once, then tell the other workers"""
+        tables = sorted(set(tables))
+        if not tables:
+            return
+        self._deliver(tables)
+        self._broadcast(json.dumps({"origin": self.origin, "tables": tables}))
+
+    def _deliver(self, tables: Iterable[str]) -> None:
+        for table in tables:
+            for handler in list(self._handlers.get(table, ())):
+                handler()
+
+    def _deliver_all(self) -> None:
+        """Drop every cache; used when messages may have been missed"""
+        self._deliver(list(self._handlers))
+
+    def _receive(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") != self.origin:
+            self._deliver(message.get("tables", ()))
+
+    def _broadcast(self, payload: str) -> None:
+        pass
+
+    async def start(self) -> None:
+        """Begin receiving invalidations from other workers"""
+
+    async def stop(self) -> None:
+        """Stop receiving invalidations"""
+
+
+class MemoryBus(CacheBus):
+    """Single-process bus; buses sharing a peers list behave like separate workers"""
+
+    def __init__(self, peers: Optional[List["MemoryBus"]] = None):
+        super().__init__()
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+
+    def _broadcast(self, payload: str) -> None:
+        for peer in self.peers:
+            if peer is not self:
+                peer._receive(payload)
+
+
+class LocalSocketBus(CacheBus):
+    """Workers on one host, each bound to a Unix datagram socket in a shared directory"""
+
+    def __init__(self, directory: str = CACHE_BUS_SOCKET_DIR):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{self.origin[:8]}.sock")
+        self._socket: Optional[socket.socket] = None
+
+    def _peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names if name.endswith(".sock")]
+
+    def _broadcast(self, payload: str) -> None:
+        data = payload.encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for path in self._peers():
+                if path == self.path:
+                    continue
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # A worker that exited without cleaning up
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    # The peer's receive buffer is full; it will catch up on its TTLs
+                    print(f"Cache bus: dropped invalidation for {path}")
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except BlockingIOError:
+                return
+            self._receive(data.decode("utf-8"))
+
+    async def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(self.path)
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class PostgresBus(CacheBus):
+    """Workers on any host, over LISTEN/NOTIFY on the application database"""
+
+    def __init__(self, channel: str = CACHE_BUS_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    def _broadcast(self, payload: str) -> None:
+        from backend.database import engine
+
+        with engine.begin() as conn:
+            conn.execute(select(func.pg_notify(self.channel, payload)))
+
+    async def _listen(self, dsn: str) -> None:
+        import asyncpg
+
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"Cache bus: cannot connect listener: {e}")
+                await asyncio.sleep(CACHE_BUS_RECONNECT_SECONDS)
+                continue
+
+            closed = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+            await conn.add_listener(self.channel, lambda _conn, _pid, _channel, payload: self._receive(payload))
+            # Writes made while nobody was listening were never seen
+            self._deliver_all()
+            try:
+                await closed
+            finally:
+                await conn.close()
+            print("Cache bus: listener connection lost, reconnecting")
+
+    async def start(self) -> None:
+        from backend.database import engine
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listener = asyncio.create_task(self._listen(dsn))
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+
+def create_cache_bus(kind: str = CACHE_BUS) -> CacheBus:
+    """Bus for the configured backend"""
+    if kind == "postgres":
+        return PostgresBus()
+    if kind == "local":
+        return LocalSocketBus()
+    if kind == "memory":
+        return MemoryBus()
+    raise ValueError(f"Unknown cache bus {kind!r}; expected memory, local or postgres")
+
+
+cache_bus = create_cache_bus()
+
+
+class TableCache:
+    """Bounded, TTL-limited in-process cache, emptied whenever one of its tables is written"""
+
+    def __init__(
+        self,
+        tables: Sequence[str],
+        ttl_seconds: float,
+        max_entries: int = 10000,
+        bus: Optional[CacheBus] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Read and filled from threadpool threads, emptied from bus handlers
+        self._lock = threading.Lock()
+        for table in tables:
+            (bus or cache_bus).subscribe(table, self.clear)
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def publish_invalidations(session_factory, bus: Optional[CacheBus] = None) -> None:
+    """Publish the tables written through sessions of session_factory once they commit"""
+
+    def record(session, tables: Iterable[str]) -> None:
+        session.info.setdefault(INVALIDATED_TABLES, set()).update(tables)
+
+    @event.listens_for(session_factory, "after_flush")
+    def after_flush(session, flush_context):
+        objects = list(session.new) + list(session.dirty) + list(session.deleted)
+        record(session, (obj.__table__.name for obj in objects if hasattr(obj, "__table__")))
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def on_orm_execute(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                record(orm_execute_state.session, [table.name])
+
+    @event.listens_for(session_factory, "after_commit")
+    def after_commit(session):
+        tables = session.info.pop(INVALIDATED_TABLES, None)
+        if tables:
+            (bus or cache_bus).publish(tables)
+
+    @event.listens_for(session_factory, "after_soft_rollback")
+    def after_rollback(session, previous_transaction):
+        session.info.pop(INVALIDATED_TABLES, None)
@@ -0,0 +1,128 @@
+"""
+Data sources for the SQL editor
+Each source is a SQLAlchemy URL, configured with FASTSET_DATA_SOURCES as a JSON
+object of name to URL; there are none otherwise. The application database is
+never a source, since its users and sessions tables would be readable past ABAC.
+Queries run through the dialect's async driver on an
+engine created the first time the source is used; `duckdb:` sources run on an
+embedded DuckDB database instead (see duckdb_source). Connections keep the
+statements they run prepared (see statement_cache).
+"""
+import json
+import os
+from typing import Dict, List
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from backend.services.duckdb_source import DuckDBSource
+from backend.services.statement_cache import engine_options
+
+# Async driver used for each dialect when the URL names a sync one, or none
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite", "mysql": "aiomysql"}
+DEFAULT_PORTS = {"postgresql": 5432, "mysql": 3306}
+LOCAL_HOSTS = {None, "", "localhost", "127.0.0.1", "::1"}
+
+
+def same_database(url: str, other: str) -> bool:
+    """Whether a query through url could read the database at other, whatever the drivers and passwords"""
+    first, second = make_url(url), make_url(other)
+    backend = first.get_backend_name()
+    if backend != second.get_backend_name():
+        return False
+    if backend == "sqlite":
+        # In-memory databases are private to their connection
+        paths = [u.database for u in (first, second)]
+        return ":memory:" not in paths and all(paths) and os.path.realpath(paths[0]) == os.path.realpath(paths[1])
+
+    def server(u: URL):
+        host = "localhost" if u.host in LOCAL_HOSTS else u.host
+        return host, u.port or DEFAULT_PORTS.get(backend)
+
+    if server(first) != server(second):
+        return False
+    if backend == "mysql":
+        # Databases on one MySQL server are schemas the same account can read across
+        return first.username == second.username
+    return first.database == second.database
+
+
+def load_sources() -> Dict[str, str]:
+    """Configured sources; raises ValueError for one that is the application database"""
+    sources = json.loads(os.getenv("FASTSET_DATA_SOURCES", "{}"))
+    application = os.getenv("DATABASE_URL", "sqlite:///./fastset_abac.db")
+    for name, url in sources.items():
+        if same_database(url, application):
+            raise ValueError(f"Data source {name} is the application database; point it at the data to query instead")
+    return sources
+
+
+def read_only_url(url: URL) -> URL:
+    """A SQLite file URL opened read-only, so the file cannot be written whatever the connection's pragmas"""
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return url
+    if url.query.get("uri") == "true":
+        return url if "mode" in url.query else url.update_query_dict({"mode": "ro"})
+    return url.set(database=f"file:{url.database}").update_query_dict({"mode": "ro", "uri": "true"})
+
+
+def async_url(url: str) -> URL:
+    """The URL with its dialect's async driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} data sources")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+class DataSourceRegistry:
+    """Named data sources and their lazily created async engines"""
+
+    def __init__(self, sources: Dict[str, str]):
+        self.sources = sources
+        self._engines: Dict[str, AsyncEngine] = {}
+        self._duckdb: Dict[str, DuckDBSource] = {}
+
+    def names(self) -> List[str]:
+        return sorted(self.sources)
+
+    def dialect(self, name: str) -> str:
+        return make_url(self.sources[name]).get_backend_name()
+
+    def engine(self, name: str) -> AsyncEngine:
+        """Async engine for a source; raises KeyError for unknown names"""
+        if name not in self._engines:
+            # Writes are refused by the database itself rather than by inspecting the SQL
+            url, options = engine_options(read_only_url(async_url(self.sources[name])))
+            self._engines[name] = create_async_engine(url, pool_pre_ping=True, **options)
+        return self._engines[name]
+
+    def duckdb(self, name: str, read_only: bool = True) -> DuckDBSource:
+        """Embedded database for a `duckdb:` source; raises KeyError for unknown names"""
+        if name not in self._duckdb:
+            self._duckdb[name] = DuckDBSource(self.sources[name], read_only=read_only)
+        return self._duckdb[name]
+
+    async def dispose(self) -> None:
+        """Close every pooled connection"""
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
+        for database in self._duckdb.values():
+            database.close()
+        self._duckdb.clear()
+
+
+async def reset_sqlite(conn: AsyncConnection) -> None:
+    """
+    Undo what an earlier query on this pooled SQLite connection may have changed:
+    turn query_only back on, and detach the databases it attached, which would
+    otherwise stay readable, the application database among them
+    """
+    await conn.exec_driver_sql("PRAGMA query_only = ON")
+    databases = await conn.exec_driver_sql("PRAGMA database_list")
+    for name in [row[1] for row in databases if row[1] not in ("main", "temp")]:
+        await conn.exec_driver_sql(f'DETACH DATABASE "{name}"')
+
+
+data_sources = DataSourceRegistry(load_sources())
@@ -0,0 +1,119 @@
+"""
+Embedded DuckDB data sources
+Configured like any other source, as `duckdb:///path/to/file.duckdb` or
+`duckdb:///:memory:`, optionally with `?extracts=/path/to/dir`: every Parquet and
+CSV file in that directory is queryable as a view named after the file, in
+place, without loading it into the application database first. Query results
+can be saved there as Parquet extracts. Queries run on DuckDB's own thread pool
+and are read as Arrow record batches; the filesystem outside the extracts
+directory is off limits.
+
+Requires the optional `analytics` extra (duckdb, pyarrow).
+"""
+import os
+import re
+import uuid
+from typing import Any, List
+
+from sqlalchemy.engine import make_url
+
+from backend.services.arrow_results import load_pyarrow
+
+# Threads per query; DuckDB parallelizes scans, joins and aggregations across them
+DUCKDB_THREADS = int(os.getenv("FASTSET_DUCKDB_THREADS", str(os.cpu_count() or 1)))
+# e.g. "4GB"; empty for DuckDB's default of 80% of RAM
+DUCKDB_MEMORY_LIMIT = os.getenv("FASTSET_DUCKDB_MEMORY_LIMIT", "")
+
+EXTRACT_READERS = {".parquet": "read_parquet", ".csv": "read_csv_auto"}
+# Names extracts can be saved under, and so the views they appear as
+EXTRACT_NAME_PATTERN = r"^[A-Za-z_][A-Za-z0-9_]{0,62}$"
+
+
+def require_duckdb():
+    """Import duckdb, failing with an actionable message when it is not installed"""
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("DuckDB data sources require duckdb: install fastset-backend[analytics]")
+    return duckdb
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def write_extract(directory: str, name: str, table: Any) -> str:
+    """Write an Arrow table as the Parquet extract `name`, replacing any earlier one"""
+    if not re.match(EXTRACT_NAME_PATTERN, name):
+        raise ValueError(f"Extract names must match {EXTRACT_NAME_PATTERN}")
+    load_pyarrow()
+    import pyarrow.parquet as pq
+
+    path = os.path.join(directory, f"{name}.parquet")
+    # Written aside and renamed so running queries never read a partial file
+    temporary = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        pq.write_table(table, temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    return path
+
+
+class DuckDBSource:
+    """One embedded database, shared by every query against the source"""
+
+    def __init__(self, url: str, read_only: bool = True):
+        duckdb = require_duckdb()
+        parsed = make_url(url)
+        self.path = parsed.database or ":memory:"
+        extracts = parsed.query.get("extracts")
+        self.extracts = os.path.abspath(extracts) if extracts else None
+        self.read_only = read_only
+
+        config = {"threads": DUCKDB_THREADS}
+        if DUCKDB_MEMORY_LIMIT:
+            config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+        on_disk = self.path != ":memory:"
+        self.database = duckdb.connect(self.path, read_only=read_only and on_disk, config=config)
+        if self.extracts:
+            os.makedirs(self.extracts, exist_ok=True)
+            self.database.execute(f"SET allowed_directories = [{_literal(self.extracts + os.sep)}]")
+        # Turned off for good: it cannot be switched back on while the database is open
+        self.database.execute("SET enable_external_access = false")
+
+    def extract_files(self) -> List[str]:
+        if not self.extracts:
+            return []
+        return sorted(
+            name for name in os.listdir(self.extracts)
+            if os.path.splitext(name)[1] in EXTRACT_READERS and re.match(EXTRACT_NAME_PATTERN, os.path.splitext(name)[0])
+        )
+
+    def views(self) -> List[str]:
+        """Names the extracts are queried as"""
+        return sorted({os.path.splitext(name)[0] for name in self.extract_files()})
+
+    def connect(self):
+        """A cursor of its own for one query, with a view over each extract"""
+        cursor = self.database.cursor()
+        for name in self.extract_files():
+            view, extension = os.path.splitext(name)
+            path = os.path.join(self.extracts, name)
+            cursor.execute(
+                f'CREATE OR REPLACE TEMP VIEW "{view}" AS SELECT * FROM {EXTRACT_READERS[extension]}({_literal(path)})'
+            )
+        return cursor
+
+    def check(self, cursor, sql: str) -> None:
+        """Refuse anything but a single query when sources are read-only"""
+        duckdb = require_duckdb()
+        statements = cursor.extract_statements(sql)
+        if len(statements) != 1:
+            raise ValueError("Run one statement at a time on DuckDB sources")
+        if self.read_only and statements[0].type not in (duckdb.StatementType.SELECT, duckdb.StatementType.EXPLAIN):
+            raise ValueError("Only queries can run on DuckDB sources")
+
+    def close(self) -> None:
+        self.database.close()
@@ -0,0 +1,28 @@
+"""
+Relationship loader strategies for list endpoints
+Eager-loads the relationships a response schema serializes, so a page costs a
+fixed number of queries instead of one lazy load per row
+"""
+import os
+from typing import List
+
+from sqlalchemy.orm import joinedload, lazyload, selectinload, subqueryload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+# "selectin" (one IN query per relationship), "joined", "subquery" or "lazy"
+LOADER_STRATEGY = os.getenv("FASTSET_RELATIONSHIP_LOADER", "selectin")
+
+LOADERS = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+    "lazy": lazyload,
+}
+
+
+def eager(*relationships, strategy: str = LOADER_STRATEGY) -> List[LoaderOption]:
+    """Loader options for relationships using the configured strategy"""
+    if strategy not in LOADERS:
+        raise ValueError(f"Unknown loader strategy: {strategy}. Allowed: {', '.join(LOADERS)}")
+    loader = LOADERS[strategy]
+    return [loader(relationship) for relationship in relationships]
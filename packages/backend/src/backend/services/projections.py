@@ -0,0 +1,200 @@
+"""
+Column projections for list endpoints
+Builds response dicts straight from row tuples, loading nested collections with one
+query per page instead of one per row and never constructing ORM or Pydantic objects
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from backend.models.abac import (
+    Action, Attribute, Policy, Resource, ResourceAttribute, User, UserAttribute
+)
+from backend.services.streaming import iter_ndjson
+
+FAST_PATH_DESCRIPTION = "Serialize straight from column projections, skipping per-object response models"
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. `username,email`; only these columns are queried"
+
+ATTRIBUTE_COLUMNS = (
+    Attribute.id,
+    Attribute.name,
+    Attribute.attribute_type,
+    Attribute.data_type,
+    Attribute.value,
+    Attribute.description,
+    Attribute.is_active,
+    Attribute.created_at,
+)
+
+USER_COLUMNS = (User.id, User.username, User.email, User.deleted_at, User.created_at)
+
+RESOURCE_COLUMNS = (
+    Resource.id,
+    Resource.name,
+    Resource.resource_type,
+    Resource.resource_uri,
+    Resource.parent_id,
+    Resource.metadata_.label("metadata"),
+    Resource.created_at,
+)
+
+ACTION_COLUMNS = (Action.id, Action.name, Action.description, Action.category)
+
+POLICY_COLUMNS = (
+    Policy.id,
+    Policy.name,
+    Policy.description,
+    Policy.effect,
+    Policy.priority,
+    Policy.conditions,
+    Policy.action_id,
+    Policy.created_at,
+    Policy.updated_at,
+)
+
+
+# Sparse fieldsets accepted by each list endpoint
+USER_FIELDS = [column.key for column in USER_COLUMNS] + ["attributes"]
+RESOURCE_FIELDS = [column.key for column in RESOURCE_COLUMNS] + ["attributes"]
+ACTION_FIELDS = [column.key for column in ACTION_COLUMNS]
+ATTRIBUTE_FIELDS = [column.key for column in ATTRIBUTE_COLUMNS]
+POLICY_FIELDS = [column.key for column in POLICY_COLUMNS] + ["is_active", "action"]
+
+
+def rows_to_dicts(rows) -> List[Dict[str, Any]]:
+    """Convert result rows to plain dicts keyed by column label"""
+    return [dict(row._mapping) for row in rows]
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[Set[str]]:
+    """Parse a `fields=` parameter; None means every field"""
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return requested
+
+
+def _wants(fields: Optional[Set[str]], name: str) -> bool:
+    return fields is None or name in fields
+
+
+class ProjectionService:
+    """Serializable list payloads built from column projections"""
+
+    @staticmethod
+    def _select(query: Query, columns, fields: Optional[Set[str]], required: Sequence[str] = ("id",)) -> List[Dict[str, Any]]:
+        """Select only the requested columns, plus the keys needed to attach nested data"""
+        selected = [column for column in columns if _wants(fields, column.key) or column.key in required]
+        return rows_to_dicts(query.with_entities(*selected))
+
+    @staticmethod
+    def _trim(items: List[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        """Drop helper keys that were selected but not requested"""
+        if fields is None:
+            return items
+        return [{key: value for key, value in item.items() if key in fields} for item in items]
+
+    @staticmethod
+    def _attach_attributes(db: Session, items: List[Dict[str, Any]], link_table, owner_column) -> List[Dict[str, Any]]:
+        """Load the attributes of every item on the page with a single query"""
+        by_owner = defaultdict(list)
+        ids = [item["id"] for item in items]
+        if ids:
+            rows = db.execute(
+                select(owner_column.label("owner_id"), *ATTRIBUTE_COLUMNS)
+                .join(link_table, link_table.attribute_id == Attribute.id)
+                .where(owner_column.in_(ids))
+            )
+            for row in rows:
+                attribute = dict(row._mapping)
+                by_owner[attribute.pop("owner_id")].append(attribute)
+
+        for item in items:
+            item["attributes"] = by_owner.get(item["id"], [])
+        return items
+
+    @staticmethod
+    def users(db: Session, query: Query, fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """User payloads; attributes are only loaded when requested"""
+        items = ProjectionService._select(query, USER_COLUMNS, fields)
+        return ProjectionService._complete_users(db, items, fields)
+
+    @staticmethod
+    def _complete_users(db: Session, items: List[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        if _wants(fields, "attributes"):
+            ProjectionService._attach_attributes(db, items, UserAttribute, UserAttribute.user_id)
+        return ProjectionService._trim(items, fields)
+
+    @staticmethod
+    def resources(db: Session, query: Query, fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Resource payloads; attributes are only loaded when requested"""
+        items = ProjectionService._select(query, RESOURCE_COLUMNS, fields)
+        return ProjectionService._complete_resources(db, items, fields)
+
+    @staticmethod
+    def _complete_resources(db: Session, items: List[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        if _wants(fields, "attributes"):
+            ProjectionService._attach_attributes(db, items, ResourceAttribute, ResourceAttribute.resource_id)
+        return ProjectionService._trim(items, fields)
+
+    @staticmethod
+    def actions(db: Session, query: Query, fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Action payloads"""
+        return ProjectionService._trim(ProjectionService._select(query, ACTION_COLUMNS, fields), fields)
+
+    @staticmethod
+    def attributes(db: Session, query: Query, fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Attribute payloads"""
+        return ProjectionService._trim(ProjectionService._select(query, ATTRIBUTE_COLUMNS, fields), fields)
+
+    @staticmethod
+    def policies(db: Session, query: Query, fields: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Policy payloads; the nested action is loaded in one query per page when requested"""
+        items = ProjectionService._select(query, POLICY_COLUMNS, fields, required=POLICY_KEYS)
+        return ProjectionService._complete_policies(db, items, fields)
+
+    @staticmethod
+    def _complete_policies(db: Session, items: List[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        wants_action = _wants(fields, "action")
+        actions = {}
+        action_ids = {item["action_id"] for item in items if item.get("action_id") is not None}
+        if wants_action and action_ids:
+            rows = db.execute(select(*ACTION_COLUMNS).where(Action.id.in_(action_ids)))
+            actions = {action["id"]: action for action in rows_to_dicts(rows)}
+
+        for item in items:
+            # Policies have no is_active column; mirror the schema default
+            item["is_active"] = True
+            if wants_action:
+                item["action"] = actions.get(item["action_id"])
+        return ProjectionService._trim(items, fields)
+
+    @staticmethod
+    def stream(engine: Engine, kind: str, query: Query, fields: Optional[Set[str]] = None) -> Iterator[bytes]:
+        """NDJSON chunks of the same payloads, completing nested data one batch at a time"""
+        columns, required, complete = STREAMS[kind]
+        selected = [column for column in columns if _wants(fields, column.key) or column.key in required]
+        statement = query.with_entities(*selected).statement
+        finish = (lambda db, items: complete(db, items, fields)) if complete else (
+            lambda db, items: ProjectionService._trim(items, fields)
+        )
+        return iter_ndjson(engine, statement, finish)
+
+
+# Join keys the policy payload needs to attach its action
+POLICY_KEYS = ("action_id",)
+
+# Columns, join keys and completion step of each list payload
+STREAMS = {
+    "users": (USER_COLUMNS, ("id",), ProjectionService._complete_users),
+    "resources": (RESOURCE_COLUMNS, ("id",), ProjectionService._complete_resources),
+    "actions": (ACTION_COLUMNS, (), None),
+    "attributes": (ATTRIBUTE_COLUMNS, (), None),
+    "policies": (POLICY_COLUMNS, POLICY_KEYS, ProjectionService._complete_policies),
+}
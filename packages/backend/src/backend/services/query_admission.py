@@ -0,0 +1,184 @@
+"""
+Admission control for editor queries
+A query holds a slot from the moment it starts until its result is released,
+since that is how long it holds a source connection. Each user and each data
+source has a number of slots; queries past either limit wait in a queue, which
+hands free slots to the waiting user with the fewest running queries, so one
+user's burst of queries cannot starve everyone else. Before running, queries on
+PostgreSQL sources are checked against the planner's estimates and refused when
+they are expected to cost too much, prepared statements included, since with
+bind parameters the same statement's cost differs from run to run. Slots are
+counted per web worker; jobs on the query worker pool hold theirs in the web
+worker that accepted them, under the submitting user.
+"""
+import asyncio
+import itertools
+import json
+import os
+from typing import Any, Dict, Hashable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from backend.services.query_rewrite import is_query
+
+# Queries one user may have running or open at once
+QUERY_USER_CONCURRENCY = int(os.getenv("FASTSET_QUERY_USER_CONCURRENCY", "2"))
+# Queries per data source, overridable per source with a JSON object of name to slots;
+# keep them within the source's connection pool
+QUERY_SOURCE_CONCURRENCY = int(os.getenv("FASTSET_QUERY_SOURCE_CONCURRENCY", "8"))
+QUERY_SOURCE_LIMITS: Dict[str, int] = json.loads(os.getenv("FASTSET_QUERY_SOURCE_LIMITS", "{}"))
+# PostgreSQL planner estimates past which queries are refused; 0 turns the check off.
+# Costs are planner units; rows are those the query is expected to return.
+QUERY_MAX_COST = float(os.getenv("FASTSET_QUERY_MAX_COST", "0"))
+QUERY_MAX_ESTIMATED_ROWS = int(os.getenv("FASTSET_QUERY_MAX_ESTIMATED_ROWS", "0"))
+
+
+class QueryRejected(ValueError):
+    """The planner expects the query to cost more than allowed"""
+
+
+def _check(cost: Optional[float], rows: Optional[float]) -> None:
+    if QUERY_MAX_COST and cost is not None and cost > QUERY_MAX_COST:
+        raise QueryRejected(
+            f"The planner estimates this query at cost {cost:,.0f}, over the limit of {QUERY_MAX_COST:,.0f}; "
+            "narrow it with filters or a LIMIT"
+        )
+    if QUERY_MAX_ESTIMATED_ROWS and rows is not None and rows > QUERY_MAX_ESTIMATED_ROWS:
+        raise QueryRejected(
+            f"The planner expects this query to return {rows:,.0f} rows, over the limit of "
+            f"{QUERY_MAX_ESTIMATED_ROWS:,}; narrow it with filters or a LIMIT"
+        )
+
+
+def estimates_enabled() -> bool:
+    return bool(QUERY_MAX_COST or QUERY_MAX_ESTIMATED_ROWS)
+
+
+async def check_postgresql(conn: AsyncConnection, sql: str, parameters: Optional[Dict[str, Any]] = None) -> None:
+    """Refuse the query if PostgreSQL's plan for it is over the limits"""
+    from backend.services.query_execution import query_statement
+
+    if not estimates_enabled() or not is_query(sql):
+        return
+    result = await conn.execute(query_statement(f"EXPLAIN (FORMAT JSON) {sql}", parameters))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    _check(root.get("Total Cost"), root.get("Plan Rows"))
+
+
+class Ticket:
+    """One query's claim on a user slot and a source slot"""
+
+    def __init__(self, query_id: str, user_id: Hashable, source: str, sequence: int):
+        self.query_id = query_id
+        self.user_id = user_id
+        self.source = source
+        self.sequence = sequence
+        self.admitted = asyncio.get_running_loop().create_future()
+
+
+class QueryAdmission:
+    """Per-user and per-source query slots with a fair queue in front of them"""
+
+    def __init__(
+        self,
+        user_concurrency: int = QUERY_USER_CONCURRENCY,
+        source_concurrency: int = QUERY_SOURCE_CONCURRENCY,
+        source_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.user_concurrency = user_concurrency
+        self.source_concurrency = source_concurrency
+        self.source_limits = QUERY_SOURCE_LIMITS if source_limits is None else source_limits
+        self._waiting: List[Ticket] = []
+        self._running: Dict[str, Ticket] = {}
+        self._users: Dict[Hashable, int] = {}
+        self._sources: Dict[str, int] = {}
+        # When each user was last given a slot, to break ties between equally busy users
+        self._last_admitted: Dict[Hashable, int] = {}
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+
+    def source_limit(self, source: str) -> int:
+        return self.source_limits.get(source, self.source_concurrency)
+
+    def _fits(self, ticket: Ticket) -> bool:
+        return (
+            self._users.get(ticket.user_id, 0) < self.user_concurrency
+            and self._sources.get(ticket.source, 0) < self.source_limit(ticket.source)
+        )
+
+    def _admit(self, ticket: Ticket) -> None:
+        self._running[ticket.query_id] = ticket
+        self._users[ticket.user_id] = self._users.get(ticket.user_id, 0) + 1
+        self._sources[ticket.source] = self._sources.get(ticket.source, 0) + 1
+        self._last_admitted[ticket.user_id] = next(self._sequence)
+        self.admitted += 1
+        ticket.admitted.set_result(None)
+
+    def _dispatch(self) -> None:
+        """Give free slots to waiting queries: fewest running for the user first, then longest since served"""
+        while True:
+            ready = [ticket for ticket in self._waiting if self._fits(ticket)]
+            if not ready:
+                return
+            ticket = min(
+                ready,
+                key=lambda t: (self._users.get(t.user_id, 0), self._last_admitted.get(t.user_id, -1), t.sequence),
+            )
+            self._waiting.remove(ticket)
+            self._admit(ticket)
+
+    async def acquire(self, query_id: str, user_id: Hashable, source: str) -> None:
+        """Wait for a slot for the query; cancelling the wait gives up its place"""
+        ticket = Ticket(query_id, user_id, source, next(self._sequence))
+        self._waiting.append(ticket)
+        self._dispatch()
+        if ticket.admitted.done():
+            return
+        self.queued += 1
+        try:
+            await ticket.admitted
+        except asyncio.CancelledError:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            elif ticket.admitted.done() and not ticket.admitted.cancelled():
+                # Admitted just as the wait was cancelled
+                self.release(query_id)
+            raise
+
+    def release(self, query_id: str) -> None:
+        """Free the query's slots, if it holds any"""
+        ticket = self._running.pop(query_id, None)
+        if ticket is None:
+            return
+        self._users[ticket.user_id] -= 1
+        if not self._users[ticket.user_id]:
+            del self._users[ticket.user_id]
+        self._sources[ticket.source] -= 1
+        self._dispatch()
+
+    def status(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Whether the query is queued or running here, and what a queued one waits for"""
+        if query_id in self._running:
+            return {"state": "running", "position": None, "waiting_for": None}
+        for position, ticket in enumerate(self._waiting):
+            if ticket.query_id == query_id:
+                at_limit = self._users.get(ticket.user_id, 0) >= self.user_concurrency
+                ahead = sum(1 for other in self._waiting[:position] if other.source == ticket.source)
+                return {"state": "queued", "position": ahead + 1, "waiting_for": "user" if at_limit else "source"}
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "waiting": len(self._waiting),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "sources": dict(self._sources),
+        }
+
+
+query_admission = QueryAdmission()
@@ -0,0 +1,624 @@
+"""
+SQL execution for the SQL editor
+Runs user SQL against a registered data source on its async driver, inside a
+transaction that is always rolled back. Results stay on the server behind a
+handle and are read one page at a time with `fetchmany`, so memory per query is
+bounded by the page size rather than the result size. Every fetch has a deadline,
+and cancelling the query id stops it on whichever worker holds the handle.
+Fully read results are kept in the result cache, and repeated queries are
+paged from there without touching the source. DuckDB sources are read the same
+way, from Arrow record batches on DuckDB's threads. Queries are limited to the
+row cap in their SQL (see query_rewrite) and wait for a slot from query_admission
+before they reach the source. Values sent as bind parameters keep a query's text
+the same from run to run, so its prepared statement is reused (see statement_cache).
+"""
+import asyncio
+import os
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from backend.services import arrow_results
+from backend.services.arrow_results import table_rows, to_arrow
+from backend.services.cache_bus import cache_bus
+from backend.services.data_sources import data_sources, reset_sqlite
+from backend.services.duckdb_source import DuckDBSource, require_duckdb
+from backend.services.query_admission import check_postgresql, query_admission
+from backend.services.query_rewrite import rewrite
+from backend.services.result_cache import CachedResult, ResultCollector, cache_key, result_cache
+from backend.services.statement_cache import PREPARING_DIALECTS, statement_cache
+
+# Deadline per fetch when the request names none, and the most a request may ask for
+QUERY_TIMEOUT_SECONDS = float(os.getenv("FASTSET_QUERY_TIMEOUT_SECONDS", "30"))
+QUERY_MAX_TIMEOUT_SECONDS = float(os.getenv("FASTSET_QUERY_MAX_TIMEOUT_SECONDS", "300"))
+# Rows a query may return across all its pages; the rest of the result is never fetched
+QUERY_MAX_ROWS = int(os.getenv("FASTSET_QUERY_MAX_ROWS", "100000"))
+QUERY_PAGE_SIZE = int(os.getenv("FASTSET_QUERY_PAGE_SIZE", "500"))
+QUERY_MAX_PAGE_SIZE = int(os.getenv("FASTSET_QUERY_MAX_PAGE_SIZE", "10000"))
+# Open results hold a pooled connection and transaction; idle ones are closed
+QUERY_HANDLE_IDLE_SECONDS = float(os.getenv("FASTSET_QUERY_HANDLE_IDLE_SECONDS", "120"))
+QUERY_MAX_HANDLES = int(os.getenv("FASTSET_QUERY_MAX_HANDLES", "32"))
+QUERY_READ_ONLY = os.getenv("FASTSET_QUERY_READ_ONLY", "true").lower() == "true"
+# Streamed results: a small first page so rows show at once, then full pages up to
+# the row count below; the rest stays open for fetch_page
+QUERY_STREAM_FIRST_ROWS = int(os.getenv("FASTSET_QUERY_STREAM_FIRST_ROWS", "100"))
+QUERY_STREAM_ROWS = int(os.getenv("FASTSET_QUERY_STREAM_ROWS", "5000"))
+
+
+class QueryTimeout(Exception):
+    """The query ran past its deadline and was stopped"""
+
+
+class QueryCancelled(Exception):
+    """The query was cancelled on request"""
+
+
+class ResultNotFound(Exception):
+    """No open result with this id on this worker"""
+
+
+def literal_sql(sql: str):
+    """User SQL as a text clause whose colons are not taken for bind parameters"""
+    return text(sql.replace(":", r"\:"))
+
+
+def query_statement(sql: str, parameters: Optional[Dict[str, Any]] = None):
+    """User SQL as a text clause; with parameters, its :name placeholders are bound to them"""
+    if not parameters:
+        return literal_sql(sql)
+    statement = text(sql)
+    names = set(statement.compile().params)
+    missing, unknown = names - set(parameters), set(parameters) - names
+    if missing:
+        raise ValueError(f"No value for parameters: {', '.join(sorted(missing))}")
+    if unknown:
+        raise ValueError(f"Parameters not used in the query: {', '.join(sorted(unknown))}")
+    return statement.bindparams(**parameters)
+
+
+# :name placeholders as SQLAlchemy's text() finds them
+_PLACEHOLDER = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+
+def duckdb_placeholders(sql: str) -> str:
+    """sql with :name placeholders written as DuckDB's $name"""
+    return _PLACEHOLDER.sub(r"$\1", sql).replace(r"\:", ":")
+
+
+def cancel_topic(query_id: str, user_id: Hashable) -> str:
+    """Bus topic cancelling the query; only its owner's requests publish to it"""
+    return f"query-cancel:{user_id}:{query_id}"
+
+
+async def _prepare(conn: AsyncConnection, dialect: str, timeout: float) -> None:
+    """Make the transaction read-only and give the server its own copy of the deadline"""
+    if dialect == "sqlite":
+        await reset_sqlite(conn)
+    if dialect == "postgresql":
+        if QUERY_READ_ONLY:
+            await conn.execute(text("SET TRANSACTION READ ONLY"))
+        await conn.execute(
+            text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(int(timeout * 1000))}
+        )
+
+
+class ResultHandle:
+    """An open cursor over one query's result, read forward one page at a time"""
+
+    from_cache = False
+
+    def __init__(self, query_id: str, source: str, timeout: float, page_size: int, max_rows: int):
+        self.query_id = query_id
+        self.source = source
+        self.dialect = data_sources.dialect(source)
+        self.timeout = timeout
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.loop = asyncio.get_running_loop()
+        self.conn: Optional[AsyncConnection] = None
+        self.result = None
+        self.driver_connection = None
+        self.columns: List[str] = []
+        self.next_page = 0
+        self.fetched = 0
+        self.exhausted = False
+        self.truncated = False
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self._expiry: Optional[asyncio.TimerHandle] = None
+        self._stopping: Optional[asyncio.Task] = None
+        # Set when the result is to be cached once fully read
+        self.cache_key: Optional[str] = None
+        self.collector: Optional[ResultCollector] = None
+        # Pages are Arrow tables rather than lists of rows; set per request
+        self.arrow = False
+        # Read from a TABLESAMPLE of the table in preview mode
+        self.sampled = False
+        # Values for the query's :name placeholders
+        self.parameters: Optional[Dict[str, Any]] = None
+        # Who ran the query; only they may page, poll or cancel it
+        self.user_id: Hashable = None
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None or self.lock.locked()
+
+    async def open(self, engine: AsyncEngine, sql: str) -> None:
+        self.conn = await engine.connect()
+        raw = await self.conn.get_raw_connection()
+        self.driver_connection = raw.driver_connection
+        await _prepare(self.conn, self.dialect, self.timeout)
+        statement = query_statement(sql, self.parameters)
+        # Checked on every run, prepared or not: the plan's cost depends on the parameters
+        if self.dialect == "postgresql":
+            await check_postgresql(self.conn, sql, self.parameters)
+        self.result = await self.conn.stream(statement)
+        if self.dialect in PREPARING_DIALECTS:
+            statement_cache.record(self.conn.info, self.source, sql)
+        self.columns = list(self.result.keys())
+        if self.cache_key:
+            self.collector = result_cache.collector(self.source, self.columns)
+
+    async def fetch(self) -> Any:
+        """The next page of rows, as lists or as an Arrow table"""
+        wanted = min(self.page_size, self.max_rows - self.fetched)
+        rows = await self.result.fetchmany(wanted) if wanted > 0 else []
+        self.fetched += len(rows)
+        if len(rows) < wanted:
+            self.exhausted = True
+        elif self.fetched >= self.max_rows:
+            # At the cap; one more row tells whether anything was cut off
+            self.exhausted = True
+            self.truncated = bool(await self.result.fetchmany(1))
+        rows = [list(row) for row in rows]
+        if self.collector is None and not self.arrow:
+            return rows
+        # Converted once for both the cache and the transport
+        table, exact = to_arrow(self.columns, rows)
+        if self.collector is not None:
+            self.collector.add(table, exact)
+        return table if self.arrow else rows
+
+    def page(self, rows: Any, elapsed: float) -> Dict[str, Any]:
+        page = {
+            "query_id": self.query_id,
+            "source": self.source,
+            "columns": self.columns,
+            "page": self.next_page,
+            "rows": rows,
+            "row_count": len(rows),
+            "has_more": not self.exhausted,
+            "truncated": self.truncated,
+            "execution_time_ms": round(elapsed * 1000, 3),
+            "cached": self.from_cache,
+            "sampled": self.sampled,
+        }
+        self.next_page += 1
+        return page
+
+    async def run(self, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one fetch under the deadline, stopping the statement on timeout or cancel"""
+        self.task = asyncio.create_task(operation())
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.task), self.timeout)
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise QueryTimeout(f"Query exceeded its {self.timeout:g}s timeout")
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                # The client went away; do not leave the statement running
+                await self.stop()
+                raise
+            raise QueryCancelled(f"Query {self.query_id} was cancelled")
+        finally:
+            self.task = None
+
+    async def stop(self) -> None:
+        """Cancel the running fetch, stop the driver's statement and close the handle"""
+        task = self.task
+        if task is not None:
+            task.cancel()
+            await self.interrupt()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.close()
+
+    async def interrupt(self) -> None:
+        """Stop the statement running on the driver's thread, if it has one"""
+        if self.driver_connection is not None and self.dialect == "sqlite":
+            # aiosqlite runs the statement on its own thread, which task cancellation
+            # does not reach; interrupt() is safe to call from any thread
+            await self.driver_connection.interrupt()
+        # asyncpg sends a server-side cancel itself when the awaiting task is cancelled
+
+    def on_cancel(self) -> None:
+        # Bus handlers may run on any thread
+        self.cancelled = True
+        self.loop.call_soon_threadsafe(self._schedule_stop)
+
+    def _schedule_stop(self) -> None:
+        self._stopping = self.loop.create_task(self.stop())
+
+    def touch(self) -> None:
+        """Restart the idle timer"""
+        self.last_used = time.monotonic()
+        if self._expiry is not None:
+            self._expiry.cancel()
+        self._expiry = self.loop.call_later(QUERY_HANDLE_IDLE_SECONDS, self._schedule_stop)
+
+    async def close(self) -> None:
+        """Forget the handle and release its connection"""
+        if _handles.get(self.query_id) is self:
+            del _handles[self.query_id]
+            cache_bus.unsubscribe(cancel_topic(self.query_id, self.user_id), self.on_cancel)
+            query_admission.release(self.query_id)
+        if self._expiry is not None:
+            self._expiry.cancel()
+        await self.release()
+
+    async def release(self) -> None:
+        """Release the cursor, roll back and return the connection"""
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            if self.result is not None:
+                await self.result.close()
+            await conn.rollback()
+            await conn.close()
+        except Exception:
+            # Interrupted mid-statement; the connection cannot be trusted again
+            await conn.invalidate()
+
+
+class CachedResultHandle(ResultHandle):
+    """A result served from the result cache, paged like a live one"""
+
+    from_cache = True
+
+    def __init__(self, query_id: str, source: str, timeout: float, page_size: int, cached: CachedResult):
+        super().__init__(query_id, source, timeout, page_size, max_rows=cached.row_count)
+        self.cached = cached
+
+    async def open(self, engine: AsyncEngine, sql: str) -> None:
+        self.columns = self.cached.columns
+
+    async def fetch(self) -> Any:
+        # Arrow pages are slices of the cached table, not copies
+        part = self.cached.table.slice(self.fetched, self.page_size)
+        self.fetched += part.num_rows
+        self.exhausted = self.fetched >= self.cached.row_count
+        self.truncated = self.cached.truncated
+        return part if self.arrow else table_rows(part)
+
+
+class DuckDBResultHandle(ResultHandle):
+    """A result of an embedded DuckDB query, read as Arrow record batches"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor = None
+        self.reader = None
+        # Rows read past a page boundary, served first by the next fetch
+        self.pending = None
+
+    async def open(self, database: DuckDBSource, sql: str) -> None:
+        if arrow_results.load_pyarrow() is None:
+            raise RuntimeError("DuckDB data sources require pyarrow: install fastset-backend[analytics]")
+        if self.parameters:
+            sql = duckdb_placeholders(sql)
+        self.cursor = await asyncio.to_thread(database.connect)
+        database.check(self.cursor, sql)
+        self.reader = await self._call(
+            lambda: self.cursor.execute(sql, self.parameters or None).to_arrow_reader(self.page_size)
+        )
+        self.columns = self.reader.schema.names
+        if self.cache_key:
+            self.collector = result_cache.collector(self.source, self.columns)
+
+    async def _call(self, operation: Callable[[], Any]) -> Any:
+        """Run a blocking DuckDB call on a worker thread, reporting its errors like the SQL sources"""
+        duckdb = require_duckdb()
+        try:
+            return await asyncio.to_thread(operation)
+        except duckdb.InterruptException:
+            raise asyncio.CancelledError()
+        except duckdb.Error as e:
+            raise ValueError(str(e))
+
+    def _next_batch(self):
+        try:
+            return self.reader.read_next_batch()
+        except StopIteration:
+            return None
+
+    def _read(self, wanted: int) -> List[Any]:
+        """Batches holding up to wanted rows, keeping the rest of the last one for the next fetch"""
+        batches, count = [], 0
+        while count < wanted:
+            batch, self.pending = self.pending, None
+            batch = batch if batch is not None else self._next_batch()
+            if batch is None:
+                break
+            if count + batch.num_rows > wanted:
+                self.pending = batch.slice(wanted - count)
+                batch = batch.slice(0, wanted - count)
+            batches.append(batch)
+            count += batch.num_rows
+        return batches
+
+    async def fetch(self) -> Any:
+        wanted = min(self.page_size, self.max_rows - self.fetched)
+        batches = await self._call(lambda: self._read(wanted)) if wanted > 0 else []
+        table = arrow_results.pa.Table.from_batches(batches, schema=self.reader.schema)
+        self.fetched += table.num_rows
+        if table.num_rows < wanted:
+            self.exhausted = True
+        elif self.fetched >= self.max_rows:
+            # At the cap; one more row tells whether anything was cut off
+            self.exhausted = True
+            self.truncated = self.pending is not None or await self._call(self._next_batch) is not None
+        if self.collector is not None:
+            self.collector.add(table, True)
+        return table if self.arrow else table_rows(table)
+
+    async def interrupt(self) -> None:
+        if self.cursor is not None:
+            # Safe from any thread; the running call fails with InterruptException
+            self.cursor.interrupt()
+
+    async def release(self) -> None:
+        cursor, self.cursor = self.cursor, None
+        if cursor is not None:
+            self.reader = None
+            await asyncio.to_thread(cursor.close)
+
+
+_handles: Dict[str, ResultHandle] = {}
+# Results being written to the result cache
+_storing: Set[asyncio.Task] = set()
+
+
+async def _make_room() -> None:
+    """Close the least recently used idle results when at the limit"""
+    idle = sorted((handle for handle in _handles.values() if not handle.busy), key=lambda handle: handle.last_used)
+    while len(_handles) >= QUERY_MAX_HANDLES and idle:
+        await idle.pop(0).close()
+    if len(_handles) >= QUERY_MAX_HANDLES:
+        raise ValueError(f"Too many open query results ({QUERY_MAX_HANDLES}); try again shortly")
+
+
+class QueryExecutionService:
+    """Runs, pages, times and cancels editor queries"""
+
+    @staticmethod
+    async def execute(
+        sql: str,
+        source: str,
+        query_id: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        page_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        user_context: Sequence[Tuple[str, str]] = (),
+        use_cache: bool = True,
+        arrow: bool = False,
+        user_id: Hashable = None,
+        preview: bool = False,
+        parameters: Optional[Dict[str, Any]] = None,
+        admitted: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run sql and return its first page; later pages are read with fetch_page.
+        user_context is the attributes access decisions depend on: cached results
+        are only shared between users whose attributes match. With arrow, the
+        page's rows are an Arrow table (needs pyarrow). Queries not served from
+        the cache wait for one of user_id's slots and one of the source's; the
+        wait counts toward the first page's deadline. With preview, a query over
+        a single table reads a sample of it where the source supports that.
+        parameters are values for the query's :name placeholders; sent this way
+        rather than written into the SQL, repeated runs reuse one prepared statement.
+        With admitted, the caller already holds the query's slots and none is taken.
+        """
+        if data_sources.dialect(source) == "duckdb":
+            engine, handle_type = data_sources.duckdb(source, read_only=QUERY_READ_ONLY), DuckDBResultHandle
+        else:
+            engine, handle_type = data_sources.engine(source), ResultHandle
+        query_id = query_id or uuid.uuid4().hex
+        await _make_room()
+        # Checked after the last await before the handle is registered, so two
+        # requests with the same id cannot both pass
+        if query_id in _handles:
+            raise ValueError(f"Query {query_id} is already running")
+
+        timeout = min(timeout_seconds or QUERY_TIMEOUT_SECONDS, QUERY_MAX_TIMEOUT_SECONDS)
+        page_size = min(page_size or QUERY_PAGE_SIZE, QUERY_MAX_PAGE_SIZE)
+        max_rows = min(max_rows or QUERY_MAX_ROWS, QUERY_MAX_ROWS)
+        sql, sampled = rewrite(sql, data_sources.dialect(source), max_rows, preview)
+        key = cache_key(sql, source, max_rows, user_context, parameters) if result_cache.enabled(source) else None
+        cached = result_cache.get(key) if key and use_cache else None
+        if cached is not None:
+            handle = CachedResultHandle(query_id, source, timeout, page_size, cached)
+        else:
+            handle = handle_type(query_id, source, timeout, page_size, max_rows)
+            handle.cache_key = key
+        handle.arrow = arrow
+        handle.sampled = sampled
+        handle.parameters = parameters
+        handle.user_id = user_id
+        _handles[query_id] = handle
+        cache_bus.subscribe(cancel_topic(query_id, user_id), handle.on_cancel)
+
+        async def first_page() -> Dict[str, Any]:
+            if not handle.from_cache and not admitted:
+                await query_admission.acquire(query_id, user_id, source)
+            started = time.perf_counter()
+            await handle.open(engine, sql)
+            rows = await handle.fetch()
+            return handle.page(rows, time.perf_counter() - started)
+
+        return await QueryExecutionService._read(handle, first_page)
+
+    @staticmethod
+    def _owned(query_id: str, user_id: Hashable) -> ResultHandle:
+        """The user's open result; other users' results are reported as missing"""
+        handle = _handles.get(query_id)
+        if handle is None or handle.user_id != user_id:
+            raise ResultNotFound(
+                f"No open result for query {query_id}; it finished, expired or is held by another worker"
+            )
+        return handle
+
+    @staticmethod
+    async def fetch_page(query_id: str, page: int, arrow: bool = False, user_id: Hashable = None) -> Dict[str, Any]:
+        """The next page of the user's open result; pages are read in order"""
+        handle = QueryExecutionService._owned(query_id, user_id)
+        async with handle.lock:
+            if page != handle.next_page:
+                raise ValueError(f"Results are read forward only; the next page is {handle.next_page}")
+            handle.arrow = arrow
+
+            async def next_page() -> Dict[str, Any]:
+                started = time.perf_counter()
+                rows = await handle.fetch()
+                return handle.page(rows, time.perf_counter() - started)
+
+            return await QueryExecutionService._read(handle, next_page)
+
+    @staticmethod
+    async def _read(handle: ResultHandle, operation: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run a fetch, keeping the handle open only while more pages remain"""
+        try:
+            page = await handle.run(operation)
+        except BaseException:
+            await handle.close()
+            raise
+        if page["has_more"]:
+            handle.touch()
+        else:
+            await handle.close()
+            if handle.collector is not None:
+                QueryExecutionService._store(handle)
+        return page
+
+    @staticmethod
+    def _store(handle: ResultHandle) -> None:
+        """Cache a fully read result in the background"""
+        task = asyncio.create_task(
+            asyncio.to_thread(result_cache.put, handle.cache_key, handle.source, handle.collector, handle.truncated)
+        )
+        _storing.add(task)
+        task.add_done_callback(_storing.discard)
+
+    @staticmethod
+    async def stream(
+        sql: str,
+        source: str,
+        query_id: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        page_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        user_context: Sequence[Tuple[str, str]] = (),
+        use_cache: bool = True,
+        user_id: Hashable = None,
+        preview: bool = False,
+        stream_rows: Optional[int] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        arrow: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run sql and yield its pages as they are read, until the result is exhausted
+        or stream_rows rows were sent. If the stream is abandoned part way, the
+        query is cancelled; if it stops at stream_rows, the rest is read with fetch_page.
+        With arrow, the pages' rows are Arrow tables.
+        """
+        page_size = min(page_size or QUERY_PAGE_SIZE, QUERY_MAX_PAGE_SIZE)
+        stream_rows = stream_rows or QUERY_STREAM_ROWS
+        page = await QueryExecutionService.execute(
+            sql, source, query_id=query_id, timeout_seconds=timeout_seconds,
+            page_size=min(QUERY_STREAM_FIRST_ROWS, page_size), max_rows=max_rows, user_context=user_context,
+            use_cache=use_cache, arrow=arrow, user_id=user_id, preview=preview, parameters=parameters,
+        )
+        handle = _handles.get(page["query_id"])
+        if handle is not None:
+            handle.page_size = page_size
+        sent = 0
+        finished = False
+        try:
+            while True:
+                sent += page["row_count"]
+                yield page
+                if not page["has_more"] or sent >= stream_rows:
+                    finished = True
+                    return
+                page = await QueryExecutionService.fetch_page(
+                    page["query_id"], page["page"] + 1, arrow=arrow, user_id=user_id
+                )
+        finally:
+            if not finished:
+                QueryExecutionService.cancel(page["query_id"], user_id)
+
+    @staticmethod
+    async def read_all(
+        sql: str,
+        source: str,
+        timeout_seconds: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        user_context: Sequence[Tuple[str, str]] = (),
+    ) -> Dict[str, Any]:
+        """
+        The whole result as one page whose rows are an Arrow table, from the result
+        cache when valid. Read in query worker processes, whose jobs hold their
+        query slots in the web worker (see query_workers).
+        """
+        if arrow_results.load_pyarrow() is None:
+            raise RuntimeError("Whole results are read as Arrow tables: install fastset-backend[analytics]")
+        started = time.perf_counter()
+        page = await QueryExecutionService.execute(
+            sql, source, timeout_seconds=timeout_seconds, page_size=QUERY_MAX_PAGE_SIZE,
+            max_rows=max_rows, user_context=user_context, arrow=True, admitted=True,
+        )
+        first, tables = page, [page["rows"]]
+        while page["has_more"]:
+            page = await QueryExecutionService.fetch_page(page["query_id"], page["page"] + 1, arrow=True)
+            tables.append(page["rows"])
+        try:
+            table = arrow_results.pa.concat_tables(tables, promote_options="default")
+        except arrow_results.pa.ArrowException as e:
+            raise ValueError(f"Pages of the result have conflicting column types: {e}")
+        return {
+            **first,
+            "rows": table,
+            "row_count": table.num_rows,
+            "has_more": False,
+            "truncated": page["truncated"],
+            "execution_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    @staticmethod
+    def status(query_id: str, user_id: Hashable = None) -> Dict[str, Any]:
+        """Whether the user's query on this worker is waiting for a slot or running"""
+        handle = _handles.get(query_id)
+        if handle is None or handle.user_id != user_id:
+            raise ResultNotFound(f"No query {query_id} on this worker; it finished or is held by another")
+        status = query_admission.status(query_id) or {"state": "running", "position": None, "waiting_for": None}
+        return {"query_id": query_id, **status}
+
+    @staticmethod
+    def cancel(query_id: str, user_id: Hashable = None) -> bool:
+        """Cancel the user's query and release its result on any worker; True if this worker held it"""
+        handle = _handles.get(query_id)
+        local = handle is not None and handle.user_id == user_id
+        cache_bus.publish([cancel_topic(query_id, user_id)])
+        return local
+
+    @staticmethod
+    async def close_all() -> None:
+        """Release every open result, e.g. at shutdown"""
+        for handle in list(_handles.values()):
+            await handle.stop()
+        await asyncio.gather(*_storing, return_exceptions=True)
@@ -0,0 +1,124 @@
+"""
+Row limits and sampling for editor queries
+Before a query runs, its SQL is parsed and given a LIMIT one past the row cap,
+so the source stops producing rows the editor would never fetch; the extra row
+tells whether the result was truncated. Queries with a LIMIT of their own at or
+under the cap are left alone, larger ones and those with an OFFSET get the cap
+in place of their own, and non-literal ones are wrapped in an outer query with
+the cap. In preview mode a query over a single named table reads a TABLESAMPLE
+of it instead, on sources that have one.
+
+Requires the optional `sql` extra (sqlglot); without it, or for SQL it cannot
+parse, queries run as written and are only cut off as they are fetched.
+"""
+import os
+import re
+from typing import Any, Optional, Tuple
+
+QUERY_REWRITE_LIMITS = os.getenv("FASTSET_QUERY_REWRITE_LIMITS", "true").lower() == "true"
+# Share of each table's pages preview queries read
+QUERY_PREVIEW_PERCENT = float(os.getenv("FASTSET_QUERY_PREVIEW_PERCENT", "1"))
+
+# Data source dialects as sqlglot names them
+SQLGLOT_DIALECTS = {"postgresql": "postgres", "sqlite": "sqlite", "mysql": "mysql", "duckdb": "duckdb"}
+# Dialects with block-level TABLESAMPLE SYSTEM
+SAMPLING_DIALECTS = {"postgresql", "duckdb"}
+
+# Statements that return rows and can take a LIMIT; EXPLAIN, SHOW and the like are left alone
+_QUERY = re.compile(r"^(\s|--[^\n]*(\n|$)|/\*.*?\*/)*(\(\s*)*(select|with|values|table)\b", re.IGNORECASE | re.DOTALL)
+
+# Imported by load_sqlglot() on first use
+sqlglot = None
+
+
+def load_sqlglot() -> Optional[Any]:
+    """The sqlglot module, or None when it is not installed"""
+    global sqlglot
+    if sqlglot is None:
+        try:
+            import sqlglot as module
+        except ImportError:
+            return None
+        sqlglot = module
+    return sqlglot
+
+
+def is_query(sql: str) -> bool:
+    return bool(_QUERY.match(sql))
+
+
+def _parse(sql: str, dialect: str) -> Optional[Any]:
+    """The single query in sql, or None for anything else or anything sqlglot cannot read"""
+    if not is_query(sql) or load_sqlglot() is None or dialect not in SQLGLOT_DIALECTS:
+        return None
+    try:
+        statements = [
+            s for s in sqlglot.parse(sql, read=SQLGLOT_DIALECTS[dialect])
+            if s is not None and not isinstance(s, sqlglot.exp.Semicolon)
+        ]
+    except sqlglot.errors.SqlglotError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], sqlglot.exp.Query):
+        return None
+    return statements[0]
+
+
+def _sample(query: Any, dialect: str, percent: float) -> bool:
+    """
+    Read the query's only table through TABLESAMPLE; False when it reads none or
+    several, or its source is a table function rather than a named table
+    """
+    exp = sqlglot.exp
+    ctes = {cte.alias_or_name for cte in query.find_all(exp.CTE)}
+    tables = [table for table in query.find_all(exp.Table) if table.name not in ctes or table.db]
+    if dialect not in SAMPLING_DIALECTS or len(tables) != 1 or tables[0].args.get("sample"):
+        return False
+    if not isinstance(tables[0].this, exp.Identifier):
+        return False
+    tables[0].set("sample", exp.TableSample(method=exp.var("SYSTEM"), percent=exp.Literal.number(percent)))
+    return True
+
+
+def _limit(query: Any, sql: str, dialect: str, limit: int) -> str:
+    """sql returning at most limit rows"""
+    exp = sqlglot.exp
+    existing = query.args.get("limit")
+    literal = isinstance(existing, exp.Limit) and existing.expression.is_int
+    if literal and int(existing.expression.name) <= limit:
+        return sql
+    if literal or (existing is None and query.args.get("offset")):
+        # Replaced in the parsed query, which keeps the OFFSET and any locking clause in order
+        return _placeholders(query.limit(limit)).sql(dialect=SQLGLOT_DIALECTS[dialect])
+    # Up to the query's last token, leaving out trailing semicolons and comments
+    tokens = sqlglot.tokenize(sql, read=SQLGLOT_DIALECTS[dialect])
+    body = sql[:[t for t in tokens if t.token_type != sqlglot.tokens.TokenType.SEMICOLON][-1].end + 1]
+    if existing is None and not query.args.get("offset") and not query.args.get("locks"):
+        # On its own line, past any comment on the last one
+        return f"{body}\nLIMIT {limit}"
+    return f"SELECT * FROM (\n{body}\n) AS fastset_limited LIMIT {limit}"
+
+
+def _placeholders(query: Any) -> Any:
+    """query with its :name placeholders kept as written rather than in the dialect's own style"""
+    exp = sqlglot.exp
+    return query.transform(
+        lambda node: exp.var(f":{node.name}") if isinstance(node, exp.Placeholder) and node.this else node
+    )
+
+
+def rewrite(sql: str, dialect: str, max_rows: int, preview: bool = False) -> Tuple[str, bool]:
+    """
+    sql as it should run, limited to max_rows + 1 rows and sampled in preview
+    mode, and whether it was sampled
+    """
+    if not QUERY_REWRITE_LIMITS and not preview:
+        return sql, False
+    query = _parse(sql, dialect)
+    if query is None:
+        return sql, False
+    sampled = preview and _sample(query, dialect, QUERY_PREVIEW_PERCENT)
+    if sampled:
+        sql = _placeholders(query).sql(dialect=SQLGLOT_DIALECTS[dialect])
+    if QUERY_REWRITE_LIMITS:
+        sql = _limit(query, sql, dialect, max_rows + 1)
+    return sql, sampled
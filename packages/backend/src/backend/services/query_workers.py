@@ -0,0 +1,230 @@
+"""
+Query worker pool
+Whole-result jobs (run a query, read every row, convert it to Arrow, and either
+encode it or write it out as an extract) run in a pool of worker processes, so
+their CPU work never holds up the web event loop. Queued jobs start in priority
+order, interactive before scheduled, and each user has a cap on jobs running at
+once. A job also holds one of its user's query_admission slots and one of its
+source's for as long as it runs, taken in the web worker with the submitting
+user's id, so pool jobs and editor queries count against the same limits; the
+query the job runs in the worker process does not take a slot there. Jobs and
+their results belong to the web worker that accepted them, and finished ones
+are kept for a while for their owner to collect.
+"""
+import asyncio
+import bisect
+import itertools
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.services.query_admission import query_admission
+
+QUERY_WORKERS = int(os.getenv("FASTSET_QUERY_WORKERS", "2"))
+# Jobs one user may have running at once; the rest wait even when workers are free
+QUERY_WORKER_USER_CONCURRENCY = int(os.getenv("FASTSET_QUERY_WORKER_USER_CONCURRENCY", "2"))
+QUERY_MAX_QUEUED_JOBS = int(os.getenv("FASTSET_QUERY_MAX_QUEUED_JOBS", "100"))
+# How long a finished job's result is kept for its owner to collect
+QUERY_JOB_RESULT_SECONDS = float(os.getenv("FASTSET_QUERY_JOB_RESULT_SECONDS", "300"))
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "scheduled": 1}
+
+
+class JobNotFound(Exception):
+    """No job with this id for this user on this worker"""
+
+
+# Each worker process keeps one event loop, so data source pools outlive a job
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run(coroutine):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coroutine)
+
+
+def query_job(
+    sql: str,
+    source: str,
+    timeout_seconds: Optional[float],
+    max_rows: Optional[int],
+    user_context: Sequence[Tuple[str, str]],
+) -> bytes:
+    """Worker process: the whole result as an Arrow IPC stream"""
+    from backend.services.arrow_results import encode_page
+    from backend.services.query_execution import QueryExecutionService
+
+    result = _run(QueryExecutionService.read_all(sql, source, timeout_seconds, max_rows, user_context))
+    return encode_page(result)
+
+
+def extract_job(
+    name: str,
+    directory: str,
+    sql: str,
+    source: str,
+    timeout_seconds: Optional[float],
+    user_context: Sequence[Tuple[str, str]],
+) -> Dict[str, Any]:
+    """Worker process: write the whole result as a Parquet extract"""
+    from backend.services.duckdb_source import write_extract
+    from backend.services.query_execution import QueryExecutionService
+
+    result = _run(QueryExecutionService.read_all(sql, source, timeout_seconds, None, user_context))
+    write_extract(directory, name, result["rows"])
+    return {"row_count": result["row_count"], "truncated": result["truncated"]}
+
+
+class QueryJob:
+    """A queued, running or finished job"""
+
+    def __init__(self, user_id: int, source: str, priority: str, function: Callable[..., Any], args: Tuple[Any, ...]):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.source = source
+        self.priority = priority
+        self.function = function
+        self.args = args
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.exception: Optional[BaseException] = None
+        self.finished = asyncio.Event()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": self.priority,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": str(self.exception) if self.exception else None,
+        }
+
+
+class QueryWorkerPool:
+    """Process pool with a priority queue and per-user concurrency caps in front of it"""
+
+    def __init__(self, workers: int = QUERY_WORKERS, user_concurrency: int = QUERY_WORKER_USER_CONCURRENCY):
+        self.workers = workers
+        self.user_concurrency = user_concurrency
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, QueryJob] = {}
+        # (priority, sequence, job), kept sorted
+        self._queued: List[Tuple[int, int, QueryJob]] = []
+        self._sequence = itertools.count()
+        self._running: Dict[int, int] = {}
+        self._active = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process with a running event loop and driver threads is not safe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(
+        self, function: Callable[..., Any], *args: Any, user_id: int, source: str, priority: str = "interactive"
+    ) -> QueryJob:
+        """Queue function(*args), a query on source, to run in a worker process"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+        if len(self._queued) >= QUERY_MAX_QUEUED_JOBS:
+            raise ValueError(f"Too many queued query jobs ({QUERY_MAX_QUEUED_JOBS}); try again shortly")
+        job = QueryJob(user_id, source, priority, function, args)
+        self._jobs[job.job_id] = job
+        # Sequence numbers are unique, so jobs themselves are never compared
+        bisect.insort(self._queued, (PRIORITIES[priority], next(self._sequence), job))
+        self._dispatch()
+        return job
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while workers are free, best priority first, passing over users at their cap"""
+        for entry in list(self._queued):
+            if self._active >= self.workers:
+                return
+            job = entry[2]
+            if self._running.get(job.user_id, 0) >= self.user_concurrency:
+                continue
+            self._queued.remove(entry)
+            self._start(job)
+
+    def _start(self, job: QueryJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        self._active += 1
+        self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+        task = asyncio.create_task(self._run(job))
+        task.add_done_callback(lambda done: self._finish(job, done))
+
+    async def _run(self, job: QueryJob) -> Any:
+        """Run the job in a worker process once its user and source have a query slot free"""
+        await query_admission.acquire(job.job_id, job.user_id, job.source)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), job.function, *job.args)
+        finally:
+            query_admission.release(job.job_id)
+
+    def _finish(self, job: QueryJob, future: asyncio.Future) -> None:
+        self._active -= 1
+        self._running[job.user_id] -= 1
+        if not self._running[job.user_id]:
+            del self._running[job.user_id]
+        exception = None if future.cancelled() else future.exception()
+        if future.cancelled():
+            job.status = "cancelled"
+        elif job.status == "running":
+            job.exception = exception
+            job.result = None if exception else future.result()
+            job.status = "failed" if exception else "done"
+        if isinstance(exception, BrokenProcessPool):
+            # A worker died (e.g. out of memory); the next job gets a fresh pool
+            self._executor = None
+        self._close(job)
+        self._dispatch()
+
+    def _close(self, job: QueryJob) -> None:
+        job.finished_at = time.time()
+        job.finished.set()
+        asyncio.get_running_loop().call_later(QUERY_JOB_RESULT_SECONDS, self._jobs.pop, job.job_id, None)
+
+    def get(self, job_id: str, user_id: int) -> QueryJob:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            raise JobNotFound(f"No query job {job_id}; it expired or is held by another worker")
+        return job
+
+    async def wait(self, job: QueryJob) -> Any:
+        """The job's result once it finishes, raising what it raised"""
+        await job.finished.wait()
+        if job.exception:
+            raise job.exception
+        return job.result
+
+    def cancel(self, job: QueryJob) -> None:
+        """Drop a queued job, or discard a running one's result; running queries stop at their timeout"""
+        if job.status == "queued":
+            self._queued = [entry for entry in self._queued if entry[2] is not job]
+            job.status = "cancelled"
+            self._close(job)
+        elif job.status == "running":
+            job.status = "cancelled"
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, dropping queued work"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+query_workers = QueryWorkerPool()
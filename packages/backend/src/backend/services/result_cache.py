@@ -0,0 +1,393 @@
+"""
+Result cache for editor queries
+Results are keyed on the normalized SQL and its bind parameters, the data
+source, the row cap and the querying user's ABAC attributes, and kept as Arrow
+tables in two tiers: memory in each worker, and Arrow IPC files on local disk
+shared by the workers on one host. Each tier evicts its least recently used entries past a byte budget, and
+entries expire after their source's TTL.
+
+Requires the optional `analytics` extra (pyarrow); without it nothing is cached.
+"""
+import hashlib
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.services.arrow_results import load_pyarrow
+
+# Set by _load_pyarrow() on first use
+pa = None
+
+# Seconds results stay valid, overridable per source with a JSON object of name to seconds;
+# 0 turns caching off
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("FASTSET_RESULT_CACHE_TTL_SECONDS", "300"))
+RESULT_CACHE_SOURCE_TTLS: Dict[str, float] = json.loads(os.getenv("FASTSET_RESULT_CACHE_SOURCE_TTLS", "{}"))
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv("FASTSET_RESULT_CACHE_MEMORY_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_DISK_BYTES = int(os.getenv("FASTSET_RESULT_CACHE_DISK_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Larger results are not cached at all
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("FASTSET_RESULT_CACHE_MAX_ENTRY_BYTES", str(64 * 1024 * 1024)))
+# Empty to keep the memory tier only. Holds query results, so it must be private to
+# the account the workers run as; the disk tier is skipped when it is not.
+_CACHE_DIR_NAME = f"fastset-result-cache-{os.getuid()}" if hasattr(os, "getuid") else "fastset-result-cache"
+RESULT_CACHE_DIR = os.getenv("FASTSET_RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), _CACHE_DIR_NAME))
+
+# Quoted literals and identifiers, and comments with the line end closing them
+_VERBATIM = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*\n?|/\*.*?\*/)""", re.DOTALL)
+
+
+def _load_pyarrow() -> bool:
+    global pa
+    pa = pa or load_pyarrow()
+    return pa is not None
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    SQL with whitespace collapsed and trailing semicolons dropped, leaving quoted
+    text and comments alone: where a line comment ends decides what it hides
+    """
+    parts = _VERBATIM.split(sql.strip().rstrip(";").strip())
+    # Odd parts are the quoted literals and identifiers and the comments
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def cache_key(
+    sql: str,
+    source: str,
+    max_rows: int,
+    user_context: Sequence[Tuple[str, str]] = (),
+    parameters: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Content address of a query's result"""
+    payload = json.dumps(
+        {
+            "sql": normalize_sql(sql),
+            "parameters": parameters or {},
+            "source": source,
+            "max_rows": max_rows,
+            "user": sorted([name, value] for name, value in user_context),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResult:
+    """A result held as an Arrow table"""
+
+    def __init__(self, table, truncated: bool, expires: float):
+        self.table = table
+        self.truncated = truncated
+        # Wall clock, so disk entries expire the same for every worker
+        self.expires = expires
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    @property
+    def row_count(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+
+class ResultCollector:
+    """Builds a result's Arrow table page by page as it is read, giving up past the size limit"""
+
+    def __init__(self, columns: Sequence[str], max_bytes: int = RESULT_CACHE_MAX_ENTRY_BYTES):
+        self.columns = list(columns)
+        self.max_bytes = max_bytes
+        self.pages: List[Any] = []
+        self.nbytes = 0
+        self.failed = False
+
+    def add(self, page, exact: bool) -> None:
+        """Add a page converted by to_arrow; pages it could not convert exactly spoil the result"""
+        if self.failed:
+            return
+        self.nbytes += page.nbytes
+        if not exact or self.nbytes > self.max_bytes:
+            self.discard()
+            return
+        self.pages.append(page)
+
+    def discard(self) -> None:
+        self.failed = True
+        self.pages = []
+
+    def table(self):
+        """The whole result, or None when it cannot be cached"""
+        if self.failed or not self.pages:
+            return None
+        try:
+            # Pages typed null (all values missing) take the type of the others
+            return pa.concat_tables(self.pages, promote_options="default")
+        except pa.ArrowException:
+            return None
+
+
+class MemoryTier:
+    """LRU of cached results within a byte budget"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.time():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResult) -> int:
+        """Store entry and return how many others were evicted for it"""
+        self.pop(key)
+        if entry.nbytes > self.max_bytes:
+            return 0
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        evicted = 0
+        while self.nbytes > self.max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self.nbytes -= oldest.nbytes
+            evicted += 1
+        return evicted
+
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+
+def private_directory(path: str) -> bool:
+    """Create path for this account alone; False when it exists and another account could read or write it"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        return False
+    return True
+
+
+class DiskTier:
+    """Arrow IPC files in a directory shared by the workers on one host, LRU by modification time"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._warned = False
+
+    def ready(self) -> bool:
+        """Whether the directory is private; checked on every use, since it may be removed and recreated"""
+        if private_directory(self.directory):
+            return True
+        if not self._warned:
+            self._warned = True
+            print(f"Result cache directory {self.directory} is not private to this account; caching in memory only")
+        return False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every entry, oldest first"""
+        files = []
+        if not self.ready():
+            return files
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return files
+        for name in names:
+            if not name.endswith(".arrow"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+        return sorted(files)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        if not self.ready():
+            return None
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                metadata = reader.schema.metadata or {}
+                expires = float(metadata.get(b"expires", 0))
+                if expires < time.time():
+                    raise FileNotFoundError(path)
+                table = reader.read_all()
+            # Reads count as use for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.pop(key)
+            return None
+        except (OSError, pa.ArrowException):
+            # Half-written or corrupt
+            self.pop(key)
+            return None
+        return CachedResult(table, metadata.get(b"truncated") == b"true", expires)
+
+    def put(self, key: str, entry: CachedResult) -> int:
+        """Write entry and return how many others were evicted for it"""
+        if entry.nbytes > self.max_bytes or not self.ready():
+            return 0
+        metadata = {b"expires": str(entry.expires).encode(), b"truncated": b"true" if entry.truncated else b"false"}
+        table = entry.table.replace_schema_metadata(metadata)
+        # Written aside and renamed so readers in other workers never see a partial file
+        temporary = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            with pa.OSFile(temporary, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(temporary, self._path(key))
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        return self._evict()
+
+    def _evict(self) -> int:
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Tuple[int, int]:
+        """Entry count and bytes on disk"""
+        files = self._files()
+        return len(files), sum(size for _, size, _ in files)
+
+    def pop(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for _, _, path in self._files():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class ResultCache:
+    """Two-tier cache of editor query results, with hit counters for this worker"""
+
+    def __init__(
+        self,
+        memory_bytes: int = RESULT_CACHE_MEMORY_BYTES,
+        disk_bytes: int = RESULT_CACHE_DISK_BYTES,
+        directory: str = RESULT_CACHE_DIR,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        source_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = DiskTier(directory, disk_bytes) if directory and disk_bytes > 0 else None
+        self.ttl_seconds = ttl_seconds
+        self.source_ttls = RESULT_CACHE_SOURCE_TTLS if source_ttls is None else source_ttls
+        # Results are stored from worker threads
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def ttl(self, source: str) -> float:
+        return float(self.source_ttls.get(source, self.ttl_seconds))
+
+    def enabled(self, source: str) -> bool:
+        return self.ttl(source) > 0 and _load_pyarrow()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """A valid cached result, promoted to memory when found on disk"""
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.counters["memory_hits"] += 1
+                return entry
+        entry = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self.counters["evictions"] += self.memory.put(key, entry)
+        return entry
+
+    def collector(self, source: str, columns: Sequence[str]) -> Optional[ResultCollector]:
+        """A collector for a result about to be read, or None when the source is not cached"""
+        if not self.enabled(source):
+            return None
+        return ResultCollector(columns)
+
+    def put(self, key: str, source: str, collector: ResultCollector, truncated: bool) -> bool:
+        """Store a fully read result; slow for large results, so callers run it off the event loop"""
+        table = collector.table()
+        if table is None:
+            return False
+        entry = CachedResult(table, truncated, time.time() + self.ttl(source))
+        evicted = self.disk.put(key, entry) if self.disk else 0
+        with self._lock:
+            evicted += self.memory.put(key, entry)
+            self.counters["stores"] += 1
+            self.counters["evictions"] += evicted
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            memory_entries, memory_bytes = len(self.memory), self.memory.nbytes
+        disk_entries, disk_bytes = self.disk.stats() if self.disk else (0, 0)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_hit_ratio": round(counters["memory_hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "memory_bytes": memory_bytes,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,116 @@
+"""
+Prepared statement reuse for editor and dashboard queries
+PostgreSQL and SQLite connections keep the statements they run prepared, keyed
+on the statement text: asyncpg connections through SQLAlchemy's
+prepared_statement_cache_size and sqlite3 ones through cached_statements. A
+statement a pooled connection has seen is not parsed and planned again, so
+dashboard tiles that send their values as bind parameters are prepared once per
+connection however often they refresh.
+
+Reuse is tracked per connection with the same LRU the drivers keep, which gives
+each source's hit ratio. Queries are also grouped into shapes, their SQL with
+literals taken out; a shape run as many different statements is one whose
+literals should be parameters.
+"""
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, MutableMapping, Tuple
+
+from sqlalchemy.engine import URL
+
+from backend.services.result_cache import normalize_sql
+
+# Statements each pooled connection keeps prepared; 0 turns reuse off
+QUERY_STATEMENT_CACHE_SIZE = int(os.getenv("FASTSET_QUERY_STATEMENT_CACHE_SIZE", "256"))
+# Query shapes counted per source, least recently run dropped first
+QUERY_STATEMENT_SHAPES = int(os.getenv("FASTSET_QUERY_STATEMENT_SHAPES", "1000"))
+
+# Dialects whose drivers keep statements prepared
+PREPARING_DIALECTS = {"postgresql", "sqlite"}
+
+# Where a connection's prepared statements are tracked, in its pool record's info
+_INFO_KEY = "fastset_statements"
+# Distinct statements counted per shape
+_SHAPE_STATEMENTS = 100
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def engine_options(url: URL) -> Tuple[URL, Dict[str, Any]]:
+    """The URL and engine arguments that size the driver's statement cache"""
+    backend = url.get_backend_name()
+    if backend == "postgresql" and "prepared_statement_cache_size" not in url.query:
+        return url.update_query_dict({"prepared_statement_cache_size": str(QUERY_STATEMENT_CACHE_SIZE)}), {}
+    if backend == "sqlite":
+        return url, {"connect_args": {"cached_statements": QUERY_STATEMENT_CACHE_SIZE}}
+    return url, {}
+
+
+def query_shape(sql: str) -> str:
+    """sql with whitespace normalized and its string and number literals replaced by ?"""
+    return _LITERAL.sub("?", normalize_sql(sql))
+
+
+class StatementCache:
+    """Statements prepared on each pooled connection, with hit counts and query shapes per source"""
+
+    def __init__(self, size: int = QUERY_STATEMENT_CACHE_SIZE, max_shapes: int = QUERY_STATEMENT_SHAPES):
+        self.size = size
+        self.max_shapes = max_shapes
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._shapes: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+
+    def record(self, info: MutableMapping, source: str, sql: str) -> bool:
+        """Count a statement run on a connection; True when the connection had it prepared"""
+        statements = info.setdefault(_INFO_KEY, OrderedDict())
+        hit = sql in statements
+        if hit:
+            statements.move_to_end(sql)
+        else:
+            statements[sql] = None
+            while len(statements) > self.size:
+                statements.popitem(last=False)
+        counters = self._counters.setdefault(source, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+        shapes = self._shapes.setdefault(source, OrderedDict())
+        shape = query_shape(sql)
+        entry = shapes.get(shape)
+        if entry is None:
+            entry = shapes[shape] = {"executions": 0, "hits": 0, "statements": set()}
+            while len(shapes) > self.max_shapes:
+                shapes.popitem(last=False)
+        else:
+            shapes.move_to_end(shape)
+        entry["executions"] += 1
+        entry["hits"] += hit
+        if len(entry["statements"]) < _SHAPE_STATEMENTS:
+            entry["statements"].add(hashlib.sha1(sql.encode("utf-8")).digest())
+        return hit
+
+    def stats(self, top: int = 20) -> List[Dict[str, Any]]:
+        """Hit ratio per source, with its most run shapes"""
+        sources = []
+        for source, counters in sorted(self._counters.items()):
+            runs = counters["hits"] + counters["misses"]
+            shapes = sorted(self._shapes.get(source, {}).items(), key=lambda item: -item[1]["executions"])
+            sources.append({
+                "source": source,
+                **counters,
+                "hit_ratio": round(counters["hits"] / runs, 4) if runs else 0.0,
+                "shapes": [
+                    {
+                        "shape": shape,
+                        "executions": entry["executions"],
+                        "hits": entry["hits"],
+                        "statements": len(entry["statements"]),
+                    }
+                    for shape, entry in shapes[:top]
+                ],
+            })
+        return sources
+
+
+statement_cache = StatementCache()
@@ -0,0 +1,55 @@
+"""
+Streaming list responses
+Rows are read through a server-side cursor with `yield_per` and encoded as NDJSON
+one batch at a time, so memory stays flat however many rows the caller pulls.
+"""
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from backend.responses import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched from the cursor and encoded per chunk
+STREAM_BATCH_SIZE = int(os.getenv("FASTSET_STREAM_BATCH_SIZE", "1000"))
+
+Finish = Callable[[Session, List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+class StreamRequest:
+    """An NDJSON stream requested with `Accept: application/x-ndjson`"""
+
+    def __init__(self, limit: Optional[int] = None):
+        # Streams are unbounded unless the caller passed `limit` explicitly
+        self.limit = limit
+
+    def window(self, query: Query, skip: int = 0) -> Query:
+        """Apply skip, and limit only when the caller asked for one"""
+        query = query.offset(skip) if skip else query
+        return query.limit(self.limit) if self.limit else query
+
+
+def iter_ndjson(
+    engine: Engine,
+    statement,
+    finish: Optional[Finish] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """
+    Execute statement on its own connection and yield NDJSON chunks
+    finish may complete each batch, e.g. attach nested collections with one query per batch
+    """
+    # The request session is closed before the body is sent, so the stream owns its connection
+    with engine.connect() as conn:
+        db = Session(bind=conn)
+        try:
+            result = db.execute(statement, execution_options={"yield_per": batch_size})
+            for rows in result.mappings().partitions():
+                items = [dict(row) for row in rows]
+                if finish is not None:
+                    items = finish(db, items)
+                yield b"".join(dumps(item) + b"\n" for item in items)
+        finally:
+            db.close()
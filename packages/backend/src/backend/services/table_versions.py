@@ -0,0 +1,108 @@
+"""
+Per-table write versions for HTTP caching
+Every flush or ORM bulk statement touching a tracked table bumps that table's
+version in the same transaction, so GET routes can validate ETags with a single
+primary key lookup instead of re-running their query.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Sequence
+
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from backend.models.abac import TableVersion
+
+# Tables whose GET routes are served with ETags; association tables count
+# towards the entity they decorate
+TRACKED_TABLES = {
+    "resources": "resources",
+    "resource_attributes": "resources",
+    "actions": "actions",
+    "attributes": "attributes",
+    "policies": "policies",
+}
+
+# Seconds clients may reuse a response before revalidating
+CACHE_MAX_AGE = int(os.getenv("FASTSET_ABAC_CACHE_MAX_AGE", "0"))
+
+
+def _tracked(table_names: Iterable[str]) -> set:
+    return {TRACKED_TABLES[name] for name in table_names if name in TRACKED_TABLES}
+
+
+class TableVersionService:
+    """Reads and bumps table versions and derives cache headers from them"""
+
+    @staticmethod
+    def bump(db: Session, tables: Iterable[str]) -> None:
+        """Increment the version of each table, creating missing rows"""
+        tables = sorted(set(tables))
+        if not tables:
+            return
+        rows = [{"name": name, "version": 1} for name in tables]
+        bumped = {"version": TableVersion.version + 1, "updated_at": datetime.now(timezone.utc)}
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            db.execute(insert(TableVersion).values(rows).on_conflict_do_update(index_elements=["name"], set_=bumped))
+            return
+        # Without an upsert: bump the rows that exist, then create the rest
+        db.execute(update(TableVersion).where(TableVersion.name.in_(tables)).values(**bumped))
+        existing = set(db.execute(select(TableVersion.name).where(TableVersion.name.in_(tables))).scalars())
+        missing = [row for row in rows if row["name"] not in existing]
+        if missing:
+            db.execute(TableVersion.__table__.insert(), missing)
+
+    @staticmethod
+    def get_versions(db: Session, tables: Sequence[str]) -> Dict[str, int]:
+        """Current version of each table; tables never written are at 0"""
+        rows = db.execute(select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables)))
+        versions = {name: 0 for name in tables}
+        versions.update(dict(rows.all()))
+        return versions
+
+    @staticmethod
+    def etag(db: Session, tables: Sequence[str], representation: str) -> str:
+        """Strong ETag for a representation built from the given tables"""
+        versions = TableVersionService.get_versions(db, tables)
+        key = ";".join(f"{name}={versions[name]}" for name in sorted(versions)) + "|" + representation
+        return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24] + '"'
+
+    @staticmethod
+    def cache_headers(etag: str) -> Dict[str, str]:
+        """Headers sent with both full and 304 responses"""
+        return {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={CACHE_MAX_AGE}, must-revalidate",
+        }
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = (tag.strip() for tag in if_none_match.split(","))
+        return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def track_table_versions(session_factory) -> None:
+    """Bump versions for tracked tables written through sessions of session_factory"""
+
+    @event.listens_for(session_factory, "after_flush")
+    def after_flush(session, flush_context):
+        objects = list(session.new) + list(session.dirty) + list(session.deleted)
+        tables = _tracked(obj.__table__.name for obj in objects if hasattr(obj, "__table__"))
+        TableVersionService.bump(session, tables)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def on_orm_execute(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                TableVersionService.bump(orm_execute_state.session, _tracked([table.name]))
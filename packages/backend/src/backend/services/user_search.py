@@ -0,0 +1,163 @@
+"""
+User search service backed by trigram indexes
+Uses pg_trgm GIN indexes on PostgreSQL and an FTS5 trigram shadow table on SQLite
+"""
+
+from typing import List
+from sqlalchemy import Float, Integer, case, func, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+from backend.models.abac import User
+
+# Trigram indexes cannot answer terms shorter than a single trigram
+MIN_TRIGRAM_LENGTH = 3
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+]
+
+# External-content FTS5 table kept in sync with `users` by triggers, so every
+# insert, update and delete (ORM or raw SQL) is reflected without app code
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, email, content='users', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+]
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts5_phrase(term: str) -> str:
+    """Quote a search term as a single FTS5 phrase"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class UserSearchService:
+    """Ranked prefix and substring search over usernames and emails"""
+
+    # Engines known to have the SQLite shadow table, to skip the catalog lookup
+    _fts_engines = set()
+
+    @staticmethod
+    def ensure_search_index(engine: Engine) -> None:
+        """Create the dialect-specific search index if it does not exist"""
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            statements = POSTGRES_SEARCH_DDL
+        elif dialect == "sqlite":
+            statements = SQLITE_SEARCH_DDL
+        else:
+            return
+
+        try:
+            with engine.begin() as conn:
+                created = dialect == "sqlite" and not inspect(conn).has_table("users_fts")
+                for statement in statements:
+                    conn.execute(text(statement))
+                if created:
+                    # Index rows that existed before the shadow table
+                    conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        except Exception as e:
+            # Search falls back to unindexed matching if the index is unavailable
+            print(f"User search index unavailable ({dialect}): {e}")
+
+    @staticmethod
+    def search(db: Session, term: str, skip: int = 0, limit: int = 100) -> List[User]:
+        """Return users matching term, prefix matches first, then by relevance"""
+        return UserSearchService.build_query(db, term).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def build_query(db: Session, term: str) -> Query:
+        """Ranked search query for the best index available on this dialect"""
+        term = term.strip()
+        if not term:
+            return db.query(User)
+
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH and UserSearchService._has_fts(db):
+            return UserSearchService._sqlite_query(db, term)
+        if dialect == "postgresql":
+            return UserSearchService._postgres_query(db, term)
+        return UserSearchService._like_query(db, term)
+
+    @staticmethod
+    def _prefix_rank(term: str):
+        """Rank username prefix matches before email prefix and substring matches"""
+        prefix = f"{_escape_like(term)}%"
+        return case(
+            (User.username.ilike(prefix, escape="\\"), 0),
+            (User.email.ilike(prefix, escape="\\"), 1),
+            else_=2,
+        )
+
+    @staticmethod
+    def _postgres_query(db: Session, term: str):
+        """Substring match served by the pg_trgm GIN indexes"""
+        pattern = f"%{_escape_like(term)}%"
+        similarity = func.greatest(
+            func.similarity(User.username, term), func.similarity(User.email, term)
+        )
+        return (
+            db.query(User)
+            .filter(or_(User.username.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\")))
+            .order_by(UserSearchService._prefix_rank(term), similarity.desc(), User.username)
+        )
+
+    @staticmethod
+    def _sqlite_query(db: Session, term: str):
+        """Substring match served by the FTS5 trigram shadow table"""
+        matches = (
+            text("SELECT rowid AS id, rank FROM users_fts WHERE users_fts MATCH :phrase")
+            .bindparams(phrase=_fts5_phrase(term))
+            .columns(id=Integer, rank=Float)
+            .subquery()
+        )
+        return (
+            db.query(User)
+            .join(matches, matches.c.id == User.id)
+            .order_by(UserSearchService._prefix_rank(term), matches.c.rank, User.username)
+        )
+
+    @staticmethod
+    def _like_query(db: Session, term: str):
+        """Unindexed fallback for short terms and unsupported dialects"""
+        pattern = f"%{_escape_like(term)}%"
+        return (
+            db.query(User)
+            .filter(or_(User.username.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\")))
+            .order_by(UserSearchService._prefix_rank(term), User.username)
+        )
+
+    @staticmethod
+    def _has_fts(db: Session) -> bool:
+        """Check whether the SQLite shadow table has been created"""
+        bind = db.get_bind()
+        if bind.url not in UserSearchService._fts_engines:
+            if not inspect(bind).has_table("users_fts"):
+                return False
+            UserSearchService._fts_engines.add(bind.url)
+        return True
@@ -0,0 +1,57 @@
+"""
+SQLite audit log rotation
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.models.abac import AuditLog
+from backend.models.base import Base
+from backend.services.audit import AuditLogService
+from backend.services.audit_partitions import AuditPartitionManager, period_table
+
+NOW = datetime(2025, 3, 15, 12, tzinfo=timezone.utc)
+LAST_MONTH = datetime(2025, 2, 10, 12, tzinfo=timezone.utc)
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def add_logs(engine, *timestamps):
+    with Session(engine) as db:
+        db.add_all([AuditLog(decision="ALLOW", context={}, timestamp=ts) for ts in timestamps])
+        db.commit()
+
+
+def listed_ids(engine):
+    with Session(engine) as db:
+        return sorted(log.id for log in AuditLogService.get_audit_logs(db, limit=1000))
+
+
+def test_rows_inserted_after_rotation_get_new_ids(tmp_path):
+    engine = make_engine(tmp_path)
+    add_logs(engine, LAST_MONTH, LAST_MONTH)
+    AuditPartitionManager.rotate(engine, NOW)
+    add_logs(engine, NOW)
+
+    with engine.connect() as conn:
+        assert [name for name, _, _ in AuditPartitionManager.list_partitions(conn)] == ["audit_logs_p202502"]
+    assert listed_ids(engine) == [1, 2, 3]
+
+
+def test_legacy_table_is_rebuilt_past_rotated_ids(tmp_path):
+    engine = make_engine(tmp_path)
+    # audit_logs as created before it had AUTOINCREMENT
+    AuditLog.__table__.drop(engine)
+    period_table("audit_logs").create(engine)
+    add_logs(engine, LAST_MONTH, LAST_MONTH)
+    AuditPartitionManager.rotate(engine, NOW)
+
+    AuditPartitionManager.ensure_autoincrement(engine)
+    add_logs(engine, NOW, NOW)
+
+    assert listed_ids(engine) == [1, 2, 3, 4]
@@ -0,0 +1,75 @@
+"""
+Audit decision rollups across SQLite rotation
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from backend.models.abac import AuditDecisionRollup, AuditLog
+from backend.models.base import Base
+from backend.services.audit_partitions import AuditPartitionManager, period_table
+from backend.services.audit_rollup import AuditRollupService, refresh_lock
+
+NOW = datetime(2025, 3, 15, 12, tzinfo=timezone.utc)
+LAST_MONTH = datetime(2025, 2, 10, 12, tzinfo=timezone.utc)
+
+
+def make_engine(tmp_path, legacy=False):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    if legacy:
+        # audit_logs as created before it had AUTOINCREMENT, which reuses ids after rotation
+        AuditLog.__table__.drop(engine)
+        period_table("audit_logs").create(engine)
+    return engine
+
+
+def add_log(engine, decision, timestamp):
+    with Session(engine) as db:
+        db.add(AuditLog(decision=decision, context={}, timestamp=timestamp))
+        db.commit()
+
+
+def totals(engine):
+    with Session(engine) as db:
+        return db.execute(
+            select(func.sum(AuditDecisionRollup.allow_count), func.sum(AuditDecisionRollup.deny_count))
+        ).one()
+
+
+def rotate_and_refresh(engine):
+    add_log(engine, "ALLOW", LAST_MONTH)
+    add_log(engine, "ALLOW", LAST_MONTH + timedelta(minutes=1))
+    with Session(engine) as db:
+        assert AuditRollupService.refresh(db, NOW) == 2
+
+    AuditPartitionManager.rotate(engine, NOW)
+    add_log(engine, "DENY", NOW - timedelta(minutes=5))
+    with Session(engine) as db:
+        assert AuditRollupService.refresh(db, NOW) == 1
+        assert AuditRollupService.refresh(db, NOW) == 0
+
+
+def test_rows_after_rotation_are_rolled_up(tmp_path):
+    engine = make_engine(tmp_path)
+    rotate_and_refresh(engine)
+    assert totals(engine) == (2, 1)
+
+
+def test_reused_ids_after_rotation_are_rolled_up(tmp_path):
+    engine = make_engine(tmp_path, legacy=True)
+    rotate_and_refresh(engine)
+    assert totals(engine) == (2, 1)
+
+
+def test_refresh_skips_while_another_worker_refreshes(tmp_path):
+    engine = make_engine(tmp_path)
+    add_log(engine, "ALLOW", NOW - timedelta(minutes=5))
+    with Session(engine) as holder, refresh_lock(holder) as locked:
+        assert locked
+        with Session(engine) as db:
+            assert AuditRollupService.refresh(db, NOW) == 0
+    with Session(engine) as db:
+        assert AuditRollupService.refresh(db, NOW) == 1
+    assert totals(engine) == (1, 0)
@@ -0,0 +1,32 @@
+"""
+Bulk upserts against the natural key indexes they rely on
+"""
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from backend.models.abac import Resource
+from backend.models.base import Base
+from backend.services.bulk import BulkService
+
+RESOURCES = [{"name": "Reports", "resource_uri": "/reports", "resource_type": "folder"}]
+
+
+def test_upserts_match_rows_on_the_natural_key(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        BulkService.upsert_resources(db, RESOURCES)
+        BulkService.upsert_resources(db, [{**RESOURCES[0], "name": "All reports"}])
+        db.commit()
+        assert db.execute(select(Resource.name)).scalars().all() == ["All reports"]
+
+
+def test_upserts_name_a_missing_unique_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # As left by a migration that found duplicate resource_uris
+        conn.execute(text("DROP INDEX ux_resources_resource_uri"))
+    with Session(engine) as db, pytest.raises(ValueError, match="ux_resources_resource_uri"):
+        BulkService.upsert_resources(db, RESOURCES, on_conflict="error")
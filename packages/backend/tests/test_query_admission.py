@@ -0,0 +1,96 @@
+"""
+Query admission: per-user and per-source slots and the fair queue in front of them
+"""
+import asyncio
+
+from backend.services.query_admission import QueryAdmission, query_admission
+from backend.services.query_workers import QueryWorkerPool
+
+
+async def waiting(admission, query_id, user_id, source):
+    """Start acquiring a slot and let the queue see it"""
+    task = asyncio.create_task(admission.acquire(query_id, user_id, source))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_free_slots_go_to_the_user_with_fewest_running_queries():
+    async def scenario():
+        admission = QueryAdmission(user_concurrency=2, source_concurrency=2)
+        await admission.acquire("a1", "alice", "data")
+        await admission.acquire("a2", "alice", "data")
+        # alice queued first, but bob has nothing running
+        alice = await waiting(admission, "a3", "alice", "data")
+        bob = await waiting(admission, "b1", "bob", "data")
+        assert admission.status("a3")["state"] == "queued"
+        assert admission.status("b1") == {"state": "queued", "position": 2, "waiting_for": "source"}
+
+        admission.release("a1")
+        await asyncio.sleep(0)
+        assert bob.done() and not alice.done()
+        assert admission.status("b1")["state"] == "running"
+
+        admission.release("a2")
+        await asyncio.sleep(0)
+        assert alice.done()
+        assert admission.stats()["sources"] == {"data": 2}
+
+    asyncio.run(scenario())
+
+
+def test_user_limit_holds_whatever_the_source():
+    async def scenario():
+        admission = QueryAdmission(user_concurrency=1, source_concurrency=5)
+        await admission.acquire("a1", "alice", "one")
+        alice = await waiting(admission, "a2", "alice", "two")
+        assert admission.status("a2")["waiting_for"] == "user"
+        admission.release("a1")
+        await asyncio.sleep(0)
+        assert alice.done()
+
+    asyncio.run(scenario())
+
+
+def test_released_and_abandoned_queries_give_their_slots_back():
+    async def scenario():
+        admission = QueryAdmission(user_concurrency=1, source_concurrency=1)
+        await admission.acquire("a1", "alice", "data")
+        gave_up = await waiting(admission, "b1", "bob", "data")
+        carol = await waiting(admission, "c1", "carol", "data")
+        gave_up.cancel()
+        await asyncio.sleep(0)
+        assert admission.status("b1") is None
+
+        admission.release("a1")
+        # Releasing twice, or a query that never had a slot, changes nothing
+        admission.release("a1")
+        admission.release("b1")
+        await asyncio.sleep(0)
+        assert carol.done()
+        assert admission.stats()["running"] == 1
+
+        admission.release("c1")
+        assert admission.stats() == {"running": 0, "waiting": 0, "admitted": 2, "queued": 2, "sources": {"data": 0}}
+
+    asyncio.run(scenario())
+
+
+def test_pool_jobs_hold_a_slot_for_the_submitting_user():
+    async def scenario():
+        pool = QueryWorkerPool(workers=1)
+        try:
+            for query_id in ("a1", "a2"):
+                await query_admission.acquire(query_id, "alice", "data")
+            job = pool.submit(abs, -3, user_id="alice", source="data")
+            await asyncio.sleep(0.1)
+            assert query_admission.status(job.job_id)["waiting_for"] == "user"
+
+            query_admission.release("a1")
+            assert await pool.wait(job) == 3
+            assert query_admission.status(job.job_id) is None
+        finally:
+            query_admission.release("a1")
+            query_admission.release("a2")
+            pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+"""
+Editor queries on a SQLite data source
+"""
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import DBAPIError, InvalidRequestError
+
+from backend.services.data_sources import data_sources
+from backend.services.query_execution import QueryCancelled, QueryExecutionService, ResultNotFound
+from backend.services.result_cache import result_cache
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    path = tmp_path / "data.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript("CREATE TABLE t (id INTEGER); INSERT INTO t VALUES (1), (2), (3);")
+    with sqlite3.connect(tmp_path / "other.db") as conn:
+        conn.executescript("CREATE TABLE secret (value TEXT); INSERT INTO secret VALUES ('hidden');")
+    monkeypatch.setitem(data_sources.sources, "data", f"sqlite:///{path}")
+    monkeypatch.setattr(result_cache, "enabled", lambda source: False)
+    return path
+
+
+def run(*steps):
+    """Run coroutine functions in order on one event loop, then close the source's connections"""
+    async def main():
+        try:
+            return [await step() for step in steps]
+        finally:
+            await data_sources.dispose()
+
+    return asyncio.run(main())
+
+
+def execute(sql, **options):
+    return lambda: QueryExecutionService.execute(sql, "data", **options)
+
+
+def raises(error, operation):
+    async def step():
+        with pytest.raises(error):
+            await operation()
+    return step
+
+
+def test_writes_are_refused_even_after_query_only_is_turned_off(source):
+    run(
+        raises(InvalidRequestError, execute("PRAGMA query_only = OFF")),
+        raises(DBAPIError, execute("DROP TABLE t")),
+        raises(DBAPIError, execute("INSERT INTO t VALUES (4)")),
+    )
+    with sqlite3.connect(source) as conn:
+        assert conn.execute("SELECT count(*) FROM t").fetchone() == (3,)
+
+
+def test_attached_databases_do_not_outlive_their_query(source):
+    other = source.parent / "other.db"
+    run(
+        raises(InvalidRequestError, execute(f"ATTACH DATABASE '{other}' AS other")),
+        raises(DBAPIError, execute("SELECT * FROM other.secret")),
+    )
+
+
+def test_open_results_belong_to_the_user_who_ran_them(source):
+    async def scenario():
+        first = await QueryExecutionService.execute("SELECT id FROM t ORDER BY id", "data", page_size=1, user_id=1)
+        query_id = first["query_id"]
+        assert first["has_more"]
+
+        with pytest.raises(ResultNotFound):
+            await QueryExecutionService.fetch_page(query_id, 1, user_id=2)
+        with pytest.raises(ResultNotFound):
+            QueryExecutionService.status(query_id, user_id=2)
+        assert QueryExecutionService.cancel(query_id, user_id=2) is False
+
+        # Untouched by the other user's attempts
+        assert QueryExecutionService.status(query_id, user_id=1)["state"] == "running"
+        second = await QueryExecutionService.fetch_page(query_id, 1, user_id=1)
+        assert second["rows"] == [[2]]
+
+        assert QueryExecutionService.cancel(query_id, user_id=1) is True
+        with pytest.raises((QueryCancelled, ResultNotFound)):
+            await QueryExecutionService.fetch_page(query_id, 2, user_id=1)
+
+    run(scenario)
@@ -0,0 +1,43 @@
+"""
+Row limits and preview sampling written into editor SQL
+"""
+from backend.services.query_rewrite import rewrite
+
+
+def test_queries_get_a_limit_one_past_the_cap():
+    assert rewrite("select * from t", "postgresql", 100) == ("select * from t\nLIMIT 101", False)
+    assert rewrite("select * from t;", "sqlite", 100) == ("select * from t\nLIMIT 101", False)
+    assert rewrite("select * from t -- all of it", "sqlite", 100) == ("select * from t\nLIMIT 101", False)
+
+
+def test_limits_within_the_cap_and_other_statements_are_left_alone():
+    assert rewrite("select * from t limit 5", "postgresql", 100) == ("select * from t limit 5", False)
+    assert rewrite("explain select * from t", "postgresql", 100) == ("explain select * from t", False)
+    assert rewrite("select 1; select 2", "postgresql", 100) == ("select 1; select 2", False)
+
+
+def test_larger_limits_and_offsets_take_the_cap_in_place():
+    assert rewrite("select * from t limit 500", "postgresql", 100) == ("SELECT * FROM t LIMIT 101", False)
+    assert rewrite("select * from t where a = :a order by a offset 5", "postgresql", 100) == (
+        "SELECT * FROM t WHERE a = :a ORDER BY a LIMIT 101 OFFSET 5", False
+    )
+    assert rewrite("select * from t limit :n", "postgresql", 100) == (
+        "SELECT * FROM (\nselect * from t limit :n\n) AS fastset_limited LIMIT 101", False
+    )
+
+
+def test_preview_samples_a_single_table():
+    assert rewrite("select * from t where a = :a", "postgresql", 100, preview=True) == (
+        "SELECT * FROM t TABLESAMPLE SYSTEM (1.0) WHERE a = :a\nLIMIT 101", True
+    )
+    assert rewrite("with x as (select * from t) select * from x", "duckdb", 100, preview=True) == (
+        "WITH x AS (SELECT * FROM t TABLESAMPLE SYSTEM (1.0 PERCENT)) SELECT * FROM x\nLIMIT 101", True
+    )
+
+
+def test_preview_leaves_joins_and_dialects_without_sampling_alone():
+    join = "select * from t join u on t.id = u.id"
+    assert rewrite(join, "postgresql", 100, preview=True) == (f"{join}\nLIMIT 101", False)
+    assert rewrite("select * from t", "sqlite", 100, preview=True) == ("select * from t\nLIMIT 101", False)
+    series = "select * from generate_series(1, 10) as g"
+    assert rewrite(series, "postgresql", 100, preview=True) == (f"{series}\nLIMIT 101", False)
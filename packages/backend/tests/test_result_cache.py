@@ -0,0 +1,40 @@
+"""
+Result cache keys
+"""
+from backend.services import arrow_results
+from backend.services.result_cache import ResultCache, cache_key, normalize_sql
+
+ANALYST = (("department", "finance"), ("role", "analyst"))
+OTHER_DEPARTMENT = (("department", "sales"), ("role", "analyst"))
+
+
+def test_whitespace_outside_quotes_and_comments_is_collapsed():
+    assert normalize_sql("select  a,\n\tb from t ;") == "select a, b from t"
+    assert normalize_sql("select 'a  b' from t") == "select 'a  b' from t"
+
+
+def test_line_comments_keep_their_line_ends():
+    first = "select a -- c\n, b from t"
+    second = "select a -- c , b\nfrom t"
+    assert normalize_sql(first) != normalize_sql(second)
+    assert cache_key(first, "data", 100) != cache_key(second, "data", 100)
+    assert normalize_sql("select 1 /* a\n  b */  from t") == "select 1 /* a\n  b */ from t"
+
+
+def test_keys_depend_on_the_users_attributes_not_their_order():
+    sql = "select * from accounts"
+    assert cache_key(sql, "data", 100, ANALYST) != cache_key(sql, "data", 100, OTHER_DEPARTMENT)
+    assert cache_key(sql, "data", 100, ANALYST) != cache_key(sql, "data", 100)
+    assert cache_key(sql, "data", 100, ANALYST) == cache_key(sql, "data", 100, tuple(reversed(ANALYST)))
+
+
+def test_results_are_only_served_to_users_with_the_same_attributes():
+    cache = ResultCache(directory="", ttl_seconds=60)
+    collector = cache.collector("data", ["id"])
+    collector.add(*arrow_results.to_arrow(["id"], [[1], [2]]))
+    sql = "select id from accounts"
+    assert cache.put(cache_key(sql, "data", 100, ANALYST), "data", collector, truncated=False)
+
+    assert cache.get(cache_key(sql, "data", 100, OTHER_DEPARTMENT)) is None
+    assert cache.get(cache_key(sql, "data", 100)) is None
+    assert cache.get(cache_key(sql, "data", 100, ANALYST)).table.column("id").to_pylist() == [1, 2]
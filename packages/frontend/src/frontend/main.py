@@ -1,12 +1,20 @@
 """FastSet BI Frontend Application"""
+import os
 from fasthtml.common import *
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
 from frontend.routes.auth import setup_auth_routes
-from frontend.pages.sql import sql_page
+from frontend.pages.sql import (
+    sql_page, stream_sql_api, fetch_sql_page_api, cancel_sql_api, list_sources_api, sql_status_api
+)
 from frontend.pages.database import database_page
 from frontend.pages.users import users_page
 
-# Create FastHTML app
-app, rt = fast_app(live=True)
+# Compress the large Plotly pages; Starlette's gzip middleware is pure ASGI and streams
+app, rt = fast_app(
+    live=True,
+    middleware=[Middleware(GZipMiddleware, minimum_size=int(os.getenv("FASTSET_COMPRESSION_MIN_SIZE", "1024")))],
+)
 
 # Setup routes
 setup_auth_routes(rt)
@@ -15,6 +23,35 @@ setup_auth_routes(rt)
 def get():
     return sql_page()
 
+@rt("/api/stream-sql", methods=["POST"])
+async def post(request):
+    body = await request.json()
+    events = stream_sql_api(
+        body.get("query", ""),
+        access_token=request.cookies.get("access_token"),
+        query_id=body.get("query_id"),
+        source=body.get("source", ""),
+        preview=bool(body.get("preview", False)),
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@rt("/api/sql-sources")
+async def get(request):
+    return await list_sources_api(access_token=request.cookies.get("access_token"))
+
+@rt("/api/sql-status/{query_id}")
+async def get(request, query_id: str):
+    return await sql_status_api(query_id, access_token=request.cookies.get("access_token"))
+
+@rt("/api/sql-results/{query_id}/{page}")
+async def get(request, query_id: str, page: int):
+    return await fetch_sql_page_api(query_id, page, access_token=request.cookies.get("access_token"))
+
+@rt("/api/cancel-sql", methods=["POST"])
+async def post(request):
+    body = await request.json()
+    return await cancel_sql_api(body.get("query_id", ""), access_token=request.cookies.get("access_token"))
+
 @rt("/settings/database")
 def get():
     return database_page()
@@ -1,111 +1,66 @@
 """SQL Query Interface Page"""
 
+import base64
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
 from fasthtml.common import *
 from frontend.utils.header import get_head, get_header
-import pandas as pd
+import httpx
 import json
-import plotly.graph_objects as go
-import plotly.express as px
-
-
-def create_sample_dataframe():
-    """Create a sample DataFrame for demonstration"""
-    data = {
-        "ID": [1, 2, 3, 4, 5],
-        "Name": [
-            "John Doe",
-            "Jane Smith",
-            "Bob Johnson",
-            "Alice Brown",
-            "Charlie Wilson",
-        ],
-        "Email": ["[email]", "[email]", "[email]", "[email]", "[email]"],
-        "Age": [28, 34, 45, 29, 38],
-        "Department": ["Engineering", "Marketing", "Sales", "Engineering", "HR"],
-        "Salary": [75000, 68000, 82000, 71000, 65000],
-        "Created": [
-            "2024-01-15",
-            "2024-01-16",
-            "2024-01-10",
-            "2024-01-20",
-            "2024-01-12",
-        ],
-    }
-    return pd.DataFrame(data)
-
-
-def dataframe_to_plotly_table(df, max_rows=1000):
-    """Convert pandas DataFrame to Plotly table"""
-    if df.empty:
-        return '<div class="no-data">No data to display</div>'
-
-    # Limit rows for display
-    display_df = df.head(max_rows)
-
-    # Prepare data for Plotly table
-    header_values = list(display_df.columns)
-    cell_values = []
-
-    for col in display_df.columns:
-        # Format column values
-        formatted_col = []
-        for val in display_df[col]:
-            if pd.isna(val):
-                formatted_col.append("NULL")
-            else:
-                formatted_col.append(str(val))
-        cell_values.append(formatted_col)
-
-    # Create Plotly table
-    fig = go.Figure(
-        data=[
-            go.Table(
-                header=dict(
-                    values=header_values,
-                    fill_color="#007bff",
-                    font=dict(color="white", size=14, family="Arial Black"),
-                    align="left",
-                    height=40,
-                ),
-                cells=dict(
-                    values=cell_values,
-                    fill_color=[["#f8f9fa", "#ffffff"] * len(display_df)],
-                    font=dict(color="#333333", size=12),
-                    align="left",
-                    height=35,
-                ),
-            )
-        ]
-    )
+import pyarrow as pa
+import pyarrow.compute as pc
 
-    # Update layout
-    fig.update_layout(
-        title=dict(
-            text=f"Query Results - {len(display_df)} of {len(df)} rows",
-            font=dict(size=16, color="#333"),
-            x=0,
-        ),
-        margin=dict(l=0, r=0, t=50, b=0),
-        height=min(600, 50 + len(display_df) * 35 + 40),  # Dynamic height
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-    )
+BACKEND_URL = os.getenv("FASTSET_BACKEND_URL", "http://localhost:8000")
+# Seconds the backend gives each query; the HTTP call waits a little longer
+QUERY_TIMEOUT_SECONDS = float(os.getenv("FASTSET_QUERY_TIMEOUT_SECONDS", "30"))
 
-    # Convert to HTML
-    table_html = fig.to_html(
-        include_plotlyjs="cdn",
-        div_id="plotly-table",
-        config={"displayModeBar": True, "displaylogo": False},
-    )
 
-    # Extract just the div content (remove full HTML structure)
-    import re
+# Rows per page requested from the backend; the table fetches the next page on scroll
+QUERY_PAGE_SIZE = int(os.getenv("FASTSET_QUERY_PAGE_SIZE", "500"))
+# Pages are requested as Arrow IPC; a backend without pyarrow answers with JSON
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PAGE_METADATA_KEY = b"fastset.page"
 
-    div_match = re.search(r'<div id="plotly-table".*?</script>', table_html, re.DOTALL)
-    if div_match:
-        return div_match.group(0)
-    else:
-        return table_html
+
+def format_cells(columns: List[str], rows: List[List[Any]]) -> List[List[str]]:
+    """Column-major display strings for a page of rows, as Plotly tables take them"""
+    return [
+        ["NULL" if row[i] is None else str(row[i]) for row in rows]
+        for i in range(len(columns))
+    ]
+
+
+def arrow_cells(table: "pa.Table") -> List[List[str]]:
+    """Column-major display strings for an Arrow page, cast a column at a time rather than per value"""
+    cells = []
+    for column in table.columns:
+        try:
+            text = pc.cast(column, pa.string())
+        except pa.ArrowException:
+            # e.g. binary values that are not UTF-8
+            cells.append(["NULL" if value is None else str(value) for value in column.to_pylist()])
+            continue
+        cells.append(pc.fill_null(text, "NULL").to_pylist())
+    return cells
+
+
+def decode_page(
+    arrow: Optional[bytes], page: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], List[str], List[List[str]]]:
+    """Page fields, column names and display cells of a backend page, sent as an Arrow IPC stream or as JSON"""
+    if arrow is not None:
+        table = pa.ipc.open_stream(arrow).read_all()
+        page = json.loads(table.schema.metadata[PAGE_METADATA_KEY])
+        return page, table.column_names, arrow_cells(table)
+    return page, page["columns"], format_cells(page["columns"], page["rows"])
+
+
+def read_page(response: httpx.Response) -> Tuple[Dict[str, Any], List[str], List[List[str]]]:
+    """decode_page for a page response"""
+    if response.headers.get("content-type", "").startswith(ARROW_STREAM_MEDIA_TYPE):
+        return decode_page(response.content)
+    return decode_page(None, response.json())
 
 
 def sql_page():
@@ -130,9 +85,27 @@ def sql_page():
                                 rows="12",
                             ),
                             Div(
+                                Select(
+                                    # Filled with the backend's sources once the page loads
+                                    id="query-source",
+                                    cls="source-select",
+                                    title="Data source",
+                                ),
+                                Label(
+                                    Input(type="checkbox", id="query-preview"),
+                                    "Preview",
+                                    cls="preview-toggle",
+                                    title="Read a small sample of the table instead of all of it",
+                                ),
                                 Button(
                                     "Run Query", id="run-query", cls="btn btn-primary"
                                 ),
+                                Button(
+                                    "Cancel",
+                                    id="cancel-query",
+                                    cls="btn btn-danger",
+                                    style="display: none;",
+                                ),
                                 Button(
                                     "Clear", id="clear-query", cls="btn btn-secondary"
                                 ),
@@ -307,6 +280,20 @@ def sql_page():
                     flex-wrap: wrap;
                 }
                 
+                .source-select {
+                    padding: 7px 10px;
+                    border-radius: 6px;
+                    border: 1px solid var(--border-color, #dee2e6);
+                    font-size: 14px;
+                }
+                
+                .preview-toggle {
+                    display: flex;
+                    align-items: center;
+                    gap: 5px;
+                    font-size: 14px;
+                }
+                
                 .btn {
                     padding: 8px 16px;
                     border-radius: 6px;
@@ -346,6 +333,20 @@ def sql_page():
                     color: white;
                 }
                 
+                .btn-danger {
+                    background: #dc3545;
+                    color: white;
+                }
+                
+                .btn-danger:hover {
+                    background: #c82333;
+                }
+                
+                .btn:disabled {
+                    opacity: 0.6;
+                    cursor: not-allowed;
+                }
+                
                 .results-container {
                     min-height: 300px;
                     border: 1px solid var(--border-color, #ddd);
@@ -354,6 +355,11 @@ def sql_page():
                     background: var(--input-bg, #fafafa);
                 }
                 
+                .results-scroll {
+                    max-height: 600px;
+                    overflow-y: auto;
+                }
+                
                 .results-placeholder {
                     color: var(--text-muted, #666);
                     text-align: center;
@@ -531,11 +537,184 @@ def sql_page():
                 document.addEventListener('DOMContentLoaded', function() {
                     const editor = document.getElementById('sql-editor');
                     const runBtn = document.getElementById('run-query');
+                    const sourceSelect = document.getElementById('query-source');
+                    const previewToggle = document.getElementById('query-preview');
                     const clearBtn = document.getElementById('clear-query');
                     const saveBtn = document.getElementById('save-query');
                     const resultsContent = document.getElementById('results-content');
                     const queryLinks = document.querySelectorAll('.query-link');
                     
+                    const cancelBtn = document.getElementById('cancel-query');
+                    let runningQueryId = null;
+                    // The result still open on the server, read page by page as the table scrolls
+                    let openResult = null;
+                    // Aborts the result stream of the running query
+                    let streamController = null;
+                    
+                    function setRunning(queryId) {
+                        runningQueryId = queryId;
+                        runBtn.disabled = queryId !== null;
+                        cancelBtn.style.display = queryId !== null ? '' : 'none';
+                    }
+                    
+                    function releaseResult() {
+                        // Frees the server-side cursor of a result the user moved on from
+                        if (openResult) {
+                            fetch('/api/cancel-sql', {
+                                method: 'POST',
+                                headers: {'Content-Type': 'application/json'},
+                                body: JSON.stringify({ query_id: openResult.queryId })
+                            });
+                            openResult = null;
+                        }
+                    }
+                    
+                    // Data sources, with the extracts DuckDB sources can query as views
+                    fetch('/api/sql-sources')
+                    .then(response => response.json())
+                    .then(data => {
+                        if (!data.success) {
+                            return;
+                        }
+                        sourceSelect.innerHTML = '';
+                        if (!data.sources.length) {
+                            const option = document.createElement('option');
+                            option.value = '';
+                            option.textContent = 'No data sources';
+                            sourceSelect.appendChild(option);
+                            sourceSelect.disabled = true;
+                            runBtn.disabled = true;
+                            resultsContent.innerHTML = '<div class="no-data">No data sources are configured. Set FASTSET_DATA_SOURCES on the backend to query one.</div>';
+                            return;
+                        }
+                        data.sources.forEach(source => {
+                            const option = document.createElement('option');
+                            option.value = source.name;
+                            option.textContent = `${source.name} (${source.dialect})`;
+                            if (source.extracts.length) {
+                                option.title = `Extracts: ${source.extracts.join(', ')}`;
+                            }
+                            sourceSelect.appendChild(option);
+                        });
+                    });
+                    
+                    function stripes(rows) {
+                        return Array.from({length: rows}, (_, i) => i % 2 ? '#ffffff' : '#f8f9fa');
+                    }
+                    
+                    // Draws the first page; later pages are appended by loadNextPage
+                    function renderTable(columns, cells, hasMore) {
+                        const rows = cells.length ? cells[0].length : 0;
+                        Plotly.newPlot('plotly-table', [{
+                            type: 'table',
+                            header: {
+                                values: columns,
+                                fill: {color: '#007bff'},
+                                font: {color: 'white', size: 14, family: 'Arial Black'},
+                                align: 'left',
+                                height: 40
+                            },
+                            cells: {
+                                values: cells,
+                                fill: {color: [stripes(rows)]},
+                                font: {color: '#333333', size: 12},
+                                align: 'left',
+                                height: 35
+                            }
+                        }], {
+                            title: {text: `Query Results - ${rows}${hasMore ? '+' : ''} rows`, font: {size: 16, color: '#333'}, x: 0},
+                            margin: {l: 0, r: 0, t: 50, b: 0},
+                            // Tall enough for every loaded row, so the container scrolls rather than the table
+                            height: 50 + rows * 35 + 40,
+                            paper_bgcolor: 'rgba(0,0,0,0)',
+                            plot_bgcolor: 'rgba(0,0,0,0)'
+                        }, {displayModeBar: true, displaylogo: false});
+                    }
+                    
+                    // Adds a page's rows to the table, returning how many it now shows
+                    function appendCells(pageCells, hasMore) {
+                        const table = document.getElementById('plotly-table');
+                        const cells = table.data[0].cells.values.map((column, i) => column.concat(pageCells[i]));
+                        const rows = cells.length ? cells[0].length : 0;
+                        Plotly.restyle(table, {'cells.values': [cells], 'cells.fill.color': [[stripes(rows)]]});
+                        Plotly.relayout(table, {
+                            height: 50 + rows * 35 + 40,
+                            'title.text': `Query Results - ${rows}${hasMore ? '+' : ''} rows`
+                        });
+                        document.getElementById('row-count').textContent = `Rows: ${rows}`;
+                        return rows;
+                    }
+                    
+                    // Server-Sent Events from a POST response, which EventSource cannot send
+                    function readEvents(response, onEvent) {
+                        const reader = response.body.getReader();
+                        const decoder = new TextDecoder();
+                        let buffer = '';
+                        function pump() {
+                            return reader.read().then(({done, value}) => {
+                                if (done) {
+                                    return;
+                                }
+                                buffer += decoder.decode(value, {stream: true});
+                                let end;
+                                while ((end = buffer.indexOf('\\n\\n')) !== -1) {
+                                    const block = buffer.slice(0, end);
+                                    buffer = buffer.slice(end + 2);
+                                    let event = 'message';
+                                    let data = '';
+                                    block.split('\\n').forEach(line => {
+                                        if (line.startsWith('event: ')) {
+                                            event = line.slice(7);
+                                        } else if (line.startsWith('data: ')) {
+                                            data += line.slice(6);
+                                        }
+                                    });
+                                    onEvent(event, JSON.parse(data));
+                                }
+                                return pump();
+                            });
+                        }
+                        return pump();
+                    }
+                    
+                    // Database errors can quote stored values, so the message is set as text, never markup
+                    function showError(message) {
+                        resultsContent.innerHTML = `
+                            <div class="query-error">
+                                <strong>Query Error:</strong>
+                                <pre id="query-error-message"></pre>
+                            </div>
+                        `;
+                        document.getElementById('query-error-message').textContent = message;
+                    }
+                    
+                    function loadNextPage() {
+                        if (!openResult || openResult.loading) {
+                            return;
+                        }
+                        const result = openResult;
+                        result.loading = true;
+                        fetch(`/api/sql-results/${result.queryId}/${result.nextPage}`)
+                        .then(response => response.json())
+                        .then(data => {
+                            if (!data.success) {
+                                document.getElementById('page-status').textContent = data.error;
+                                openResult = null;
+                                return;
+                            }
+                            const rows = appendCells(data.cells, data.has_more);
+                            document.getElementById('page-status').textContent = data.has_more
+                                ? 'Scroll for more rows'
+                                : (data.truncated ? `Showing the first ${rows} rows` : 'All rows loaded');
+                            result.nextPage = data.page + 1;
+                            result.loading = false;
+                            if (!data.has_more) {
+                                openResult = null;
+                            }
+                        })
+                        .catch(() => { result.loading = false; });
+                    }
+                    
                     // Run query functionality
                     runBtn.addEventListener('click', function() {
                         const query = editor.value.trim();
@@ -544,113 +723,133 @@ def sql_page():
                             return;
                         }
                         
+                        releaseResult();
+                        // The id is chosen here so the query can be cancelled before it returns
+                        const queryId = crypto.randomUUID().replace(/-/g, '');
+                        setRunning(queryId);
+                        
                         // Show loading state
-                        resultsContent.innerHTML = '<div style="text-align: center; padding: 20px;">Executing query...</div>';
+                        resultsContent.innerHTML = '<div id="query-progress" style="text-align: center; padding: 20px;">Executing query...</div>';
+                        // Busy sources and users queue queries; say so while this one waits
+                        const progress = setInterval(function() {
+                            fetch(`/api/sql-status/${queryId}`)
+                            .then(response => response.json())
+                            .then(status => {
+                                const message = document.getElementById('query-progress');
+                                if (!status.success || !message || runningQueryId !== queryId) {
+                                    return;
+                                }
+                                message.textContent = status.state === 'queued'
+                                    ? `Queued (position ${status.position}), waiting for ${status.waiting_for === 'user' ? 'one of your other queries to finish' : 'a free connection to the data source'}...`
+                                    : 'Executing query...';
+                            })
+                            .catch(() => {});
+                        }, 1000);
                         
-                        // Simulate query execution with DataFrame results
-                        fetch('/api/execute-sql', {
+                        // Pages arrive as the backend reads them; the first rows show before the query finishes
+                        streamController = new AbortController();
+                        let shown = false;
+                        let nextPage = 0;
+                        fetch('/api/stream-sql', {
                             method: 'POST',
                             headers: {
                                 'Content-Type': 'application/json',
                             },
-                            body: JSON.stringify({ query: query })
+                            body: JSON.stringify({ query: query, query_id: queryId, source: sourceSelect.value, preview: previewToggle.checked }),
+                            signal: streamController.signal
                         })
-                        .then(response => response.json())
-                        .then(data => {
-                            if (data.success) {
-                                resultsContent.innerHTML = `
-                                    <div class="query-success">Query executed successfully</div>
-                                    <div class="executed-query">
-                                        <strong>Executed Query:</strong>
-                                        <pre>${query}</pre>
-                                    </div>
-                                    ${data.html_table}
-                                    <div class="query-stats">
-                                        <span class="stat-item">Rows: ${data.row_count}</span>
-                                        <span class="stat-item">Columns: ${data.column_count}</span>
-                                        <span class="stat-item">Execution Time: ${data.execution_time}s</span>
-                                    </div>
-                                `;
-                            } else {
-                                resultsContent.innerHTML = `
-                                    <div class="query-error">
-                                        <strong>Query Error:</strong>
-                                        <pre>${data.error}</pre>
-                                    </div>
-                                `;
+                        .then(response => readEvents(response, function(event, data) {
+                            if (event === 'page') {
+                                nextPage = data.page + 1;
+                                if (!shown) {
+                                    shown = true;
+                                    clearInterval(progress);
+                                    resultsContent.innerHTML = `
+                                        <div class="query-success">Query executed successfully</div>
+                                        <div class="executed-query">
+                                            <strong>Executed Query:</strong>
+                                            <pre id="executed-sql"></pre>
+                                        </div>
+                                        <div id="results-scroll" class="results-scroll">
+                                            ${data.row_count || data.has_more ? '<div id="plotly-table"></div>' : '<div class="no-data">No data to display</div>'}
+                                        </div>
+                                        <div class="query-stats">
+                                            <span class="stat-item" id="row-count">Rows: ${data.row_count}${data.sampled ? ' (sampled)' : ''}</span>
+                                            <span class="stat-item">Columns: ${data.column_count}</span>
+                                            <span class="stat-item" id="execution-time">First rows: ${data.execution_time}s${data.cached ? ' (cached)' : ''}</span>
+                                            <span class="stat-item" id="page-status">Loading...</span>
+                                        </div>
+                                    `;
+                                    document.getElementById('executed-sql').textContent = query;
+                                    if (data.row_count || data.has_more) {
+                                        renderTable(data.columns, data.cells, data.has_more);
+                                    }
+                                } else if (data.row_count) {
+                                    appendCells(data.cells, data.has_more);
+                                }
+                            } else if (event === 'progress') {
+                                const status = document.getElementById('page-status');
+                                if (status) {
+                                    status.textContent = `Fetched ${data.rows} rows (${(data.bytes / 1024).toFixed(1)} KiB) in ${(data.elapsed_ms / 1000).toFixed(2)}s`;
+                                }
+                            } else if (event === 'done') {
+                                document.getElementById('execution-time').textContent = `Execution Time: ${(data.execution_time_ms / 1000).toFixed(3)}s`;
+                                document.getElementById('page-status').textContent = data.has_more
+                                    ? 'Scroll for more rows'
+                                    : (data.truncated ? `Showing the first ${data.rows} rows` : '');
+                                if (data.has_more) {
+                                    openResult = {queryId: data.query_id, nextPage: nextPage, loading: false};
+                                    const scroller = document.getElementById('results-scroll');
+                                    scroller.addEventListener('scroll', function() {
+                                        if (scroller.scrollTop + scroller.clientHeight >= scroller.scrollHeight - 200) {
+                                            loadNextPage();
+                                        }
+                                    });
+                                }
+                            } else if (event === 'error') {
+                                if (shown) {
+                                    document.getElementById('page-status').textContent = data.detail;
+                                } else {
+                                    showError(data.detail);
+                                }
                             }
-                        })
+                        }))
                         .catch(error => {
-                            // Fallback to mock Plotly table for demo
-                            setTimeout(() => {
-                                resultsContent.innerHTML = `
-                                    <div class="query-success">Query executed successfully (Demo Mode)</div>
-                                    <div class="executed-query">
-                                        <strong>Executed Query:</strong>
-                                        <pre>${query}</pre>
-                                    </div>
-                                    <div id="demo-plotly-table" style="width: 100%; height: 400px;"></div>
-                                    <div class="query-stats">
-                                        <span class="stat-item">Rows: 5</span>
-                                        <span class="stat-item">Columns: 7</span>
-                                        <span class="stat-item">Execution Time: 0.045s</span>
-                                    </div>
-                                `;
-                                
-                                // Create demo Plotly table
-                                const demoData = [{
-                                    type: 'table',
-                                    header: {
-                                        values: ['ID', 'Name', 'Email', 'Age', 'Department', 'Salary', 'Created'],
-                                        fill: {color: '#007bff'},
-                                        font: {color: 'white', size: 14, family: 'Arial Black'},
-                                        align: 'left',
-                                        height: 40
-                                    },
-                                    cells: {
-                                        values: [
-                                            [1, 2, 3, 4, 5],
-                                            ['John Doe', 'Jane Smith', 'Bob Johnson', 'Alice Brown', 'Charlie Wilson'],
-                                            ['[email]', '[email]', '[email]', '[email]', '[email]'],
-                                            [28, 34, 45, 29, 38],
-                                            ['Engineering', 'Marketing', 'Sales', 'Engineering', 'HR'],
-                                            [75000, 68000, 82000, 71000, 65000],
-                                            ['2024-01-15', '2024-01-16', '2024-01-10', '2024-01-20', '2024-01-12']
-                                        ],
-                                        fill: {color: [['#f8f9fa', '#ffffff']]},
-                                        font: {color: '#333333', size: 12},
-                                        align: 'left',
-                                        height: 35
-                                    }
-                                }];
-                                
-                                const layout = {
-                                    title: {
-                                        text: 'Query Results - 5 of 5 rows',
-                                        font: {size: 16, color: '#333'},
-                                        x: 0
-                                    },
-                                    margin: {l: 0, r: 0, t: 50, b: 0},
-                                    paper_bgcolor: 'rgba(0,0,0,0)',
-                                    plot_bgcolor: 'rgba(0,0,0,0)'
-                                };
-                                
-                                const config = {
-                                    displayModeBar: true,
-                                    displaylogo: false,
-                                    modeBarButtonsToRemove: ['pan2d', 'lasso2d', 'select2d']
-                                };
-                                
-                                if (typeof Plotly !== 'undefined') {
-                                    Plotly.newPlot('demo-plotly-table', demoData, layout, config);
+                            if (error.name === 'AbortError') {
+                                const status = document.getElementById('page-status');
+                                if (status) {
+                                    status.textContent = 'Cancelled';
                                 } else {
-                                    document.getElementById('demo-plotly-table').innerHTML = 
-                                        '<div style="text-align: center; padding: 50px; color: #666;">Plotly not loaded. Please refresh the page.</div>';
+                                    showError('Query cancelled');
                                 }
-                            }, 800);
+                            } else {
+                                showError(error);
+                            }
+                        })
+                        .finally(() => {
+                            clearInterval(progress);
+                            streamController = null;
+                            setRunning(null);
                         });
                     });
                     
+                    // Cancel the running query on the server
+                    cancelBtn.addEventListener('click', function() {
+                        if (!runningQueryId) {
+                            return;
+                        }
+                        fetch('/api/cancel-sql', {
+                            method: 'POST',
+                            headers: {
+                                'Content-Type': 'application/json',
+                            },
+                            body: JSON.stringify({ query_id: runningQueryId })
+                        });
+                        if (streamController) {
+                            streamController.abort();
+                        }
+                    });
+                    
                     // Clear query functionality
                     clearBtn.addEventListener('click', function() {
                         editor.value = '';
@@ -695,33 +894,158 @@ def sql_page():
     )
 
 
-def execute_sql_api(query: str):
-    """
-    API endpoint to execute SQL queries and return DataFrame results
-    This function should be added to your FastHTML routes
-    """
+def server_sent_event(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def stream_sql_api(
+    query: str,
+    access_token: Optional[str] = None,
+    query_id: Optional[str] = None,
+    source: str = "",
+    preview: bool = False,
+) -> AsyncIterator[bytes]:
+    """Run a query on the backend and relay its events as they arrive, with pages as display-ready table columns"""
+    if not source:
+        yield server_sent_event("error", {"detail": "Choose a data source; none are configured on the backend"})
+        return
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+    payload = {
+        "sql": query,
+        "source": source,
+        "timeout_seconds": QUERY_TIMEOUT_SECONDS,
+        "page_size": QUERY_PAGE_SIZE,
+        "preview": preview,
+        # Pages as Arrow, decoded like the ones fetch_sql_page_api reads, so the grid renders them alike
+        "arrow": True,
+    }
+    if query_id:
+        payload["query_id"] = query_id
+
     try:
-        # For demo purposes, create sample data
-        # In production, replace this with actual database connection
-        sample_df = create_sample_dataframe()
+        async with httpx.AsyncClient() as client:
+            # Each page must arrive within the query timeout; the whole stream may take longer
+            async with client.stream(
+                "POST",
+                f"{BACKEND_URL}/v1/query/stream",
+                json=payload,
+                headers=headers,
+                timeout=httpx.Timeout(10.0, read=QUERY_TIMEOUT_SECONDS + 5),
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    yield server_sent_event("error", {"detail": response.json().get("detail", response.text)})
+                    return
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[len("data: "):])
+                        if event == "page":
+                            arrow = base64.b64decode(data["arrow"]) if "arrow" in data else None
+                            page, columns, cells = decode_page(arrow, data)
+                            data = {
+                                "query_id": page["query_id"],
+                                "page": page["page"],
+                                "columns": columns,
+                                "cells": cells,
+                                "row_count": page["row_count"],
+                                "column_count": len(columns),
+                                "has_more": page["has_more"],
+                                "truncated": page["truncated"],
+                                "execution_time": f"{page['execution_time_ms'] / 1000:.3f}",
+                                "cached": page.get("cached", False),
+                                "sampled": page.get("sampled", False),
+                            }
+                        yield server_sent_event(event, data)
+
+    except Exception as e:
+        yield server_sent_event("error", {"detail": str(e)})
 
-        # Simulate query filtering (in production, execute actual SQL)
-        if "WHERE" in query.upper():
-            # Simple demo filtering
-            result_df = sample_df.head(3)
-        else:
-            result_df = sample_df
 
-        # Convert DataFrame to Plotly table
-        html_table = dataframe_to_plotly_table(result_df)
+async def fetch_sql_page_api(query_id: str, page: int, access_token: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch the next page of an open result as display-ready table columns"""
+    headers = {"Accept": ARROW_STREAM_MEDIA_TYPE}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
 
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{BACKEND_URL}/v1/query/{query_id}/pages/{page}",
+                headers=headers,
+                timeout=QUERY_TIMEOUT_SECONDS + 5,
+            )
+
+        if response.status_code != 200:
+            return {"success": False, "error": response.json().get("detail", response.text)}
+
+        result, _, cells = read_page(response)
         return {
             "success": True,
-            "html_table": html_table,
-            "row_count": len(result_df),
-            "column_count": len(result_df.columns),
-            "execution_time": "0.045",
+            "page": result["page"],
+            "cells": cells,
+            "row_count": result["row_count"],
+            "has_more": result["has_more"],
+            "truncated": result["truncated"],
+            "execution_time": f"{result['execution_time_ms'] / 1000:.3f}",
         }
 
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+
+async def sql_status_api(query_id: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+    """Whether a query is queued for a slot or running"""
+    headers = {}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{BACKEND_URL}/v1/query/{query_id}/status", headers=headers, timeout=10.0)
+        if response.status_code == 200:
+            return {"success": True, **response.json()}
+        return {"success": False, "error": response.json().get("detail", response.text)}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+async def list_sources_api(access_token: Optional[str] = None) -> Dict[str, Any]:
+    """Data sources the editor can query"""
+    headers = {}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{BACKEND_URL}/v1/query/sources", headers=headers, timeout=10.0)
+        if response.status_code == 200:
+            return {"success": True, "sources": response.json()}
+        return {"success": False, "error": response.json().get("detail", response.text)}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+async def cancel_sql_api(query_id: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+    """Ask the backend to stop a running query"""
+    headers = {}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.delete(
+                f"{BACKEND_URL}/v1/query/{query_id}", headers=headers, timeout=10.0
+            )
+        if response.status_code == 200:
+            return {"success": True}
+        return {"success": False, "error": response.json().get("detail", response.text)}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -6,18 +6,24 @@ import httpx
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+# Only the columns the user cards render; the API skips everything else
+USER_CARD_FIELDS = "id,username,email,created_at,attributes"
+
 
 async def fetch_users_from_api(
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None,
     access_token: Optional[str] = None,
+    fields: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """Fetch users from the backend API"""
     try:
         params = {"skip": skip, "limit": limit}
         if search:
             params["search"] = search
+        if fields:
+            params["fields"] = fields
 
         headers = {"Content-Type": "application/json"}
         if access_token:
@@ -208,7 +214,7 @@ async def users_page(
     """Create the users management page with server-side rendered data"""
     if not users_data:
         access_token = request.cookies.get("access_token")
-        users = await fetch_users_from_api(access_token=access_token)
+        users = await fetch_users_from_api(access_token=access_token, fields=USER_CARD_FIELDS)
     # users = users_data or []
     has_next = len(users) == page_size
     has_prev = current_page > 1
@@ -860,6 +866,7 @@ async def users_route_handler(
         limit=size,
         search=search if search else None,
         access_token=access_token,
+        fields=USER_CARD_FIELDS,
     )
 
     # Filter by status if needed (since API doesn't support status filtering yet)